@@ -0,0 +1,79 @@
+#!/bin/env python3
+'''
+Bulk mode (--batch --format npy) against the text batch mode on a generated input of size_mb megabytes.
+Each mode runs as its own calc.py process. Reports seconds, input MB/s, the peak RSS of the process (its
+workers included) and the output size. Peak RSS of the bulk mode should not grow with the input size,
+try a multi-GB input with size_mb 4096.
+
+    python3 benchmarks/bench_bulk.py [size_mb] [jobs]
+'''
+
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import calc
+
+def write_corpus(path : str, size : int):
+    # mostly valid expressions, with blank lines and lex, syntax and evaluation errors mixed in
+    random_generator = random.Random(0)
+    error_lines = ["\n", "2*(3\n", "1/0\n", "sqrt(-1)\n", "3 $ 4\n"]
+    with open(path, "w") as corpus_file:
+        written_size = 0
+        while (written_size < size):
+            lines = []
+            for line_index in range(1000):
+                if (random_generator.random() < 0.02):
+                    lines.append(random_generator.choice(error_lines))
+                    continue
+                a = random_generator.randint(1, 999)
+                b = random_generator.random()
+                c = random_generator.randint(1, 9)
+                lines.append(f"({a}+{c})*sin({b:.4f})/{c} - sqrt({a})^2 + -{c}\n")
+            text = "".join(lines)
+            corpus_file.write(text)
+            written_size += len(text)
+
+def run_calc(arguments : list):
+    '''
+    Returns list(elapsed_time: float, peak_rss_bytes: int)
+    '''
+    start_time = time.perf_counter()
+    process = subprocess.Popen([sys.executable, calc.__file__] + arguments)
+    pid, status, resource_usage = os.wait4(process.pid, 0)
+    elapsed_time = time.perf_counter() - start_time
+    assert os.waitstatus_to_exitcode(status) == 0, arguments
+    # ru_maxrss is in kilobytes on Linux
+    return (elapsed_time, resource_usage.ru_maxrss * 1024)
+
+def main():
+    size = int(float(sys.argv[1]) * 1e6) if len(sys.argv) > 1 else 64 * 10**6
+    jobs = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = os.path.join(temp_dir, "corpus.txt")
+        write_corpus(input_path, size)
+        input_size = os.path.getsize(input_path)
+        with open(input_path, "rb") as input_file:
+            line_count = sum([1 for line in input_file])
+        print(f"{input_size/1e6:.0f} MB, {line_count} lines, jobs {jobs}")
+        print(f"{'mode':<6} {'seconds':>9} {'MB/s':>7} {'lines/s':>9} {'peak RSS MB':>12} {'output MB':>10}")
+
+        text_output_path = os.path.join(temp_dir, "results.txt")
+        elapsed_time, peak_rss = run_calc(["--batch", "--input", input_path, "--output", text_output_path, "--jobs", str(jobs)])
+        output_size = os.path.getsize(text_output_path)
+        os.unlink(text_output_path)
+        print(f"{'text':<6} {elapsed_time:>9.1f} {input_size/elapsed_time/1e6:>7.2f} {line_count/elapsed_time:>9.0f} {peak_rss/1e6:>12.1f} {output_size/1e6:>10.1f}")
+
+        output_prefix = os.path.join(temp_dir, "results")
+        elapsed_time, peak_rss = run_calc(["--batch", "--format", "npy", "--input", input_path, "--output", output_prefix, "--jobs", str(jobs)])
+        output_size = os.path.getsize(output_prefix + ".values.npy") + os.path.getsize(output_prefix + ".errors.npy")
+        record_count = os.path.getsize(output_prefix + ".errors.npy") - calc.NPY_HEADER_SIZE
+        assert record_count == line_count, (record_count, line_count)
+        print(f"{'npy':<6} {elapsed_time:>9.1f} {input_size/elapsed_time/1e6:>7.2f} {line_count/elapsed_time:>9.0f} {peak_rss/1e6:>12.1f} {output_size/1e6:>10.1f}")
+
+if __name__ == "__main__":
+    main()
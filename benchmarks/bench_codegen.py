@@ -0,0 +1,64 @@
+#!/bin/env python3
+'''
+Generated python functions (compile(codegen = True)) against the postfix interpreter, on short
+expressions and on long generated ones, with the float and decimal engines. Generation time is the
+extra cost paid once per compile(). 3000 terms is close to calc.CODEGEN_MAX_INSTRUCTIONS.
+
+    python3 benchmarks/bench_codegen.py
+'''
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import calc
+
+SHORT_EXPRESSIONS = [
+    "x^2 + 3*x - 1",
+    "sqrt(x^2 + y^2)",
+    "-x*-y + x/y",
+    "sin(x)*cos(y) + tan(x/4)",
+]
+LONG_TERM_COUNTS = [10, 100, 1000, 3000]
+ENGINE_NAMES = ["float", "decimal"]
+VARIABLES = {"x": 1.25, "y": 3.5}
+MIN_SECONDS = 0.3
+
+def generate_long_expression(term_count : int):
+    operators = ["+", "-", "*", "/"]
+    return "1" + "".join([f" {operators[term_index % 4]} (x*{term_index % 9 + 1} - y)" for term_index in range(term_count)])
+
+def time_evaluations(compiled_expression):
+    evaluation_count = 0
+    start_time = time.perf_counter()
+    elapsed_time = 0
+    while (elapsed_time < MIN_SECONDS):
+        evaluated_value, errors = compiled_expression.evaluate(VARIABLES)
+        assert len(errors) == 0, errors
+        evaluation_count += 1
+        elapsed_time = time.perf_counter() - start_time
+    return evaluation_count / elapsed_time
+
+def compare(label : str, expression : str, engine_name : str):
+    interpreted_expression, errors = calc.compile(expression, engine = engine_name)
+    assert len(errors) == 0, errors
+    start_time = time.perf_counter()
+    generated_expression, errors = calc.compile(expression, engine = engine_name, codegen = True)
+    generation_time = time.perf_counter() - start_time
+    assert generated_expression.function is not None
+    assert interpreted_expression.evaluate(VARIABLES) == generated_expression.evaluate(VARIABLES)
+    interpreted_rate = time_evaluations(interpreted_expression)
+    generated_rate = time_evaluations(generated_expression)
+    print(f"{label:<26} {engine_name:>8} {interpreted_rate:>14.0f} {generated_rate:>14.0f} {generated_rate/interpreted_rate:>7.2f}x {generation_time*1e3:>11.2f}")
+
+def main():
+    print(f"{'expression':<26} {'engine':>8} {'interpreted/s':>14} {'generated/s':>14} {'speedup':>8} {'compile ms':>11}")
+    for engine_name in ENGINE_NAMES:
+        for expression in SHORT_EXPRESSIONS:
+            compare(expression, expression, engine_name)
+        for term_count in LONG_TERM_COUNTS:
+            compare(f"{term_count} terms", generate_long_expression(term_count), engine_name)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#!/bin/env python3
+'''
+Compares evaluating the same expression repeatedly through lex() + eval_lex_tokens()
+against compiling it once with compile() and calling CompiledExpression.evaluate().
+
+    python3 benchmarks/bench_compile.py [iterations]
+'''
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import calc
+
+EXPRESSIONS = [
+    "1+2*3",
+    "sin(pi/4)*2",
+    "(1+2)*(3-4)/5^2",
+    "sqrt(2)*deg2rad*180 - -3*log10(1000)",
+    "+".join(["(1*2-3/4)"] * 50),
+]
+
+def bench_interpreted(expression : str, iterations : int):
+    def run():
+        calc.eval_lex_tokens(calc.lex(expression))
+    return timeit.timeit(run, number = iterations)
+
+def bench_compiled(expression : str, iterations : int):
+    compiled_expression, errors = calc.compile(expression)
+    assert len(errors) == 0, errors
+    return timeit.timeit(compiled_expression.evaluate, number = iterations)
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"{'expression':<42} {'lex+eval ops/s':>16} {'compiled ops/s':>16} {'speedup':>8}")
+    for expression in EXPRESSIONS:
+        interpreted_time = bench_interpreted(expression, iterations)
+        compiled_time = bench_compiled(expression, iterations)
+        label = expression if len(expression) <= 40 else expression[:37] + "..."
+        print(f"{label:<42} {iterations/interpreted_time:>16.0f} {iterations/compiled_time:>16.0f} {interpreted_time/compiled_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/bin/env python3
+'''
+Micro-benchmark for the disabled debug output path.
+
+Times tokens_to_postfix() per token in three builds of calc:
+  stripped  - calc.py with every LOGGER call and trace/debug guard removed from the source
+  disabled  - calc as shipped, debug output off (the default)
+  enabled   - calc as shipped, LOG_LEVEL_TRACE messages formatted into a discarding handler
+Disabled should match stripped, and time per token should not grow with the expression length.
+
+    python3 benchmarks/bench_debug.py
+'''
+
+import ast
+import gc
+import logging
+import os
+import sys
+import time
+import types
+
+CALC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "calc.py")
+sys.path.insert(0, os.path.dirname(CALC_PATH))
+import calc
+
+TERM_COUNTS = [1000, 10000, 100000]
+REPEATS = 3
+
+def is_logging_call(node):
+    return (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and isinstance(node.func.value, ast.Name) and node.func.value.id == "LOGGER")
+
+def is_debug_guard(node):
+    if (isinstance(node.test, ast.Name) and node.test.id == "trace_enabled"):
+        return True
+    return is_logging_call(node.test)
+
+class InstrumentationStripper(ast.NodeTransformer):
+    def visit_If(self, node):
+        if (is_debug_guard(node) and len(node.orelse) == 0):
+            return None
+        return self.generic_visit(node)
+    def visit_Expr(self, node):
+        if (is_logging_call(node.value)):
+            return None
+        return node
+    def generic_visit(self, node):
+        super().generic_visit(node)
+        # a block left with only logging calls still needs a statement
+        if (isinstance(getattr(node, "body", None), list) and len(node.body) == 0):
+            node.body = [ast.Pass()]
+        return node
+
+def load_stripped_calc():
+    with open(CALC_PATH) as calc_file:
+        tree = ast.parse(calc_file.read())
+    tree = ast.fix_missing_locations(InstrumentationStripper().visit(tree))
+    module = types.ModuleType("calc_stripped")
+    exec(compile(tree, CALC_PATH, "exec"), module.__dict__)
+    return module
+
+def time_per_token(module, tokens):
+    best_time = None
+    gc.collect()
+    gc.disable()
+    for repeat_index in range(REPEATS):
+        start_time = time.perf_counter()
+        module.tokens_to_postfix(tokens)
+        elapsed_time = time.perf_counter() - start_time
+        best_time = elapsed_time if best_time is None else min(best_time, elapsed_time)
+    gc.enable()
+    return best_time / len(tokens) * 1e9
+
+def main():
+    stripped_calc = load_stripped_calc()
+    print(f"{'tokens':>8} {'stripped ns/tok':>16} {'disabled ns/tok':>16} {'overhead':>9} {'enabled ns/tok':>15}")
+    for term_count in TERM_COUNTS:
+        expression = "+".join(["2*3"] * term_count)
+        stripped_time = time_per_token(stripped_calc, stripped_calc.lex(expression))
+        tokens = calc.lex(expression)
+        calc.set_debug_output(False)
+        disabled_time = time_per_token(calc, tokens)
+
+        discard_handler = logging.NullHandler()
+        discard_handler.handle = lambda record: record.getMessage()
+        calc.LOGGER.addHandler(discard_handler)
+        calc.LOGGER.setLevel(calc.LOG_LEVEL_TRACE)
+        enabled_time = time_per_token(calc, tokens)
+        calc.LOGGER.removeHandler(discard_handler)
+        calc.set_debug_output(False)
+
+        overhead = (disabled_time - stripped_time) / stripped_time * 100
+        print(f"{len(tokens):>8} {stripped_time:>16.1f} {disabled_time:>16.1f} {overhead:>8.1f}% {enabled_time:>15.1f}")
+
+if __name__ == "__main__":
+    main()
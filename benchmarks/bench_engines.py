@@ -0,0 +1,70 @@
+#!/bin/env python3
+'''
+Evaluations per second of each numeric engine on a fixed expression corpus.
+Expressions are compiled once per engine and the compiled programs are timed. The fraction engine
+only runs the rational part of the corpus (no constants, functions or fractional exponents).
+
+    python3 benchmarks/bench_engines.py
+'''
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import calc
+
+RATIONAL_CORPUS = [
+    "1+2*3-4/5",
+    "(1.5+2.25)*(3-0.125)/7",
+    "-x*-y + x/y - 3^4",
+    "((x+1)*(x-1)+(y+2)*(y-2))/(x*y+1)",
+    "x^3 - 2*x^2 + 3*x - 4",
+    "1/3 + 1/7 + 1/11 + 1/13",
+]
+FUNCTION_CORPUS = [
+    "sqrt(x^2 + y^2)",
+    "sin(x)^2 + cos(x)^2",
+    "log10(x*1000) + log2(y)",
+    "atan(y/x) * rad2deg",
+    "tan(x) * cot(x) + asin(0.5) + acos(0.5)",
+    "e^x - 2^y + pi",
+]
+ENGINES = [
+    ("float", calc.FloatEngine()),
+    ("decimal", calc.DecimalEngine()),
+    ("decimal 50", calc.DecimalEngine(50)),
+    ("decimal 100", calc.DecimalEngine(100)),
+    ("fraction", calc.FractionEngine()),
+]
+VARIABLES = {"x": "1.25", "y": "3.5"}
+MIN_SECONDS = 0.5
+
+def time_evaluations(compiled_expressions : list):
+    evaluation_count = 0
+    start_time = time.perf_counter()
+    elapsed_time = 0
+    while (elapsed_time < MIN_SECONDS):
+        for compiled_expression in compiled_expressions:
+            evaluated_value, errors = compiled_expression.evaluate(VARIABLES)
+            assert len(errors) == 0, (compiled_expression, errors)
+        evaluation_count += len(compiled_expressions)
+        elapsed_time = time.perf_counter() - start_time
+    return evaluation_count / elapsed_time
+
+def main():
+    print(f"{'engine':>12} {'rational ops/s':>15} {'functions ops/s':>16} {'sqrt(2)':>32}")
+    for label, engine in ENGINES:
+        rates = []
+        for corpus in (RATIONAL_CORPUS, FUNCTION_CORPUS):
+            compiled_expressions = [calc.compile(expression, engine = engine)[0] for expression in corpus]
+            if (None in compiled_expressions):
+                rates.append("n/a")
+                continue
+            rates.append(f"{time_evaluations(compiled_expressions):.0f}")
+        sample_value, errors = calc.evaluate("sqrt(2)", engine = engine)
+        sample = str(sample_value) if len(errors) == 0 else "n/a"
+        print(f"{label:>12} {rates[0]:>15} {rates[1]:>16} {sample[:32]:>32}")
+
+if __name__ == "__main__":
+    main()
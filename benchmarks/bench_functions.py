@@ -0,0 +1,66 @@
+#!/bin/env python3
+'''
+Functions defined with define_function() against the string substitution workaround, which pastes each
+function body into the expression text before evaluating it. Nested functions make the substituted text
+grow with every level (a body calling its inner function twice doubles it), while a defined function is
+parsed once and its body built once per engine. Reports evaluations per second of the substituted text,
+of the expression with defined functions and of it compiled, and the substituted expression length.
+
+    python3 benchmarks/bench_functions.py
+'''
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import calc
+
+LEVELS = [1, 3, 5, 8]
+ENGINE_NAMES = ["float", "decimal"]
+VARIABLES = {"x": 0.75, "y": 1.25}
+MIN_SECONDS = 0.3
+
+def define_level_functions(level_count : int):
+    # f0(a, b) = a^2 + b, fn(a, b) = f(n-1)(a, b) + f(n-1)(b, a/2) * min(a, b, 1)
+    errors = calc.define_function("f0(a, b) = a^2 + b")[1]
+    for level in range(1, level_count + 1):
+        errors += calc.define_function(f"f{level}(a, b) = f{level-1}(a, b) + f{level-1}(b, a/2) * min(a, b, 1)")[1]
+    assert len(errors) == 0, errors
+
+def substitute(level : int, argument_a : str, argument_b : str):
+    # the same functions pasted into the text, arguments are bracketed so precedence holds
+    if (level == 0):
+        return f"(({argument_a})^2 + ({argument_b}))"
+    return f"({substitute(level-1, argument_a, argument_b)} + {substitute(level-1, argument_b, f'({argument_a})/2')} * min({argument_a}, {argument_b}, 1))"
+
+def time_rate(function):
+    call_count = 0
+    start_time = time.perf_counter()
+    elapsed_time = 0
+    while (elapsed_time < MIN_SECONDS):
+        function()
+        call_count += 1
+        elapsed_time = time.perf_counter() - start_time
+    return call_count / elapsed_time
+
+def main():
+    define_level_functions(max(LEVELS))
+    print(f"{'level':>5} {'engine':>8} {'substituted chars':>17} {'substituted/s':>14} {'defined/s':>10} {'compiled/s':>11} {'speedup':>8}")
+    for level in LEVELS:
+        expression = f"f{level}(x, y) + 1"
+        substituted_expression = substitute(level, "x", "y") + " + 1"
+        for engine_name in ENGINE_NAMES:
+            substituted_value, errors = calc.evaluate(substituted_expression, VARIABLES, engine = engine_name)
+            assert len(errors) == 0, errors
+            defined_value, errors = calc.evaluate(expression, VARIABLES, engine = engine_name)
+            assert len(errors) == 0, errors
+            assert abs(float(substituted_value) - float(defined_value)) <= 1e-9 * abs(float(defined_value)), (substituted_value, defined_value)
+            compiled_expression, errors = calc.compile(expression, engine = engine_name)
+            substituted_rate = time_rate(lambda: calc.evaluate(substituted_expression, VARIABLES, engine = engine_name))
+            defined_rate = time_rate(lambda: calc.evaluate(expression, VARIABLES, engine = engine_name))
+            compiled_rate = time_rate(lambda: compiled_expression.evaluate(VARIABLES))
+            print(f"{level:>5} {engine_name:>8} {len(substituted_expression):>17} {substituted_rate:>14.0f} {defined_rate:>10.0f} {compiled_rate:>11.0f} {defined_rate/substituted_rate:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/bin/env python3
+'''
+Fuzz and stress run for untrusted input. First evaluates FUZZ_CASES random expressions, built from a mix
+of valid tokens, unknown chars and random unicode, through evaluate(), compile(optimize, codegen),
+gradient() and the server path (evaluate_expression_string()), with the decimal, float and interval engines.
+Any exception is a failure, bad input has to come back as error messages.
+Then times adversarial families (deep brackets, function and unary minus chains, unmatched brackets,
+input over the limits, ...) at growing sizes and reports MB/s and the first error. Throughput of a family
+should stay flat as its input grows, inputs over a limit are rejected early.
+Exits with status 1 on an exception, or when the time per char of a family grows more than
+STABILITY_FACTOR times between its smallest and largest size.
+
+    python3 benchmarks/bench_fuzz.py [cases]
+'''
+
+import os
+import random
+import sys
+import time
+import traceback
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import calc
+
+FUZZ_CASES = 20000
+FUZZ_MAX_TOKENS = 40
+FUZZ_TOKENS = ["1", "2.5", "0", ".5", ".", "1+.", "1.2.3", "999999999999", "+", "-", "*", "/", "^", "(", ")", "((", "))",
+               " ", "pi", "e", "sqrt", "sin", "cos", "tan", "cot", "log10", "acos", ",", "min", "atan2", "hypot", "x", "y", "_", "#", "\t", "\n"]
+ENGINE_NAMES = ["decimal", "float", "interval"]
+SIZES = [10000, 100000, 1000000]
+REPEATS = 3
+STABILITY_FACTOR = 3
+
+def generate_fuzz_expression(random_generator : random.Random):
+    parts = []
+    for token_index in range(random_generator.randint(0, FUZZ_MAX_TOKENS)):
+        if (random_generator.random() < 0.05):
+            parts.append(chr(random_generator.randint(0, 0x2FFF)))
+        else:
+            parts.append(random_generator.choice(FUZZ_TOKENS))
+    return "".join(parts)
+
+def check_expression(expression : str):
+    # every call has to return errors instead of raising
+    calc.evaluate_expression_string(expression)
+    for engine_name in ENGINE_NAMES:
+        calc.evaluate(expression, {"x": 0.5}, engine = engine_name)
+        calc.gradient(expression, {"x": 0.5, "y": 2}, engine = engine_name)
+        for optimize, codegen in ((True, False), (False, True)):
+            compiled_expression, errors = calc.compile(expression, optimize = optimize, engine = engine_name, codegen = codegen)
+            if (compiled_expression is not None):
+                compiled_expression.evaluate({"x": 0.5, "y": 2})
+
+def run_fuzz(case_count : int):
+    random_generator = random.Random(0)
+    failures = []
+    start_time = time.perf_counter()
+    for case_index in range(case_count):
+        expression = generate_fuzz_expression(random_generator)
+        try:
+            check_expression(expression)
+        except Exception:
+            failures.append((expression, traceback.format_exc()))
+    elapsed_time = time.perf_counter() - start_time
+    print(f"fuzz: {case_count} expressions in {elapsed_time:.1f} s, {len(failures)} raised")
+    for expression, error_traceback in failures[:5]:
+        print(f"  {expression!r}\n{error_traceback}")
+    return len(failures)
+
+def repeat_to_size(unit : str, separator : str, size : int):
+    return separator.join([unit] * max(1, (size + len(separator)) // (len(unit) + len(separator))))
+
+def get_families():
+    max_depth = calc.MAX_NESTING_DEPTH
+    return {
+        "sum (baseline)": lambda size: repeat_to_size("1", "+", size),
+        "deep brackets": lambda size: repeat_to_size("(" * (max_depth - 1) + "1" + ")" * (max_depth - 1), "+", size),
+        "function chains": lambda size: repeat_to_size("sin(" * (max_depth // 2) + "0" + ")" * (max_depth // 2), "+", size),
+        "unary minus chains": lambda size: repeat_to_size("-" * (max_depth - 2) + "1", "+", size),
+        "unknown chars": lambda size: "§" * size,
+        "decimal points": lambda size: repeat_to_size("1.2.3", "+", size),
+        "long number": lambda size: "9" * size,
+        "too deep": lambda size: "(" * size,
+        "unmatched )": lambda size: ")" + "1" * (size - 1),
+        "over length": lambda size: "1" * (calc.MAX_EXPRESSION_LENGTH + size),
+    }
+
+def time_expression(expression : str):
+    best_time = None
+    for repeat_index in range(REPEATS):
+        start_time = time.perf_counter()
+        evaluated_value, errors = calc.evaluate_expression_string(expression)
+        elapsed_time = time.perf_counter() - start_time
+        best_time = elapsed_time if best_time is None else min(best_time, elapsed_time)
+    return (best_time, evaluated_value, errors)
+
+def run_stress():
+    unstable_families = []
+    print(f"\n{'family':<19} {'chars':>8} {'seconds':>9} {'MB/s':>8} {'ns/char':>8}  result")
+    for family_name, generate in get_families().items():
+        times_per_char = []
+        for size in SIZES:
+            expression = generate(size)
+            elapsed_time, evaluated_value, errors = time_expression(expression)
+            times_per_char.append(elapsed_time / len(expression))
+            result = f"{len(errors)} error(s), {errors[0][:60]}" if len(errors) > 0 else f"value {str(evaluated_value)[:20]}"
+            print(f"{family_name:<19} {len(expression):>8} {elapsed_time:>9.4f} {len(expression)/elapsed_time/1e6:>8.2f} {times_per_char[-1]*1e9:>8.1f}  {result}")
+        if (times_per_char[-1] > times_per_char[0] * STABILITY_FACTOR):
+            unstable_families.append(family_name)
+    if (len(unstable_families) > 0):
+        print(f"time per char grew more than {STABILITY_FACTOR}x: {', '.join(unstable_families)}")
+    return len(unstable_families)
+
+def main():
+    case_count = int(sys.argv[1]) if len(sys.argv) > 1 else FUZZ_CASES
+    failure_count = run_fuzz(case_count)
+    unstable_count = run_stress()
+    if (failure_count > 0 or unstable_count > 0):
+        print("FAILED")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/bin/env python3
+'''
+Reverse mode gradient (CompiledExpression.gradient()) against central finite differences, which need
+2N evaluations for N variables. Reports gradients per second of both and the largest difference between
+their results, on generated expressions of 2, 10 and 50 variables with the float and decimal engines.
+
+    python3 benchmarks/bench_gradient.py
+'''
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import calc
+
+VARIABLE_COUNTS = [2, 10, 50]
+ENGINE_NAMES = ["float", "decimal"]
+FINITE_DIFFERENCE_STEP = 1e-6
+MIN_SECONDS = 0.3
+
+def generate_expression(variable_count : int):
+    terms = [f"(x{index} - {index % 5})^2 * sin(x{index}) + sqrt(x{index})*x{(index + 1) % variable_count}" for index in range(variable_count)]
+    return " + ".join(terms)
+
+def finite_difference_gradient(compiled_expression, variables : dict):
+    engine = compiled_expression.engine
+    gradient = {}
+    for name in compiled_expression.variables:
+        shifted_variables = dict(variables)
+        step = engine.from_variable(FINITE_DIFFERENCE_STEP)
+        shifted_variables[name] = engine.from_variable(variables[name]) + step
+        upper_value, errors = compiled_expression.evaluate(shifted_variables)
+        shifted_variables[name] = engine.from_variable(variables[name]) - step
+        lower_value, errors = compiled_expression.evaluate(shifted_variables)
+        gradient[name] = (upper_value - lower_value) / (2 * step)
+    return gradient
+
+def time_rate(function):
+    call_count = 0
+    start_time = time.perf_counter()
+    elapsed_time = 0
+    while (elapsed_time < MIN_SECONDS):
+        function()
+        call_count += 1
+        elapsed_time = time.perf_counter() - start_time
+    return call_count / elapsed_time
+
+def main():
+    print(f"{'variables':>9} {'engine':>8} {'reverse mode/s':>15} {'finite diff/s':>14} {'speedup':>8} {'max difference':>15}")
+    for variable_count in VARIABLE_COUNTS:
+        expression = generate_expression(variable_count)
+        variables = {f"x{index}": 1.5 + index / 10 for index in range(variable_count)}
+        for engine_name in ENGINE_NAMES:
+            compiled_expression, errors = calc.compile(expression, engine = engine_name)
+            assert len(errors) == 0, errors
+            evaluated_value, gradient, errors = compiled_expression.gradient(variables)
+            assert len(errors) == 0, errors
+            approximate_gradient = finite_difference_gradient(compiled_expression, variables)
+            max_difference = max([abs(float(gradient[name] - approximate_gradient[name])) for name in gradient])
+            reverse_mode_rate = time_rate(lambda: compiled_expression.gradient(variables))
+            finite_difference_rate = time_rate(lambda: finite_difference_gradient(compiled_expression, variables))
+            print(f"{variable_count:>9} {engine_name:>8} {reverse_mode_rate:>15.0f} {finite_difference_rate:>14.0f} {reverse_mode_rate/finite_difference_rate:>7.1f}x {max_difference:>15.2e}")
+
+if __name__ == "__main__":
+    main()
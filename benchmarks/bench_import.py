@@ -0,0 +1,74 @@
+#!/bin/env python3
+'''
+Import time of calc, measured with python -X importtime in fresh interpreters, against IMPORT_TIME_BUDGET_MS.
+Also checks that the optional backends are not imported by "import calc" and reports the wall clock
+cost of the import over a bare interpreter start. Exits with status 1 when a check fails.
+
+    python3 benchmarks/bench_import.py
+'''
+
+import os
+import py_compile
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+CALC_PATH = os.path.join(REPO_PATH, "calc.py")
+IMPORT_TIME_BUDGET_MS = 40
+REPEATS = 15
+LAZY_MODULES = ["numpy", "asyncio", "socket", "concurrent.futures", "fractions"]
+TOP_MODULE_COUNT = 8
+
+def run_python(code : str, *options):
+    environment = dict(os.environ, PYTHONPATH = REPO_PATH)
+    return subprocess.run([sys.executable, *options, "-c", code], env = environment, capture_output = True, text = True, check = True)
+
+def parse_import_times(importtime_output : str):
+    # lines look like "import time:   self_us | cumulative_us | <indent>module"
+    import_times = {}
+    for line in importtime_output.splitlines():
+        if (not line.startswith("import time:") or "self [us]" in line):
+            continue
+        self_time, cumulative_time, module_name = line[len("import time:"):].split("|")
+        import_times[module_name.strip()] = (int(self_time), int(cumulative_time))
+    return import_times
+
+def time_process(code : str):
+    best_time = None
+    for repeat_index in range(REPEATS):
+        start_time = time.perf_counter()
+        run_python(code)
+        elapsed_time = time.perf_counter() - start_time
+        best_time = elapsed_time if best_time is None else min(best_time, elapsed_time)
+    return best_time
+
+def main():
+    # the import should be measured with current bytecode, even where PYTHONDONTWRITEBYTECODE is set
+    py_compile.compile(CALC_PATH, doraise = True)
+
+    calc_times = []
+    for repeat_index in range(REPEATS):
+        import_times = parse_import_times(run_python("import calc", "-X", "importtime").stderr)
+        calc_times.append(import_times["calc"][1] / 1000)
+    median_time = statistics.median(calc_times)
+
+    print(f"import calc (-X importtime, cumulative): median {median_time:.1f} ms, min {min(calc_times):.1f} ms, budget {IMPORT_TIME_BUDGET_MS} ms")
+    print("largest imports (cumulative ms, last run):")
+    for module_name, (self_time, cumulative_time) in sorted(import_times.items(), key = lambda item: -item[1][1])[:TOP_MODULE_COUNT]:
+        print(f"  {cumulative_time/1000:>7.1f}  {module_name}")
+
+    bare_time = time_process("pass")
+    calc_time = time_process("import calc")
+    print(f"interpreter start {bare_time*1e3:.1f} ms, with import calc {calc_time*1e3:.1f} ms (+{(calc_time-bare_time)*1e3:.1f} ms)")
+
+    loaded_modules = run_python(f"import sys, calc; print(' '.join([name for name in {LAZY_MODULES!r} if name in sys.modules]))").stdout.split()
+    print(f"optional modules loaded by import calc: {', '.join(loaded_modules) if len(loaded_modules) > 0 else 'none'}")
+
+    if (median_time > IMPORT_TIME_BUDGET_MS or len(loaded_modules) > 0):
+        print("FAILED")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/bin/env python3
+'''
+Range of an expression over boxes of its variables by bound() (interval engine) against dense sampling with
+the compiled float engine (evaluate_many() on a grid). Sampling only sees the points it evaluates and can miss
+a narrow peak, the interval bounds hold for every point but over-estimate, more subdivisions tighten them.
+Reports seconds, the bounds and the width of the range over the width of the sampled range (1.00 is tight).
+Fails when a sample falls outside an interval enclosure.
+
+    python3 benchmarks/bench_interval.py
+'''
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import calc
+
+CASES = [
+    ("x^2 - 2*x", {"x": (0, 3)}),
+    ("sin(x)*x + cos(3*x)", {"x": (-4, 4)}),
+    ("sqrt(x)*log10(x + 1) - x/7", {"x": (0, 50)}),
+    ("1/(1 + 100*(x - 0.3)^2) + x", {"x": (-1, 1)}),
+    ("x*y - x^2 + sin(y)", {"x": (-2, 2), "y": (0, 3)}),
+    ("hypot(x, y) - atan2(y, x)", {"x": (1, 4), "y": (-2, 2)}),
+]
+SAMPLE_COUNTS = [1000, 10000]
+SUBDIVISIONS = [0, 16, 128]
+
+def get_grid_rows(ranges : dict, sample_count : int):
+    # sample_count points spread evenly, a square grid for two variables
+    names = list(ranges)
+    steps = max(2, round(sample_count ** (1 / len(names))))
+    rows = [{}]
+    for name in names:
+        lo, hi = ranges[name]
+        rows = [dict(row, **{name: lo + (hi - lo) * step_index / (steps - 1)}) for row in rows for step_index in range(steps)]
+    return rows
+
+def sample(compiled_expression, ranges : dict, sample_count : int):
+    '''
+    Returns list(elapsed_time: float, lo: float, hi: float, values: list[float])
+    '''
+    rows = get_grid_rows(ranges, sample_count)
+    start_time = time.perf_counter()
+    results = calc.evaluate_many(compiled_expression, rows)
+    values = [value for value, errors in results if len(errors) == 0]
+    elapsed_time = time.perf_counter() - start_time
+    return (elapsed_time, min(values), max(values), values)
+
+def main():
+    print(f"{'expression':<30} {'method':<14} {'seconds':>9} {'lo':>12} {'hi':>12} {'width ratio':>12}")
+    failures = []
+    for expression, ranges in CASES:
+        compiled_expression, errors = calc.compile(expression, engine = "float", codegen = True)
+        assert len(errors) == 0, errors
+        interval_expression, errors = calc.compile(expression, engine = "interval")
+        assert len(errors) == 0, errors
+        sampled_values = []
+        reference_width = None
+        for sample_count in SAMPLE_COUNTS:
+            elapsed_time, lo, hi, values = sample(compiled_expression, ranges, sample_count)
+            sampled_values += values
+            reference_width = hi - lo
+            print(f"{expression:<30} {f'sample {sample_count}':<14} {elapsed_time:>9.4f} {lo:>12.6g} {hi:>12.6g} {1:>12.2f}")
+        for subdivisions in SUBDIVISIONS:
+            start_time = time.perf_counter()
+            enclosure, errors = calc.bound(interval_expression, ranges, subdivisions)
+            elapsed_time = time.perf_counter() - start_time
+            assert len(errors) == 0, errors
+            outside_values = [value for value in sampled_values if value not in enclosure]
+            if (len(outside_values) > 0):
+                failures.append((expression, subdivisions, outside_values[0], enclosure))
+            print(f"{expression:<30} {f'bound {subdivisions}':<14} {elapsed_time:>9.4f} {enclosure.lo:>12.6g} {enclosure.hi:>12.6g} {enclosure.width()/reference_width:>12.2f}")
+    for expression, subdivisions, value, enclosure in failures:
+        print(f"{expression} sampled {value!r} outside {enclosure} of bound {subdivisions}")
+    if (len(failures) > 0):
+        print("FAILED")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/bin/env python3
+'''
+Lexer throughput and memory on generated 10 KB and 1 MB expressions.
+Reports MB/s, tokens/s and the peak traced memory per token of the returned token list.
+
+    python3 benchmarks/bench_lex.py
+'''
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import calc
+
+SIZES = [("10 KB", 10 * 1024), ("1 MB", 1024 * 1024)]
+REPEATS = 5
+
+def generate_expression(size : int):
+    random_generator = random.Random(0)
+    terms = ["12.5", "sin(pi/4)", "3^2", "(1-deg2rad)", "sqrt(2)", "-7", "x_1"]
+    parts = []
+    length = 0
+    while (length < size):
+        part = random_generator.choice(terms) + random_generator.choice([" + ", "*", " - ", "/"])
+        parts.append(part)
+        length += len(part)
+    return ("".join(parts) + "1")[:size]
+
+def main():
+    print(f"{'input':>6} {'tokens':>9} {'seconds':>9} {'MB/s':>7} {'tokens/s':>11} {'peak bytes/token':>17}")
+    for label, size in SIZES:
+        expression = generate_expression(size)
+        best_time = None
+        for repeat_index in range(REPEATS):
+            start_time = time.perf_counter()
+            tokens = calc.lex(expression, allow_variables = True)
+            elapsed_time = time.perf_counter() - start_time
+            best_time = elapsed_time if best_time is None else min(best_time, elapsed_time)
+        del tokens
+
+        tracemalloc.start()
+        tokens = calc.lex(expression, allow_variables = True)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(f"{label:>6} {len(tokens):>9} {best_time:>9.4f} {len(expression)/best_time/1e6:>7.2f} {len(tokens)/best_time:>11.0f} {peak_bytes/len(tokens):>17.1f}")
+
+if __name__ == "__main__":
+    main()
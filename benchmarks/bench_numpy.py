@@ -0,0 +1,50 @@
+#!/bin/env python3
+'''
+Compares evaluate_array() with the numpy backend against the scalar stack machine
+(evaluate_many()) at 1e3, 1e5 and 1e7 elements.
+
+The scalar path is timed on at most SCALAR_SAMPLE_LIMIT elements and extrapolated,
+running it over 1e7 elements would take minutes.
+
+    python3 benchmarks/bench_numpy.py
+'''
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import calc
+
+EXPRESSION = "x^2 + 3*x - sqrt(x)/log10(x+1) + cosec(x)"
+SIZES = [10**3, 10**5, 10**7]
+SCALAR_SAMPLE_LIMIT = 20000
+
+def main():
+    numpy = calc.import_numpy()
+    if (numpy is None):
+        print("numpy is not installed, nothing to compare against")
+        sys.exit(1)
+    compiled_expression, errors = calc.compile(EXPRESSION)
+    assert len(errors) == 0, errors
+
+    print(f"expression: {EXPRESSION}")
+    print(f"{'elements':>10} {'numpy s':>10} {'numpy elem/s':>14} {'scalar s':>10} {'scalar elem/s':>14} {'speedup':>9}")
+    for size in SIZES:
+        x = numpy.linspace(0.5, 100, size)
+
+        start_time = time.perf_counter()
+        values, errors = calc.evaluate_array(compiled_expression, {"x": x})
+        numpy_time = time.perf_counter() - start_time
+        assert len(errors) == 0, errors
+
+        sample_size = min(size, SCALAR_SAMPLE_LIMIT)
+        rows = [{"x": value} for value in x[:sample_size].tolist()]
+        start_time = time.perf_counter()
+        calc.evaluate_many(compiled_expression, rows)
+        scalar_time = (time.perf_counter() - start_time) * (size / sample_size)
+
+        print(f"{size:>10} {numpy_time:>10.4f} {size/numpy_time:>14.0f} {scalar_time:>10.3f} {size/scalar_time:>14.0f} {scalar_time/numpy_time:>8.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+#!/bin/env python3
+'''
+Compares repeated evaluation of parameterized formulas compiled with and without optimize=True,
+and reports how many program instructions the optimizer removed.
+
+    python3 benchmarks/bench_optimize.py [iterations]
+'''
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import calc
+
+EXPRESSIONS = [
+    "deg2rad*180/pi*x",
+    "sin(x*deg2rad)^2 + cos(x*deg2rad)^2",
+    "sqrt(2)/2*x + pi/4*1 + 0",
+    "(x+1)*(x+1) - 2*(x+1) + log10(1000)^1",
+]
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    variables = {"x": 30}
+    print(f"{'expression':<40} {'instructions':>12} {'eliminated':>10} {'plain ops/s':>12} {'optimized ops/s':>16} {'speedup':>8}")
+    for expression in EXPRESSIONS:
+        plain_expression, errors = calc.compile(expression)
+        optimized_expression, errors = calc.compile(expression, optimize = True)
+        plain_time = timeit.timeit(lambda: plain_expression.evaluate(variables), number = iterations)
+        optimized_time = timeit.timeit(lambda: optimized_expression.evaluate(variables), number = iterations)
+        print(f"{expression:<40} {len(plain_expression.program):>12} {optimized_expression.eliminated_node_count:>10} {iterations/plain_time:>12.0f} {iterations/optimized_time:>16.0f} {plain_time/optimized_time:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/bin/env python3
+'''
+Scaling benchmark for the parallel batch mode, reports throughput of run_batch() at
+1, 2, 4 and 8 worker processes against the single process path.
+
+    python3 benchmarks/bench_parallel.py [line_count] [chunk_size]
+'''
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import calc
+
+WORKER_COUNTS = [1, 2, 4, 8]
+
+def write_corpus(path : str, line_count : int):
+    random_generator = random.Random(0)
+    with open(path, "w") as corpus_file:
+        for line_index in range(line_count):
+            a = random_generator.randint(1, 999)
+            b = random_generator.random()
+            c = random_generator.randint(1, 9)
+            corpus_file.write(f"({a}+{c})*sin({b:.4f})/{c} - sqrt({a})^2 + -{c}\n")
+
+def time_batch(input_path : str, jobs : int, chunk_size : int):
+    start_time = time.perf_counter()
+    calc.run_batch(input_path, os.devnull, jobs, chunk_size)
+    return time.perf_counter() - start_time
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else calc.DEFAULT_BATCH_CHUNK_SIZE
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = os.path.join(temp_dir, "corpus.txt")
+        write_corpus(input_path, line_count)
+        print(f"{line_count} lines, chunk size {chunk_size}, {os.cpu_count()} cpu(s)")
+        serial_time = time_batch(input_path, 1, chunk_size)
+        print(f"{'workers':>8} {'seconds':>9} {'lines/s':>10} {'speedup':>8}")
+        print(f"{'serial':>8} {serial_time:>9.3f} {line_count/serial_time:>10.0f} {1:>7.2f}x")
+        for jobs in WORKER_COUNTS:
+            if (jobs == 1):
+                # run_batch only uses the pool for jobs > 1, time a one worker pool directly
+                start_time = time.perf_counter()
+                with open(input_path) as input_file, open(os.devnull, "w") as output_file:
+                    output_file.writelines(calc.evaluate_batch_lines_parallel(input_file, 1, chunk_size))
+                elapsed_time = time.perf_counter() - start_time
+            else:
+                elapsed_time = time_batch(input_path, jobs, chunk_size)
+            print(f"{jobs:>8} {elapsed_time:>9.3f} {line_count/elapsed_time:>10.0f} {serial_time/elapsed_time:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/bin/env python3
+'''
+Load test for the --serve mode. Starts a server on a temporary Unix socket, then runs every
+(connections, pipeline depth) pair of LOAD_PATTERNS: each connection is a thread that sends depth
+requests, reads their results and repeats. Reports requests/s and p50/p99 latency, a request's latency
+being the time from sending its batch to receiving its result. For comparison the latency of running
+calc.py once per expression is measured too.
+
+    python3 benchmarks/bench_server.py [requests_per_pattern] [jobs] [line|length]
+'''
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+CALC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "calc.py")
+sys.path.insert(0, os.path.dirname(CALC_PATH))
+import calc
+
+LOAD_PATTERNS = [(1, 1), (1, 64), (8, 1), (8, 64), (32, 16)]
+EXPRESSIONS = ["(1+2)*3", "sqrt(2)/2 + sin(pi/4)", "-(4-7)^2 * 1.5", "log10(1000) + log2(8)", "1/3 + 1/7", "1/0"]
+SUBPROCESS_SAMPLES = 10
+
+def wait_for_server(address : str, framing : str, timeout : float = 10):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            with calc.ServerClient(address, framing) as client:
+                client.evaluate("1")
+            return
+        except OSError:
+            if (time.perf_counter() > deadline):
+                raise
+            time.sleep(0.05)
+
+def run_connection(address : str, framing : str, request_count : int, depth : int, latencies : list):
+    with calc.ServerClient(address, framing) as client:
+        sent_count = 0
+        while (sent_count < request_count):
+            batch = [EXPRESSIONS[(sent_count + index) % len(EXPRESSIONS)] for index in range(min(depth, request_count - sent_count))]
+            start_time = time.perf_counter()
+            client.send(batch)
+            for expression in batch:
+                client.receive()
+                latencies.append(time.perf_counter() - start_time)
+            sent_count += len(batch)
+
+def run_pattern(address : str, framing : str, request_count : int, connection_count : int, depth : int):
+    latencies = []
+    threads = [threading.Thread(target = run_connection, args = (address, framing, request_count // connection_count, depth, latencies)) for index in range(connection_count)]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed_time = time.perf_counter() - start_time
+    latencies.sort()
+    return (len(latencies) / elapsed_time, latencies[len(latencies) // 2], latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)])
+
+def time_subprocess_latency():
+    start_time = time.perf_counter()
+    for sample_index in range(SUBPROCESS_SAMPLES):
+        subprocess.run([sys.executable, CALC_PATH, EXPRESSIONS[sample_index % len(EXPRESSIONS)]], stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+    return (time.perf_counter() - start_time) / SUBPROCESS_SAMPLES
+
+def main():
+    request_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    jobs = sys.argv[2] if len(sys.argv) > 2 else str(os.cpu_count())
+    framing = sys.argv[3] if len(sys.argv) > 3 else calc.SERVER_FRAMING_LINE
+    with tempfile.TemporaryDirectory() as temp_dir:
+        address = os.path.join(temp_dir, "calc.sock")
+        server = subprocess.Popen([sys.executable, CALC_PATH, "--serve", address, "--jobs", jobs, "--framing", framing], stderr = subprocess.DEVNULL)
+        try:
+            wait_for_server(address, framing)
+            print(f"{request_count} requests per pattern, {jobs} worker(s), {framing} framing")
+            print(f"{'connections':>11} {'depth':>6} {'requests/s':>11} {'p50 ms':>8} {'p99 ms':>8}")
+            for connection_count, depth in LOAD_PATTERNS:
+                requests_per_second, p50, p99 = run_pattern(address, framing, request_count, connection_count, depth)
+                print(f"{connection_count:>11} {depth:>6} {requests_per_second:>11.0f} {p50*1e3:>8.3f} {p99*1e3:>8.3f}")
+        finally:
+            server.terminate()
+            server.wait()
+    print(f"one calc.py process per expression: {time_subprocess_latency()*1e3:.1f} ms per request")
+
+if __name__ == "__main__":
+    main()
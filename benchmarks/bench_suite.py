@@ -0,0 +1,210 @@
+#!/bin/env python3
+'''
+Benchmark suite with a regression gate. Times lex(), tokens_to_postfix() and evaluation
+(build_program() + run_program(), as in eval_lex_tokens()) separately on generated corpora:
+  short     - many small expressions
+  long      - few expressions of thousands of terms
+  nested    - deeply bracketed expressions
+  functions - function heavy expressions
+  unary     - unary minus heavy expressions
+For every corpus and stage it reports expressions per second and the tracemalloc peak of one pass, the
+best of ROUNDS rounds over all corpora.
+
+    python3 benchmarks/bench_suite.py [--save FILE] [--baseline FILE] [--threshold PERCENT] [--corpus NAME]
+
+--save writes the results as JSON. --baseline compares against an earlier --save and exits with status 1
+when a stage got slower, or its peak memory grew, by more than --threshold percent (default 10).
+Peak memory repeats exactly between runs, speed only on a quiet machine: on shared or virtual machines
+raise --threshold or compare memory alone with a large one.
+'''
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import calc
+
+RESULTS_FORMAT_VERSION = 1
+MIN_SECONDS = 0.2
+ROUNDS = 3
+TRACED_PASSES = 3
+DEFAULT_THRESHOLD_PERCENT = 10
+STAGES = ["lex", "postfix", "eval"]
+
+def generate_short_corpus(random_generator : random.Random):
+    operators = ["+", "-", "*", "/"]
+    expressions = []
+    for expression_index in range(1000):
+        operands = [str(random_generator.randint(1, 999)) if random_generator.random() < 0.7 else f"{random_generator.uniform(0, 100):.3f}" for operand_index in range(random_generator.randint(2, 5))]
+        expression = operands[0]
+        for operand in operands[1:]:
+            expression += f" {random_generator.choice(operators)} {operand}"
+        expressions.append(expression)
+    return expressions
+
+def generate_long_corpus(random_generator : random.Random):
+    operators = ["+", "-", "*", "/"]
+    expressions = []
+    for expression_index in range(5):
+        terms = [f"({random_generator.randint(1, 99)}{random_generator.choice(operators)}{random_generator.randint(1, 99)})" for term_index in range(2000)]
+        expressions.append(" + ".join(terms))
+    return expressions
+
+def generate_nested_corpus(random_generator : random.Random):
+    expressions = []
+    for expression_index in range(20):
+        expression = "1"
+        for depth in range(300):
+            expression = f"({expression}{random_generator.choice(['+', '-', '*'])}{random_generator.randint(1, 3)})"
+        function_expression = "0.5"
+        for depth in range(100):
+            function_expression = f"{random_generator.choice(['sin', 'cos', 'atan'])}({function_expression})"
+        expressions.append(expression)
+        expressions.append(function_expression)
+    return expressions
+
+def generate_functions_corpus(random_generator : random.Random):
+    function_templates = ["sqrt({0})", "sin({1})", "cos({1})", "tan({2})", "log10({0})", "log2({0})", "atan({1})", "asin({2})", "acos({2})", "cosec({0})", "sec({2})", "cot({0})"]
+    expressions = []
+    for expression_index in range(500):
+        calls = [random_generator.choice(function_templates).format(random_generator.randint(1, 99), f"{random_generator.uniform(-3, 3):.4f}", f"{random_generator.uniform(-0.9, 0.9):.4f}") for call_index in range(5)]
+        expressions.append(" + ".join(calls) + " * pi")
+    return expressions
+
+def generate_unary_corpus(random_generator : random.Random):
+    expressions = []
+    for expression_index in range(200):
+        terms = [f"-{random_generator.randint(1, 9)}*-{random_generator.randint(1, 9)}" if random_generator.random() < 0.5 else f"-(-{random_generator.randint(1, 9)})" for term_index in range(25)]
+        expressions.append("+".join(terms))
+    return expressions
+
+CORPUS_GENERATORS = {
+    "short": generate_short_corpus,
+    "long": generate_long_corpus,
+    "nested": generate_nested_corpus,
+    "functions": generate_functions_corpus,
+    "unary": generate_unary_corpus,
+}
+
+def evaluate_postfix(post_fix_token_list : list):
+    program, errors = calc.build_program(post_fix_token_list)
+    return calc.run_program(program)
+
+def measure_stage(function, inputs : list):
+    '''
+    Returns list(outputs: list, expressions_per_second: float, peak_bytes: int)
+    '''
+    # collections triggered by earlier stages would land in whichever pass runs next
+    best_time = None
+    total_time = 0
+    gc.collect()
+    gc.disable()
+    try:
+        while (total_time < MIN_SECONDS):
+            start_time = time.perf_counter()
+            for argument in inputs:
+                function(argument)
+            elapsed_time = time.perf_counter() - start_time
+            total_time += elapsed_time
+            best_time = elapsed_time if best_time is None else min(best_time, elapsed_time)
+    finally:
+        gc.enable()
+
+    # the first traced passes still see one time allocations, the smallest of TRACED_PASSES peaks is stable
+    peak_bytes = None
+    for pass_index in range(TRACED_PASSES):
+        tracemalloc.start()
+        outputs = [function(argument) for argument in inputs]
+        pass_peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        peak_bytes = pass_peak_bytes if peak_bytes is None else min(peak_bytes, pass_peak_bytes)
+    return (outputs, len(inputs) / best_time, peak_bytes)
+
+def run_corpus(expressions : list):
+    results = {}
+    tokens_list, ops_per_second, peak_bytes = measure_stage(calc.lex, expressions)
+    results["lex"] = {"ops_per_second": ops_per_second, "peak_bytes": peak_bytes}
+
+    postfix_results, ops_per_second, peak_bytes = measure_stage(calc.tokens_to_postfix, tokens_list)
+    results["postfix"] = {"ops_per_second": ops_per_second, "peak_bytes": peak_bytes}
+    post_fix_token_lists = []
+    for post_fix_token_list, errors in postfix_results:
+        assert len(errors) == 0, errors
+        post_fix_token_lists.append(post_fix_token_list)
+
+    eval_results, ops_per_second, peak_bytes = measure_stage(evaluate_postfix, post_fix_token_lists)
+    results["eval"] = {"ops_per_second": ops_per_second, "peak_bytes": peak_bytes}
+    for evaluated_value, errors in eval_results:
+        assert len(errors) == 0, errors
+    return results
+
+def merge_results(best_results : dict, round_results : dict):
+    '''
+    Returns the best ops_per_second and the smallest peak_bytes of every stage in best_results and round_results.
+    '''
+    if (best_results is None):
+        return round_results
+    return {stage: {"ops_per_second": max(best_results[stage]["ops_per_second"], round_results[stage]["ops_per_second"]), "peak_bytes": min(best_results[stage]["peak_bytes"], round_results[stage]["peak_bytes"])} for stage in STAGES}
+
+def compare_results(results : dict, baseline : dict, threshold_percent : float):
+    '''
+    Prints the change of every stage against baseline. Returns the number of regressions.
+    '''
+    regression_count = 0
+    print(f"\ncompared with baseline, threshold {threshold_percent}%")
+    print(f"{'corpus':<10} {'stage':<8} {'ops/s change':>13} {'peak change':>12}")
+    for corpus_name, stage_results in results.items():
+        for stage in STAGES:
+            baseline_stage = baseline.get(corpus_name, {}).get(stage)
+            if (baseline_stage is None):
+                print(f"{corpus_name:<10} {stage:<8} {'not in baseline':>26}")
+                continue
+            speed_change = (stage_results[stage]["ops_per_second"] / baseline_stage["ops_per_second"] - 1) * 100
+            memory_change = (stage_results[stage]["peak_bytes"] / max(1, baseline_stage["peak_bytes"]) - 1) * 100
+            is_regression = speed_change < -threshold_percent or memory_change > threshold_percent
+            regression_count += 1 if is_regression else 0
+            print(f"{corpus_name:<10} {stage:<8} {speed_change:>+12.1f}% {memory_change:>+11.1f}%{'  REGRESSION' if is_regression else ''}")
+    return regression_count
+
+def main():
+    parser = argparse.ArgumentParser(description = "calc benchmark suite")
+    parser.add_argument("--save", metavar = "FILE", help = "write the results as JSON")
+    parser.add_argument("--baseline", metavar = "FILE", help = "compare with results saved by --save")
+    parser.add_argument("--threshold", metavar = "PERCENT", type = float, default = DEFAULT_THRESHOLD_PERCENT, help = "allowed slowdown or memory growth")
+    parser.add_argument("--corpus", choices = list(CORPUS_GENERATORS), action = "append", help = "run only this corpus, can repeat")
+    arguments = parser.parse_args()
+
+    results = {}
+    print(f"{'corpus':<10} {'exprs':>6} {'tokens':>8} " + " ".join([f"{stage + ' ops/s':>13} {stage + ' peak KB':>14}" for stage in STAGES]))
+    corpora = {corpus_name: CORPUS_GENERATORS[corpus_name](random.Random(0)) for corpus_name in (arguments.corpus or list(CORPUS_GENERATORS))}
+    # rounds go over all corpora in turn, so a slow spell of the machine costs one round instead of one corpus
+    for round_index in range(ROUNDS):
+        for corpus_name, expressions in corpora.items():
+            results[corpus_name] = merge_results(results.get(corpus_name), run_corpus(expressions))
+    for corpus_name, expressions in corpora.items():
+        token_count = sum([len(calc.lex(expression)) for expression in expressions])
+        columns = " ".join([f"{results[corpus_name][stage]['ops_per_second']:>13.0f} {results[corpus_name][stage]['peak_bytes']/1024:>14.1f}" for stage in STAGES])
+        print(f"{corpus_name:<10} {len(expressions):>6} {token_count:>8} {columns}")
+
+    if (arguments.save is not None):
+        with open(arguments.save, "w") as results_file:
+            json.dump({"format_version": RESULTS_FORMAT_VERSION, "calc_version": f"{calc.APP_VERSION_MAJOR}.{calc.APP_VERSION_MINOR}", "python": platform.python_version(), "time": time.time(), "results": results}, results_file, indent = 2)
+        print(f"\nresults saved to {arguments.save}")
+    if (arguments.baseline is not None):
+        with open(arguments.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if (baseline.get("format_version") != RESULTS_FORMAT_VERSION):
+            print(f"{arguments.baseline} has an unsupported format version", file = sys.stderr)
+            sys.exit(2)
+        if (compare_results(results, baseline["results"], arguments.threshold) > 0):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/bin/env python3
+'''
+Regression benchmark for unary minus handling on long expressions like "-1*-2+-3*-4...".
+Time per term should stay flat as the term count grows, the conversion is a single linear pass.
+
+    python3 benchmarks/bench_unary.py
+'''
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import calc
+
+TERM_COUNTS = [1000, 10000, 100000]
+
+def generate_expression(term_count : int):
+    return "+".join([f"-{term_index % 97 + 1}*-{term_index % 7 + 1}" for term_index in range(term_count // 2)])
+
+def main():
+    print(f"{'terms':>8} {'lex s':>8} {'postfix s':>10} {'eval s':>8} {'us/term':>8}")
+    for term_count in TERM_COUNTS:
+        expression = generate_expression(term_count)
+
+        start_time = time.perf_counter()
+        tokens = calc.lex(expression)
+        lex_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        post_fix_token_list, errors = calc.tokens_to_postfix(tokens)
+        postfix_time = time.perf_counter() - start_time
+        assert len(errors) == 0, errors
+
+        program, errors = calc.build_program(post_fix_token_list)
+        start_time = time.perf_counter()
+        evaluated_value, errors = calc.run_program(program)
+        eval_time = time.perf_counter() - start_time
+        assert len(errors) == 0, errors
+
+        total_time = lex_time + postfix_time + eval_time
+        print(f"{term_count:>8} {lex_time:>8.3f} {postfix_time:>10.3f} {eval_time:>8.3f} {total_time/term_count*1e6:>8.2f}")
+
+if __name__ == "__main__":
+    main()
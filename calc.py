@@ -1,9 +1,33 @@
 #!/bin/env python3
+'''
+Expression calculator, usable as a command line tool (see main()) and as a library:
+
+    import calc
+    evaluated_value, errors = calc.evaluate("x^2 + 3*x", {"x": 2.5})
+    compiled_expression, errors = calc.compile("sqrt(x)/2", engine = "float")
+
+Errors are returned as lists of messages rather than raised. Importing has no side effects, and the
+optional backends (numpy, asyncio, socket, concurrent.futures, fractions) are imported on first use.
+'''
 
 import math
 import decimal
+import builtins
+import contextlib
 import sys
 import typing
+import collections
+import itertools
+import logging
+import re
+
+__all__ = [
+    "lex", "compile", "evaluate", "evaluate_many", "gradient", "bound", "evaluate_array", "CompiledExpression",
+    "Token", "TokenError", "FrameError", "get_lex_errors",
+    "NumericEngine", "FloatEngine", "DecimalEngine", "FractionEngine", "IntervalEngine", "Interval", "set_default_engine",
+    "KNOWN_CONSTS", "KNOWN_FUNCTIONS", "register_function", "define_function", "ExpressionFunction", "set_debug_output", "set_result_cache_size", "set_expression_limits",
+    "run_batch", "run_bulk", "run_server", "ServerClient", "main",
+]
 
 APP_VERSION_MAJOR = 0
 APP_VERSION_MINOR = 4
@@ -19,21 +43,98 @@ def sec(x):
 def cot(x):
     return 1/math.tan(x)
 
-KNOWN_CONSTS = {"pi": math.pi, "e": math.e, "deg2rad": (math.pi/180), "rad2deg": (180/math.pi)}
+class VersionedDict(dict):
+    '''
+    dict which counts its modifications, so caches can tell when KNOWN_CONSTS or KNOWN_FUNCTIONS change.
+    '''
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+    def __setitem__(self, key, value):
+        self.version += 1
+        super().__setitem__(key, value)
+    def __delitem__(self, key):
+        self.version += 1
+        super().__delitem__(key)
+    def __ior__(self, other):
+        self.version += 1
+        return super().__ior__(other)
+    def clear(self):
+        self.version += 1
+        super().clear()
+    def pop(self, *args):
+        self.version += 1
+        return super().pop(*args)
+    def popitem(self):
+        self.version += 1
+        return super().popitem()
+    def setdefault(self, key, default = None):
+        self.version += 1
+        return super().setdefault(key, default)
+    def update(self, *args, **kwargs):
+        self.version += 1
+        super().update(*args, **kwargs)
+
+def get_namespace_version(namespace : dict):
+    # plain dicts (for example after KNOWN_CONSTS was reassigned) are compared by content
+    if (isinstance(namespace, VersionedDict)):
+        return (id(namespace), namespace.version)
+    return (id(namespace), tuple(namespace.items()))
+
+KNOWN_CONSTS = VersionedDict({"pi": math.pi, "e": math.e, "deg2rad": (math.pi/180), "rad2deg": (180/math.pi)})
+'''
+NOTE: These functions take numbers of the engine's type (see NumericEngine) as input and return a single number,
+one number unless FUNCTION_ARITIES says otherwise, see register_function() and define_function().
+While an entry still holds its default below, each engine uses its own native implementation instead.
+'''
+KNOWN_FUNCTIONS = VersionedDict({"sqrt": math.sqrt, "log10": log10, "log2": log2, "cos": math.cos, "sin": math.sin, "tan": math.tan, "cosec": cosec, "sec": sec, "cot": cot, "acos": math.acos, "asin": math.asin, "atan": math.atan,
+                                 "min": min, "max": max, "hypot": math.hypot, "atan2": math.atan2, "pow": math.pow})
+DEFAULT_CONSTS = dict(KNOWN_CONSTS)
+DEFAULT_FUNCTIONS = dict(KNOWN_FUNCTIONS)
+# argument count of each KNOWN_FUNCTIONS entry which does not take exactly one number
+FUNCTION_ARITIES = {"min": 2, "max": 2, "hypot": 2, "atan2": 2, "pow": 2}
+# two argument functions which also take more arguments, min(a, b, c) is evaluated as min(min(a, b), c)
+VARIADIC_FUNCTIONS = {"min", "max", "hypot"}
+
 '''
-NOTE: These functions take a single decimal.Decimal as input and returns a single Decimal.Decimal
+Debug output goes through the "calc" logger. Messages use lazy %-style arguments so nothing is formatted
+unless the level is enabled, and per token messages sit behind a trace_enabled local read once per call,
+so a disabled logger costs one branch per token. LOG_LEVEL_TRACE shows per token detail, logging.DEBUG
+per stage summaries. Disabled (logging.WARNING) by default.
 '''
-KNOWN_FUNCTIONS = {"sqrt": math.sqrt, "log10": log10, "log2": log2, "cos": math.cos, "sin": math.sin, "tan": math.tan, "cosec": cosec, "sec": sec, "cot": cot, "acos": math.acos, "asin": math.asin, "atan": math.atan}
+LOG_LEVEL_TRACE = 5
+logging.addLevelName(LOG_LEVEL_TRACE, "TRACE")
+LOGGER = logging.getLogger("calc")
+LOGGER.addHandler(logging.NullHandler())
+LOGGER.setLevel(logging.WARNING)
+DEBUG_OUTPUT_HANDLER = None
 
-ENABLED_DEBUG_OUTPUT = True
-def console_output_debug_msg(message : str, end = "\n"):
-    if ENABLED_DEBUG_OUTPUT: print(f"[debug]: {message}", end = end)
+def set_debug_output(enabled : bool, level : int = LOG_LEVEL_TRACE):
+    '''
+    Prints calc debug messages as "[debug]: ..." on stdout when enabled, up to level.
+    '''
+    global DEBUG_OUTPUT_HANDLER
+    if (not enabled):
+        LOGGER.setLevel(logging.WARNING)
+        return
+    if (DEBUG_OUTPUT_HANDLER is None):
+        DEBUG_OUTPUT_HANDLER = logging.StreamHandler(sys.stdout)
+        DEBUG_OUTPUT_HANDLER.setFormatter(logging.Formatter("[debug]: %(message)s"))
+        LOGGER.addHandler(DEBUG_OUTPUT_HANDLER)
+    LOGGER.setLevel(level)
+
+def is_debug_output_enabled():
+    return LOGGER.isEnabledFor(logging.DEBUG)
 
 class TokenError:
     TYPE_NONE = 0
     TYPE_UNKNOWN_CHAR = 1
     TYPE_UNKNOWN_IDENTIFIER = 2
     TYPE_DECIMAL_POINT_COUNT = 3
+    TYPE_EXPRESSION_TOO_LONG = 4
+    TYPE_TOO_MANY_TOKENS = 5
+    TYPE_NESTING_TOO_DEEP = 6
+    TYPE_TOO_MANY_ERRORS = 7
     def __init__(self):
         self.string = ""
         self.type = TokenError.TYPE_NONE
@@ -52,6 +153,8 @@ class Token:
     TYPE_OPEN_BRACKET = 9
     TYPE_CLOSE_BRACKET = 10
     TYPE_FUNCTION = 11
+    TYPE_NEGATION = 12
+    TYPE_COMMA = 13
     def get_str_from_type_enum(enum_type: TYPE_NONE):
         if (enum_type == Token.TYPE_BAD):
             return "Bad"
@@ -79,10 +182,15 @@ class Token:
             return "Close bracket"
         elif (enum_type == Token.TYPE_FUNCTION):
             return "Function"
+        elif (enum_type == Token.TYPE_NEGATION):
+            return "Negation"
+        elif (enum_type == Token.TYPE_COMMA):
+            return "Comma"
         else:
             return "Unknown"
 
     # Object specific methods
+    __slots__ = ("lexeame", "type", "char_index", "error_object")
     def __init__(self, lexeame: str = "", token_type: int = TYPE_NONE, char_index: int = 0, error_object: TokenError = None):
         self.lexeame = lexeame
         self.type = token_type
@@ -91,87 +199,178 @@ class Token:
     def get_type_str(self):
         return Token.get_str_from_type_enum(self.type)
 
-def lex(expression : str):
-    skip_char_count = 0
-    tokens = []
-    for char_index, char in enumerate(expression):
-        if (skip_char_count > 0):
-            skip_char_count -= 1
-            continue
-        if (char.isspace()):
+'''
+Limits on untrusted input, see set_expression_limits(). lex() rejects expressions longer than
+MAX_EXPRESSION_LENGTH chars, with more than MAX_TOKEN_COUNT tokens or brackets nested deeper than
+MAX_NESTING_DEPTH, tokens_to_postfix() rejects anything which would put more than MAX_NESTING_DEPTH
+operators on its stack (for example long chains of functions or unary minus). Both stop at the first
+violation, so rejecting an input costs about as much as the part in front of the violation, and the
+stacks of tokens_to_postfix(), run_program() and the other stack machines stay within the depth limit.
+'''
+MAX_EXPRESSION_LENGTH = 1 << 20
+MAX_TOKEN_COUNT = 1 << 20
+MAX_NESTING_DEPTH = 1000
+
+def set_expression_limits(max_length : int = None, max_token_count : int = None, max_depth : int = None):
+    '''
+    Sets the limits which are given, see MAX_EXPRESSION_LENGTH, MAX_TOKEN_COUNT and MAX_NESTING_DEPTH.
+    '''
+    global MAX_EXPRESSION_LENGTH, MAX_TOKEN_COUNT, MAX_NESTING_DEPTH
+    if (max_length is not None):
+        MAX_EXPRESSION_LENGTH = max_length
+    if (max_token_count is not None):
+        MAX_TOKEN_COUNT = max_token_count
+    if (max_depth is not None):
+        MAX_NESTING_DEPTH = max_depth
+
+def get_expression_limits():
+    '''
+    Returns list(max_length: int, max_token_count: int, max_depth: int)
+    '''
+    return (MAX_EXPRESSION_LENGTH, MAX_TOKEN_COUNT, MAX_NESTING_DEPTH)
+
+def create_limit_token(error_type : int, message : str, char_index : int):
+    error_object = TokenError()
+    error_object.type = error_type
+    error_object.string = message
+    return Token("", Token.TYPE_BAD, char_index, error_object)
+
+# Splits an expression into lexemes, every char ends up in exactly one match: whitespace runs, numbers,
+# names, and single chars (operators, brackets and anything unknown).
+LEX_PATTERN = re.compile(r"\s+|\d+\.?\d*|\.\d+|[^\W\d]\w*|.", re.DOTALL)
+LEX_SINGLE_CHAR_TYPES = {'+': Token.TYPE_ADDITION, '-': Token.TYPE_SUBTRACTION, '*': Token.TYPE_MULTIPLICATION, '/': Token.TYPE_DIVISION, '^': Token.TYPE_EXPONENT, '(': Token.TYPE_OPEN_BRACKET, ')': Token.TYPE_CLOSE_BRACKET, ',': Token.TYPE_COMMA}
+LEX_CHUNK_SIZE = 1 << 14
+# lex() stops after this many bad tokens, the error list of a garbage input stays short
+LEX_MAX_ERROR_COUNT = 100
+
+LEX_BRACKET_PATTERN = re.compile(r"[()]")
+LEX_BRACKET_DEPTH_CHANGES = {"(": 1, ")": -1}
+
+def iterate_lexeme_chunks(expression : str, end_index : int):
+    '''
+    Generator, yields LEX_PATTERN.findall() lists of consecutive LEX_CHUNK_SIZE slices of expression[:end_index],
+    so a lexer which stops early has not scanned the rest. A lexeme can only be cut short at the slice end,
+    so the last lexeme of a slice is left to the next one.
+    '''
+    start_index = 0
+    chunk_size = LEX_CHUNK_SIZE
+    while (start_index + chunk_size < end_index):
+        lexemes = LEX_PATTERN.findall(expression, start_index, start_index + chunk_size)
+        if (len(lexemes) == 1):
+            # a single lexeme longer than the slice, for example a long number
+            chunk_size *= 2
             continue
-        if (char.isdigit() or char == '.'):
-            decimal_count = 0
-            cur_token = Token()
-            cur_token.char_index = char_index
-            cur_token.type = Token.TYPE_NUMBER
-            cur_token.lexeame = ""
-            skip_char_count = -1
-            for char_index in range(char_index, len(expression)):
-                char = expression[char_index]
-                if (char == '.'):
-                    decimal_count += 1
-                    if (decimal_count > 1):
-                        cur_token.type = Token.TYPE_BAD
-                        cur_token.error_object = TokenError()
-                        cur_token.error_object.type = TokenError.TYPE_DECIMAL_POINT_COUNT
-                        cur_token.error_object.string = f"Number cannot have more than one decimal point"
+        start_index += chunk_size - len(lexemes.pop())
+        chunk_size = LEX_CHUNK_SIZE
+        yield lexemes
+    yield LEX_PATTERN.findall(expression, start_index, end_index)
+
+def find_too_deep_bracket(expression : str, max_depth : int):
+    '''
+    Returns the char index of the first '(' nested deeper than max_depth, None when there is none.
+    '''
+    if (expression.count("(") <= max_depth):
+        return None
+    # the running depth is summed in C one LEX_CHUNK_SIZE slice at a time, only a slice which exceeds the
+    # limit is searched for the position
+    depth = 0
+    for start_index in range(0, len(expression), LEX_CHUNK_SIZE):
+        end_index = start_index + LEX_CHUNK_SIZE
+        brackets = LEX_BRACKET_PATTERN.findall(expression, start_index, end_index)
+        depths = list(itertools.accumulate(map(LEX_BRACKET_DEPTH_CHANGES.__getitem__, brackets), initial = depth))
+        if (max(depths) > max_depth):
+            for match in LEX_BRACKET_PATTERN.finditer(expression, start_index, end_index):
+                depth += LEX_BRACKET_DEPTH_CHANGES[match.group()]
+                if (depth > max_depth):
+                    return match.start()
+        depth = depths[-1]
+    return None
+
+def lex(expression : str, allow_variables : bool = False):
+    '''
+    Single pass over expression, LEX_PATTERN does the scanning and each lexeme becomes at most one Token.
+    allow_variables : names which are not known constants or functions become Token.TYPE_IDENTIFIER
+                      tokens (free variables) instead of errors.
+    Input over the expression limits, or with more than LEX_MAX_ERROR_COUNT errors, ends in a Token.TYPE_BAD
+    token and the rest is not scanned.
+    '''
+    expression_length = len(expression)
+    if (expression_length > MAX_EXPRESSION_LENGTH):
+        return [create_limit_token(TokenError.TYPE_EXPRESSION_TOO_LONG, f"Expression longer than {MAX_EXPRESSION_LENGTH} chars", MAX_EXPRESSION_LENGTH)]
+    max_token_count = MAX_TOKEN_COUNT
+    max_error_count = LEX_MAX_ERROR_COUNT
+    # scanning stops in front of a '(' nested too deep, so the tokens before it are still checked
+    too_deep_index = find_too_deep_bracket(expression, MAX_NESTING_DEPTH)
+    scan_length = expression_length if too_deep_index is None else too_deep_index
+    tokens = []
+    append = tokens.append
+    get_single_char_type = LEX_SINGLE_CHAR_TYPES.get
+    error_count = 0
+    end_index = 0
+    chunks = (LEX_PATTERN.findall(expression, 0, scan_length),) if scan_length <= LEX_CHUNK_SIZE else iterate_lexeme_chunks(expression, scan_length)
+    for lexemes in chunks:
+        # the limits are checked between chunks, a chunk holds at most LEX_CHUNK_SIZE tokens
+        if (len(tokens) > max_token_count or error_count >= max_error_count):
+            break
+        for lexeame in lexemes:
+            # matches are contiguous, so positions follow from the lexeme lengths
+            char_index = end_index
+            end_index += len(lexeame)
+            token_type = get_single_char_type(lexeame)
+            if (token_type is not None):
+                append(Token(lexeame, token_type, char_index, None))
+                continue
+            first_char = lexeame[0]
+            # a '.' without digits is a single char lexeme, left to the unknown char error
+            if (first_char.isdecimal() or (first_char == '.' and len(lexeame) > 1)):
+                if (end_index < expression_length and expression[end_index] == '.'):
+                    # the pattern already took the first '.', so the next one is a second decimal point
+                    error_object = TokenError()
+                    error_object.type = TokenError.TYPE_DECIMAL_POINT_COUNT
+                    error_object.string = f"Number cannot have more than one decimal point"
+                    append(Token(lexeame, Token.TYPE_BAD, char_index, error_object))
+                    error_count += 1
+                    if (error_count >= max_error_count):
                         break
-                    cur_token.lexeame += char
-                    skip_char_count += 1
-                elif (char.isdigit()):
-                    cur_token.lexeame += char
-                    skip_char_count += 1
                 else:
-                    break
-            tokens.append(cur_token)
-        elif (char.isalpha() or char == '_'):
-            cur_token = Token()
-            cur_token.char_index = char_index
-            cur_token.type = Token.TYPE_IDENTIFIER
-            cur_token.lexeame = ""
-            skip_char_count -= 1
-            for char_index in range(char_index, len(expression)):
-                char = expression[char_index]
-                if (char.isalnum() or char == '_'):
-                    cur_token.lexeame += char
-                    skip_char_count += 1
+                    append(Token(lexeame, Token.TYPE_NUMBER, char_index, None))
+            elif (first_char.isspace()):
+                continue
+            elif (first_char == '_' or first_char.isalnum()):
+                if (lexeame in KNOWN_CONSTS):
+                    append(Token(lexeame, Token.TYPE_CONST, char_index, None))
+                elif (lexeame in KNOWN_FUNCTIONS):
+                    append(Token(lexeame, Token.TYPE_FUNCTION, char_index, None))
+                elif (allow_variables):
+                    append(Token(lexeame, Token.TYPE_IDENTIFIER, char_index, None))
                 else:
-                    break
-            if (cur_token.lexeame in KNOWN_CONSTS.keys()):
-                cur_token.type = Token.TYPE_CONST
-            elif (cur_token.lexeame in KNOWN_FUNCTIONS.keys()):
-                cur_token.type = Token.TYPE_FUNCTION
-            else:
-                cur_token.type = Token.TYPE_BAD
-                cur_token.error_object = TokenError()
-                cur_token.error_object.type = TokenError.TYPE_UNKNOWN_IDENTIFIER
-                cur_token.error_object.string = f"Unknown constant or function \'{cur_token.lexeame}\'"
-            tokens.append(cur_token)
-        elif (char == '+'):
-            tokens.append(Token('+', Token.TYPE_ADDITION, char_index, None))
-        elif (char == '-'):
-            tokens.append(Token('-', Token.TYPE_SUBTRACTION, char_index, None))
-        elif (char == '*'):
-            tokens.append(Token('*', Token.TYPE_MULTIPLICATION, char_index, None))
-        elif (char == '/'):
-            tokens.append(Token('/', Token.TYPE_DIVISION, char_index, None))
-        elif (char == '^'):
-            tokens.append(Token('^', Token.TYPE_EXPONENT, char_index, None))
-        elif (char == '('):
-            tokens.append(Token('(', Token.TYPE_OPEN_BRACKET, char_index, None))
-        elif (char == ')'):
-            tokens.append(Token(')', Token.TYPE_CLOSE_BRACKET, char_index, None))
-        else:
-            error_object = TokenError()
-            error_object.type = TokenError.TYPE_UNKNOWN_CHAR
-            if (char.isprintable()):
-                print_char = f"\'{char}\'"
+                    error_object = TokenError()
+                    error_object.type = TokenError.TYPE_UNKNOWN_IDENTIFIER
+                    error_object.string = f"Unknown constant or function \'{lexeame}\'"
+                    append(Token(lexeame, Token.TYPE_BAD, char_index, error_object))
+                    error_count += 1
+                    if (error_count >= max_error_count):
+                        break
             else:
-                print_char = f"{ord(char)}"
-            error_object.string = f"Unknown char {print_char}"
-            token = Token("", Token.TYPE_BAD, char_index, error_object)
-            tokens.append(cur_token)
+                error_object = TokenError()
+                error_object.type = TokenError.TYPE_UNKNOWN_CHAR
+                if (first_char.isprintable()):
+                    print_char = f"\'{first_char}\'"
+                else:
+                    print_char = f"{ord(first_char)}"
+                error_object.string = f"Unknown char {print_char}"
+                append(Token("", Token.TYPE_BAD, char_index, error_object))
+                error_count += 1
+                if (error_count >= max_error_count):
+                    break
+    if (error_count >= max_error_count and end_index < scan_length):
+        append(create_limit_token(TokenError.TYPE_TOO_MANY_ERRORS, f"Stopped after {error_count} errors, the rest of the expression was not checked", end_index))
+    elif (len(tokens) > max_token_count):
+        char_index = tokens[max_token_count].char_index
+        del tokens[max_token_count:]
+        append(create_limit_token(TokenError.TYPE_TOO_MANY_TOKENS, f"Expression has more than {max_token_count} tokens", char_index))
+    elif (too_deep_index is not None):
+        append(create_limit_token(TokenError.TYPE_NESTING_TOO_DEEP, f"Expression nested deeper than {MAX_NESTING_DEPTH} levels", too_deep_index))
     return tokens
 
 def get_lex_error_count(tokens : typing.List[Token]):
@@ -181,141 +380,138 @@ def get_lex_error_count(tokens : typing.List[Token]):
             error_count += 1
     return error_count
 
-def print_lex_errors(tokens : typing.List[Token]):
-    error_count = 0
+def get_lex_errors(tokens : typing.List[Token]):
+    errors = []
     for token in tokens:
         if (token.type == Token.TYPE_BAD):
-            print(f"TOKEN ERROR: char {token.char_index+1}. {token.error_object.string}.")
-            error_count += 1
-    return error_count
+            errors.append(f"char {token.char_index+1}. {token.error_object.string}.")
+    return errors
+
+def print_lex_errors(tokens : typing.List[Token]):
+    errors = get_lex_errors(tokens)
+    for error in errors:
+        print(f"TOKEN ERROR: {error}")
+    return len(errors)
+
+def get_op_precedence(token_type : int):
+    # larger number greater precedence
+    if (token_type == Token.TYPE_NONE or token_type == Token.TYPE_OPEN_BRACKET):
+        return 0
+    if (token_type == Token.TYPE_ADDITION or token_type == Token.TYPE_SUBTRACTION):
+        return 1
+    if (token_type == Token.TYPE_MULTIPLICATION or token_type == Token.TYPE_DIVISION):
+        return 2
+    if (token_type == Token.TYPE_EXPONENT):
+        return 3
+    if (token_type == Token.TYPE_FUNCTION or token_type == Token.TYPE_NEGATION):
+        return 4
+    LOGGER.debug("get_precedence fn param not recognised token_type:%s", token_type)
+    return -1
+
+def is_operator(token_type : int):
+    if (token_type == Token.TYPE_ADDITION or token_type == Token.TYPE_SUBTRACTION):
+        return True
+    if (token_type == Token.TYPE_MULTIPLICATION or token_type == Token.TYPE_DIVISION):
+        return True
+    if (token_type == Token.TYPE_EXPONENT):
+        return True
+    if (token_type == Token.TYPE_FUNCTION or token_type == Token.TYPE_NEGATION):
+        return True
+    return False
+
+# a '-' directly after one of these is a subtraction, anywhere else it is a negation
+OPERAND_END_TYPES = (Token.TYPE_NUMBER, Token.TYPE_CONST, Token.TYPE_IDENTIFIER, Token.TYPE_CLOSE_BRACKET)
 
-def eval_lex_tokens(tokens : typing.List[Token]):
+def get_argument_count_error(function_token : Token, argument_count : int):
     '''
-    Returns list(evaluated_value: decimal.Decimal, errors: list[str])
-       evaluated_value : decimal.Decimal() or None on error.
-       errors : list[str], empty list on success.
+    Returns the error message for calling function_token with argument_count arguments, None when FUNCTION_ARITIES allows it.
     '''
-    tokens = tokens.copy()
-    def get_op_precedence(token_type : Token):
-        # larger number greater precedence
-        if (token_type == Token.TYPE_NONE or token_type == Token.TYPE_OPEN_BRACKET):
-            return 0
-        if (token_type == Token.TYPE_ADDITION or token_type == Token.TYPE_SUBTRACTION):
-            return 1
-        if (token_type == Token.TYPE_MULTIPLICATION or token_type == Token.TYPE_DIVISION):
-            return 2
-        if (token_type == Token.TYPE_EXPONENT):
-            return 3
-        if (token_type == Token.TYPE_FUNCTION):
-            return 4
-        console_output_debug_msg(f"get_precedence fn param not recognised token_type:{token_type}")
-        return -1
-    def is_operator(token_type : Token):
-        if (token_type == Token.TYPE_ADDITION or token_type == Token.TYPE_SUBTRACTION):
-            return True
-        if (token_type == Token.TYPE_MULTIPLICATION or token_type == Token.TYPE_DIVISION):
-            return True
-        if (token_type == Token.TYPE_EXPONENT):
-            return True
-        if (token_type == Token.TYPE_FUNCTION):
-            return True
-        return False
+    name = function_token.lexeame
+    arity = FUNCTION_ARITIES.get(name, 1)
+    is_variadic = name in VARIADIC_FUNCTIONS
+    if (argument_count == arity or (is_variadic and argument_count > arity)):
+        return None
+    expected_count = f"at least {arity}" if is_variadic else f"{arity}"
+    return f"[{function_token.char_index+1}] Function \'{name}\' takes {expected_count} argument{'s' if arity != 1 else ''}, {argument_count} given"
 
+def tokens_to_postfix(tokens : typing.List[Token]):
+    '''
+    Single pass, a unary minus becomes a Token.TYPE_NEGATION prefix operator on the way. tokens is not modified.
+    Function arguments are comma separated in brackets, their count is checked against FUNCTION_ARITIES and
+    calls of VARIADIC_FUNCTIONS with more arguments become nested two argument calls.
+    Stops at the first unmatched ')', misplaced ',' or wrong argument count, or when the operators stack would
+    grow past MAX_NESTING_DEPTH.
+    Returns list(post_fix_token_list: list[Token], errors: list[str])
+       post_fix_token_list : tokens in postfix (reverse polish) order.
+       errors : list[str], empty list on success.
+    '''
     errors = []
-    evaluated_value = 0
     operators_stack = []
-    numbers_stack = []
     post_fix_token_list = []
-
-    open_bracket_token = Token()
-    open_bracket_token.char_index = -1
-    open_bracket_token.type = Token.TYPE_OPEN_BRACKET
-    open_bracket_token.lexeame = "("
-    close_bracket_token = Token()
-    close_bracket_token.char_index = -1
-    close_bracket_token.type = Token.TYPE_CLOSE_BRACKET
-    close_bracket_token.lexeame = ")"
-    zero_token = Token()
-    zero_token.char_index = -1
-    zero_token.type = Token.TYPE_NUMBER
-    zero_token.lexeame = "0"
-
-    # handle minus signs and convert constants
-    cur_token_index = 0
-    cur_token = None
-    for cur_token_index in range(len(tokens)):
-        cur_token = tokens[cur_token_index]
-        if (cur_token.type == Token.TYPE_CONST):
-            tokens[cur_token_index].lexeame = str(KNOWN_CONSTS[tokens[cur_token_index].lexeame])
-            tokens[cur_token_index].type = Token.TYPE_NUMBER
-    cur_token_index = 0
-    cur_token = None
-    while (cur_token_index < len(tokens)):
-        cur_token = tokens[cur_token_index]
-        if (cur_token.type == Token.TYPE_SUBTRACTION):
-            if (cur_token_index == 0):
-                if (len(tokens) > 1):
-                    console_output_debug_msg(f"cur_token_index:{cur_token_index} next token type:\'{Token.get_str_from_type_enum(tokens[cur_token_index+1].type)}\'")
-                    if (tokens[cur_token_index+1].type == Token.TYPE_NUMBER or tokens[cur_token_index+1].type == Token.TYPE_CONST or tokens[cur_token_index+1].type == Token.TYPE_IDENTIFIER):
-                        console_output_debug_msg("     Added tokens: (0<token>))")
-                        tokens.insert(0, open_bracket_token)
-                        tokens.insert(1, zero_token)
-                        tokens.insert(cur_token_index+4, close_bracket_token)
-                        cur_token_index += 3
-            else:
-                if (cur_token_index+1 < len(tokens)):
-                    console_output_debug_msg(f"cur_token_index:{cur_token_index} last token type:\'{Token.get_str_from_type_enum(tokens[cur_token_index-1].type)}\', next token type:\'{Token.get_str_from_type_enum(tokens[cur_token_index+1].type)}\'")
-                    if ((tokens[cur_token_index-1].type != Token.TYPE_NUMBER and tokens[cur_token_index-1].type != Token.TYPE_CONST and tokens[cur_token_index-1].type != Token.TYPE_IDENTIFIER and tokens[cur_token_index-1].type != Token.TYPE_CLOSE_BRACKET) and (tokens[cur_token_index+1].type == Token.TYPE_NUMBER or tokens[cur_token_index+1].type == Token.TYPE_CONST or tokens[cur_token_index+1].type == Token.TYPE_IDENTIFIER)):
-                        console_output_debug_msg(f"((tokens[cur_token_index-1].type != Token.TYPE_NUMBER:{tokens[cur_token_index-1].type != Token.TYPE_NUMBER}")
-                        console_output_debug_msg(f"tokens[cur_token_index-1].type != Token.TYPE_CONST:{tokens[cur_token_index-1].type != Token.TYPE_CONST}")
-                        console_output_debug_msg(f"tokens[cur_token_index-1] != Token.TYPE_IDENTIFIER:{tokens[cur_token_index-1].type != Token.TYPE_IDENTIFIER}")
-                        console_output_debug_msg(f"tokens[cur_token_index-1] != Token.TYPE_CLOSE_BRACKET:{tokens[cur_token_index-1].type != Token.TYPE_CLOSE_BRACKET}")
-                        console_output_debug_msg(f"tokens[cur_token_index+1].type == Token.TYPE_NUMBER:{tokens[cur_token_index+1].type == Token.TYPE_NUMBER}")
-                        console_output_debug_msg(f"tokens[cur_token_index+1] == Token.TYPE_CONST:{tokens[cur_token_index+1].type == Token.TYPE_CONST}")
-                        console_output_debug_msg(f"tokens[cur_token_index+1] == Token.TYPE_IDENTIFIER:{tokens[cur_token_index+1].type == Token.TYPE_IDENTIFIER}")
-                        console_output_debug_msg("     Added tokens: (0<token>))")
-                        tokens.insert(cur_token_index, zero_token)
-                        tokens.insert(cur_token_index, open_bracket_token)
-                        tokens.insert(cur_token_index+4, close_bracket_token)
-                        cur_token_index += 3
-        cur_token_index += 1
-
-    console_output_debug_msg(f"Printing partial processed tokens:")
-    debug_token_str = " ".join([token.lexeame for token in tokens])
-    console_output_debug_msg(debug_token_str)
+    max_depth = MAX_NESTING_DEPTH
+    trace_enabled = LOGGER.isEnabledFor(LOG_LEVEL_TRACE)
 
     #infix to postfix
     open_bracket_count = 0
+    # open_bracket_count outside the brackets of each open call that has its arguments checked, -1 keeps it from
+    # running empty and call_depth is its last entry. Calls of one argument functions are only checked from their
+    # first comma on, commas are rare so the commas of a call are only counted once it has one
+    call_depths = [-1]
+    call_depth = -1
+    comma_counts = {}
+    previous_type = Token.TYPE_NONE
     for token_index, token in enumerate(tokens):
-
-        post_fix_str = ""
-        for o in post_fix_token_list:
-            post_fix_str += str(o.lexeame) + " "
-        console_output_debug_msg(f"[{token_index}] post fix expression: \'{post_fix_str}\'")
+        if (token.type == Token.TYPE_SUBTRACTION and previous_type not in OPERAND_END_TYPES):
+            token = Token(token.lexeame, Token.TYPE_NEGATION, token.char_index, None)
+        if (trace_enabled):
+            LOGGER.log(LOG_LEVEL_TRACE, "[%d] token '%s', post fix length:%d, operators stack length:%d", token_index, token.lexeame, len(post_fix_token_list), len(operators_stack))
 
         if (token.type == Token.TYPE_IDENTIFIER or token.type == Token.TYPE_CONST):
             post_fix_token_list.append(token)
         elif (token.type == Token.TYPE_NUMBER):
             post_fix_token_list.append(token)
         elif (token.type == Token.TYPE_OPEN_BRACKET):
+            if (len(operators_stack) >= max_depth):
+                errors.append(f"[{token.char_index+1}] Expression nested deeper than {max_depth} levels")
+                return (post_fix_token_list, errors)
             open_bracket_count += 1
             operators_stack.append(token)
         elif (token.type == Token.TYPE_CLOSE_BRACKET):
             open_bracket_count -= 1
-            cur_token = operators_stack[-1]
-            while (cur_token.type != Token.TYPE_OPEN_BRACKET):
-                if (len(operators_stack) == 0):
-                    errors.append("Unmatched brackets, no matching \'(\' found")
-                    break
+            while (len(operators_stack) > 0 and operators_stack[-1].type != Token.TYPE_OPEN_BRACKET):
                 post_fix_token_list.append(operators_stack.pop())
-                cur_token = operators_stack[-1]
-            if (len(operators_stack) > 0):
-                operators_stack.pop() 
-        elif (is_operator(token.type) and token.type == Token.TYPE_FUNCTION):
+            if (len(operators_stack) == 0):
+                errors.append(f"[{token.char_index+1}] Unmatched brackets, no matching \'(\' found")
+                return (post_fix_token_list, errors)
+            operators_stack.pop()
+            if (open_bracket_count == call_depth):
+                call_depths.pop()
+                call_depth = call_depths[-1]
+                if (previous_type == Token.TYPE_COMMA):
+                    errors.append(f"[{token.char_index+1}] Missing function argument")
+                    return (post_fix_token_list, errors)
+                # the function is right below its '('
+                argument_count = 0 if previous_type == Token.TYPE_OPEN_BRACKET else comma_counts.pop(open_bracket_count, 0) + 1
+                error = get_argument_count_error(operators_stack[-1], argument_count)
+                if (error is not None):
+                    errors.append(error)
+                    return (post_fix_token_list, errors)
+        elif (token.type == Token.TYPE_FUNCTION or token.type == Token.TYPE_NEGATION):
+            # binary operators only add a few levels on top of brackets and prefix operators, checking these bounds the stack
+            if (len(operators_stack) >= max_depth):
+                errors.append(f"[{token.char_index+1}] Expression nested deeper than {max_depth} levels")
+                return (post_fix_token_list, errors)
+            if (token.lexeame in FUNCTION_ARITIES):
+                if (token_index+1 == len(tokens) or tokens[token_index+1].type != Token.TYPE_OPEN_BRACKET):
+                    errors.append(f"[{token.char_index+1}] Function \'{token.lexeame}\' needs its arguments in brackets")
+                    return (post_fix_token_list, errors)
+                call_depth = open_bracket_count
+                call_depths.append(call_depth)
+            # prefix operators, right associative
             cur_func_prec = get_op_precedence(token.type)
             if len(operators_stack) > 0:
                 stack_top_op_precedence = get_op_precedence(operators_stack[-1].type)
-                while stack_top_op_precedence >= cur_func_prec and operators_stack[-1].type != Token.TYPE_FUNCTION:
+                while stack_top_op_precedence >= cur_func_prec and operators_stack[-1].type != Token.TYPE_FUNCTION and operators_stack[-1].type != Token.TYPE_NEGATION:
                     post_fix_token_list.append(operators_stack.pop())
                     if (len(operators_stack) > 0):
                         stack_top_op_precedence = get_op_precedence(operators_stack[-1].type)
@@ -324,178 +520,3073 @@ def eval_lex_tokens(tokens : typing.List[Token]):
             operators_stack.append(token)
 
         elif (is_operator(token.type)):
-            console_output_debug_msg(f"[{token_index}] Considered token as an operator, {token}")
+            if (trace_enabled):
+                LOGGER.log(LOG_LEVEL_TRACE, "[%d] Considered token as an operator, %s", token_index, token.lexeame)
             cur_op_precedence = get_op_precedence(token.type)
             if (len(operators_stack) > 0):
                 stack_top_op_precedence = get_op_precedence(operators_stack[-1].type)
             else:
                 stack_top_op_precedence = get_op_precedence(Token.TYPE_NONE)
-            console_output_debug_msg(f"[{token_index}] both precedences (cur, stack_top): ({cur_op_precedence}, {stack_top_op_precedence})")
-            if (cur_op_precedence > stack_top_op_precedence):
-                console_output_debug_msg(f"[{token_index}] Added {token.lexeame} to op stack")
+            if (trace_enabled):
+                LOGGER.log(LOG_LEVEL_TRACE, "[%d] both precedences (cur, stack_top): (%d, %d)", token_index, cur_op_precedence, stack_top_op_precedence)
             while (stack_top_op_precedence >= cur_op_precedence):
-                console_output_debug_msg(f"[{token_index}] Adding operator to post-fix list ({operators_stack[-1].lexeame})")
-                console_output_debug_msg(f"[{token_index}] Adding operator to post-fix list ({operators_stack[-1].lexeame}) then added another operator to operators_stack ({token.lexeame})")
+                if (trace_enabled):
+                    LOGGER.log(LOG_LEVEL_TRACE, "[%d] Adding operator to post-fix list (%s)", token_index, operators_stack[-1].lexeame)
                 post_fix_token_list.append(operators_stack.pop())
                 if (len(operators_stack) > 0):
                     stack_top_op_precedence = get_op_precedence(operators_stack[-1].type)
                 else:
                     stack_top_op_precedence = get_op_precedence(Token.TYPE_NONE)
             operators_stack.append(token)
+        elif (token.type == Token.TYPE_COMMA):
+            while (len(operators_stack) > 0 and operators_stack[-1].type != Token.TYPE_OPEN_BRACKET):
+                post_fix_token_list.append(operators_stack.pop())
+            # only a call has its function right below the '('
+            if (len(operators_stack) < 2 or operators_stack[-2].type != Token.TYPE_FUNCTION):
+                errors.append(f"[{token.char_index+1}] Comma outside of a function\'s argument list")
+                return (post_fix_token_list, errors)
+            if (previous_type == Token.TYPE_OPEN_BRACKET or previous_type == Token.TYPE_COMMA):
+                errors.append(f"[{token.char_index+1}] Missing function argument")
+                return (post_fix_token_list, errors)
+            if (call_depth != open_bracket_count - 1):
+                call_depth = open_bracket_count - 1
+                call_depths.append(call_depth)
+            comma_count = comma_counts.get(call_depth, 0) + 1
+            comma_counts[call_depth] = comma_count
+            function_token = operators_stack[-2]
+            if (comma_count >= 2 and function_token.lexeame in VARIADIC_FUNCTIONS):
+                # the arguments so far are folded into one before the next is added
+                post_fix_token_list.append(function_token)
         else:
             error_string = f"[char_index:{token.char_index}] Token list contains unknown or bad token type"
             errors.append(error_string)
+        previous_type = token.type
     
     if (len(operators_stack) > 0):
-        console_output_debug_msg(f"Adding remaining operators on stack to post-fix list, len:{len(operators_stack)}")
+        LOGGER.debug("Adding remaining operators on stack to post-fix list, len:%d", len(operators_stack))
     for operator_index in range(len(operators_stack)):
-        console_output_debug_msg(f" [{operator_index}] adding operator:{operators_stack[-1].lexeame} to post_fix_token_list")
+        if (trace_enabled):
+            LOGGER.log(LOG_LEVEL_TRACE, " [%d] adding operator:%s to post_fix_token_list", operator_index, operators_stack[-1].lexeame)
         post_fix_token_list.append(operators_stack.pop())
 
     if (open_bracket_count > 0):
         errors.append(f"Bracket mismatch. Some brackets dont have \')\', {open_bracket_count} specifically")
 
-    # debug
-    post_fix_str = ""
-    for o in post_fix_token_list:
-        post_fix_str += " " + str(o.lexeame)
-    console_output_debug_msg(f"post fix expression: {post_fix_str}")
-    # /debug
+    if (LOGGER.isEnabledFor(logging.DEBUG)):
+        LOGGER.debug("post fix expression: %s", " ".join([str(token.lexeame) for token in post_fix_token_list]))
 
-    if (len(errors) > 0):
-        return (None, errors)
+    return (post_fix_token_list, errors)
 
-    # process post fix list
-    for token in post_fix_token_list:
-        if (token.type == Token.TYPE_NUMBER):
-            numbers_stack.append(decimal.Decimal(token.lexeame))
-        elif (is_operator(token.type)):
-            if (len(numbers_stack) < 1):
-                errors.append("Too many operators, for the number of operands")
-                break
-            operand_a = numbers_stack.pop()
-            if (token.type == Token.TYPE_FUNCTION):
-                console_output_debug_msg(f"running function {token.lexeame} with parameter {operand_a}")
+# Instructions of a compiled postfix program are (opcode, operand, char_index, symbol) tuples
+OPCODE_PUSH = 0
+OPCODE_FUNCTION = 1
+OPCODE_BINARY = 2
+OPCODE_LOAD = 3
+OPCODE_NEGATE = 4
+OPCODE_STORE = 5 # copies the top of the stack into register operand, added by optimize_program()
+OPCODE_RECALL = 6 # pushes register operand
+OPCODE_CALL = 7 # operand is (function, argument count), for functions of more than one argument
+OPCODE_NAMES = {OPCODE_PUSH: "PUSH", OPCODE_FUNCTION: "FUNCTION", OPCODE_BINARY: "BINARY", OPCODE_LOAD: "LOAD", OPCODE_NEGATE: "NEGATE", OPCODE_STORE: "STORE", OPCODE_RECALL: "RECALL", OPCODE_CALL: "CALL"}
+
+def op_add(operand_b, operand_a):
+    return operand_b + operand_a
+def op_subtract(operand_b, operand_a):
+    return operand_b - operand_a
+def op_multiply(operand_b, operand_a):
+    return operand_b * operand_a
+def op_divide(operand_b, operand_a):
+    if (operand_a == 0):
+        raise ZeroDivisionError("division by zero")
+    return operand_b / operand_a
+
+'''
+Native decimal.Decimal implementations of KNOWN_FUNCTIONS and KNOWN_CONSTS, used by DecimalEngine.
+Each one works in the current decimal context: intermediate steps carry DECIMAL_GUARD_DIGITS extra digits
+and the result is rounded to the context precision on return (unary plus). Domain errors raise ValueError
+like the math module does.
+'''
+DECIMAL_GUARD_DIGITS = 5
+# sin/cos/tan of angles above 10^DECIMAL_MAX_ANGLE_EXPONENT are refused, reducing them needs that many digits of pi
+DECIMAL_MAX_ANGLE_EXPONENT = 10000
+DECIMAL_ATAN_SERIES_LIMIT = decimal.Decimal("0.1")
+DECIMAL_PI_CACHE = {}
+
+def decimal_pi():
+    '''
+    Returns pi rounded to the current context precision, computed once per precision.
+    '''
+    precision = decimal.getcontext().prec
+    pi = DECIMAL_PI_CACHE.get(precision)
+    if (pi is None):
+        with decimal.localcontext() as context:
+            context.prec = precision + DECIMAL_GUARD_DIGITS
+            # series from the decimal module documentation
+            last_total, term, total, n, na, d, da = 0, decimal.Decimal(3), decimal.Decimal(3), 1, 0, 0, 24
+            while (total != last_total):
+                last_total = total
+                n, na = n + na, na + 8
+                d, da = d + da, da + 32
+                term = (term * n) / d
+                total += term
+        pi = +total
+        DECIMAL_PI_CACHE[precision] = pi
+    return pi
+
+def decimal_e():
+    return decimal.Decimal(1).exp()
+
+def decimal_deg2rad():
+    with decimal.localcontext() as context:
+        context.prec += DECIMAL_GUARD_DIGITS
+        result = decimal_pi() / 180
+    return +result
+
+def decimal_rad2deg():
+    with decimal.localcontext() as context:
+        context.prec += DECIMAL_GUARD_DIGITS
+        result = 180 / decimal_pi()
+    return +result
+
+def decimal_reduce_angle(x : decimal.Decimal):
+    # Returns x - 2*pi*k within [-pi, pi], pi gets extra digits for the integer part of x so large angles stay exact
+    if (x.is_finite() and x.adjusted() > DECIMAL_MAX_ANGLE_EXPONENT):
+        raise ValueError("math domain error")
+    with decimal.localcontext() as context:
+        context.prec += max(0, x.adjusted()) + DECIMAL_GUARD_DIGITS
+        two_pi = 2 * decimal_pi()
+        return x - (x / two_pi).to_integral_value() * two_pi
+
+def decimal_sin(x : decimal.Decimal):
+    with decimal.localcontext() as context:
+        context.prec += DECIMAL_GUARD_DIGITS
+        x = decimal_reduce_angle(x)
+        x_squared = x * x
+        term, total, last_total, index = x, x, None, 1
+        while (total != last_total):
+            last_total = total
+            index += 2
+            term = -term * x_squared / (index * (index - 1))
+            total += term
+    return +total
+
+def decimal_cos(x : decimal.Decimal):
+    with decimal.localcontext() as context:
+        context.prec += DECIMAL_GUARD_DIGITS
+        x = decimal_reduce_angle(x)
+        x_squared = x * x
+        term, total, last_total, index = decimal.Decimal(1), decimal.Decimal(1), None, 0
+        while (total != last_total):
+            last_total = total
+            index += 2
+            term = -term * x_squared / (index * (index - 1))
+            total += term
+    return +total
+
+def decimal_tan(x : decimal.Decimal):
+    with decimal.localcontext() as context:
+        context.prec += DECIMAL_GUARD_DIGITS
+        result = decimal_sin(x) / decimal_cos(x)
+    return +result
+
+def decimal_cosec(x : decimal.Decimal):
+    with decimal.localcontext() as context:
+        context.prec += DECIMAL_GUARD_DIGITS
+        result = 1 / decimal_sin(x)
+    return +result
+
+def decimal_sec(x : decimal.Decimal):
+    with decimal.localcontext() as context:
+        context.prec += DECIMAL_GUARD_DIGITS
+        result = 1 / decimal_cos(x)
+    return +result
+
+def decimal_cot(x : decimal.Decimal):
+    with decimal.localcontext() as context:
+        context.prec += DECIMAL_GUARD_DIGITS
+        result = decimal_cos(x) / decimal_sin(x)
+    return +result
+
+def decimal_atan(x : decimal.Decimal):
+    with decimal.localcontext() as context:
+        context.prec += DECIMAL_GUARD_DIGITS
+        is_negative = x < 0
+        x = abs(x)
+        is_inverted = x > 1
+        if (is_inverted):
+            x = 1 / x
+        # atan(x) = 2*atan(x / (1 + sqrt(1 + x^2))), halve the argument until the series converges quickly
+        doubling_count = 0
+        while (x > DECIMAL_ATAN_SERIES_LIMIT):
+            x = x / (1 + (1 + x * x).sqrt())
+            doubling_count += 1
+        x_squared = x * x
+        term, total, last_total, index = x, x, None, 1
+        while (total != last_total):
+            last_total = total
+            term = -term * x_squared
+            index += 2
+            total += term / index
+        total *= 2 ** doubling_count
+        if (is_inverted):
+            total = decimal_pi() / 2 - total
+        if (is_negative):
+            total = -total
+    return +total
+
+def decimal_asin(x : decimal.Decimal):
+    if (abs(x) > 1):
+        raise ValueError("math domain error")
+    with decimal.localcontext() as context:
+        context.prec += DECIMAL_GUARD_DIGITS
+        if (abs(x) == 1):
+            result = decimal_pi() / 2 * x
+        else:
+            # (1-x)*(1+x) instead of 1-x*x, no cancellation near |x| = 1
+            result = decimal_atan(x / ((1 - x) * (1 + x)).sqrt())
+    return +result
+
+def decimal_acos(x : decimal.Decimal):
+    if (abs(x) > 1):
+        raise ValueError("math domain error")
+    with decimal.localcontext() as context:
+        context.prec += DECIMAL_GUARD_DIGITS
+        if (x == -1):
+            result = decimal_pi()
+        else:
+            # 2*atan(sqrt((1-x)/(1+x))) instead of pi/2 - asin(x), keeps full precision near x = 1
+            result = 2 * decimal_atan(((1 - x) / (1 + x)).sqrt())
+    return +result
+
+def decimal_sqrt(x : decimal.Decimal):
+    if (x < 0):
+        raise ValueError("math domain error")
+    return x.sqrt()
+
+def decimal_log10(x : decimal.Decimal):
+    if (x <= 0):
+        raise ValueError("math domain error")
+    return x.log10()
+
+def decimal_ln(x : decimal.Decimal):
+    if (x <= 0):
+        raise ValueError("math domain error")
+    return x.ln()
+
+def decimal_log2(x : decimal.Decimal):
+    if (x <= 0):
+        raise ValueError("math domain error")
+    with decimal.localcontext() as context:
+        context.prec += DECIMAL_GUARD_DIGITS
+        result = x.ln() / decimal.Decimal(2).ln()
+        # exact powers of two give an integer, like log10 does for powers of ten
+        exponent = result.to_integral_value()
+        if (abs(result - exponent) < 1 and decimal.Decimal(2) ** exponent == x):
+            return exponent
+    return +result
+
+def decimal_power(operand_b : decimal.Decimal, operand_a : decimal.Decimal):
+    if (operand_a == 0):
+        return decimal.Decimal(1)
+    if (operand_b == 0 and operand_a < 0):
+        # Decimal gives Infinity, the other engines and math.pow() fail
+        raise ValueError("math domain error")
+    try:
+        return operand_b ** operand_a
+    except decimal.InvalidOperation:
+        raise ValueError("math domain error")
+    except decimal.Overflow:
+        raise OverflowError("math range error")
+
+def decimal_hypot(operand_b : decimal.Decimal, operand_a : decimal.Decimal):
+    with decimal.localcontext() as context:
+        context.prec += DECIMAL_GUARD_DIGITS
+        result = (operand_b * operand_b + operand_a * operand_a).sqrt()
+    return +result
+
+def decimal_atan2(operand_b : decimal.Decimal, operand_a : decimal.Decimal):
+    # operand_b is y and operand_a is x, as in math.atan2(y, x)
+    with decimal.localcontext() as context:
+        context.prec += DECIMAL_GUARD_DIGITS
+        if (operand_a == 0):
+            result = decimal.Decimal(0) if operand_b == 0 else (decimal_pi() / 2).copy_sign(operand_b)
+        else:
+            result = decimal_atan(operand_b / operand_a)
+            if (operand_a < 0):
+                result += decimal_pi() if operand_b >= 0 else -decimal_pi()
+    return +result
+
+# largest exact power the fraction engine computes, in bits of its numerator or denominator, a small input such as
+# 9^9^9 would otherwise hold a worker for hours
+FRACTION_MAX_POWER_BITS = 1 << 20
+
+def fraction_power(operand_b, operand_a):
+    if (operand_a.denominator != 1):
+        raise ValueError("non integer exponent has no exact result")
+    exponent = operand_a.numerator
+    if (abs(operand_b.numerator) > 1 or operand_b.denominator > 1):
+        # 0, 1 and -1 keep their size, any other base grows by at least its own size per unit of the exponent
+        base_bits = max(abs(operand_b.numerator).bit_length(), operand_b.denominator.bit_length())
+        if (base_bits * abs(exponent) > FRACTION_MAX_POWER_BITS):
+            raise OverflowError(f"exact power larger than {FRACTION_MAX_POWER_BITS} bits")
+    return operand_b ** exponent
+
+def variable_to_decimal(value):
+    if (isinstance(value, decimal.Decimal)):
+        return value
+    if (isinstance(value, float)):
+        # str gives the shortest round-tripping digits, the same way constants are converted
+        return decimal.Decimal(str(float(value)))
+    return decimal.Decimal(value)
+
+def variable_to_fraction(value):
+    import fractions
+    if (isinstance(value, float)):
+        # same digits as variable_to_decimal(), 0.1 is 1/10 and not the nearest binary fraction
+        return fractions.Fraction(str(float(value)))
+    return fractions.Fraction(value)
+
+class NumericEngine:
+    '''
+    Number type a program is built and run with. build_program() resolves literals, constants, operators
+    and functions through the engine, run_program() converts variables with from_variable() and runs
+    inside get_context(). See FloatEngine, DecimalEngine and FractionEngine.
+       functions : native implementations of KNOWN_FUNCTIONS entries, used while the entry is unchanged.
+                   Other functions are called as they are and their result is passed to from_variable().
+    '''
+    name = ""
+    precision = None
+    def __init__(self):
+        self.binary_operations = {Token.TYPE_ADDITION: op_add, Token.TYPE_SUBTRACTION: op_subtract, Token.TYPE_MULTIPLICATION: op_multiply, Token.TYPE_DIVISION: op_divide, Token.TYPE_EXPONENT: self.power}
+        self.functions = {}
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+    def from_literal(self, lexeame : str):
+        raise NotImplementedError
+    def from_variable(self, value):
+        raise NotImplementedError
+    def power(self, operand_b, operand_a):
+        raise NotImplementedError
+    def log(self, x):
+        '''
+        Natural logarithm, used for derivatives of powers. Raises ValueError when x <= 0.
+        '''
+        raise NotImplementedError
+    def from_constant(self, name : str):
+        return self.from_variable(KNOWN_CONSTS[name])
+    def get_function(self, name : str):
+        '''
+        Returns the callable for KNOWN_FUNCTIONS[name], raises ValueError when the engine cannot compute it.
+        It takes FUNCTION_ARITIES[name] arguments, one when the name has no entry.
+        '''
+        function = KNOWN_FUNCTIONS[name]
+        if (name in self.functions and function is DEFAULT_FUNCTIONS.get(name)):
+            return self.functions[name]
+        if (isinstance(function, ExpressionFunction)):
+            return function.get_engine_function(self)
+        from_variable = self.from_variable
+        if (FUNCTION_ARITIES.get(name, 1) != 1):
+            return lambda *arguments: from_variable(function(*arguments))
+        return lambda x: from_variable(function(x))
+    def get_context(self):
+        return contextlib.nullcontext()
+
+class FloatEngine(NumericEngine):
+    '''
+    Python floats throughout, no decimal.Decimal allocation. Fastest, 53 bit binary precision.
+    '''
+    name = "float"
+    def __init__(self):
+        super().__init__()
+        self.functions = dict(DEFAULT_FUNCTIONS)
+    def from_literal(self, lexeame : str):
+        return float(lexeame)
+    def from_variable(self, value):
+        return float(value)
+    def power(self, operand_b, operand_a):
+        return math.pow(operand_b, operand_a)
+    def log(self, x):
+        return math.log(x)
+
+class DecimalEngine(NumericEngine):
+    '''
+    decimal.Decimal throughout, functions and constants are computed natively to the working precision.
+       precision : significant digits, set with decimal.localcontext() while building and running.
+                   None uses the precision of the current decimal context (28 by default).
+    '''
+    name = "decimal"
+    def __init__(self, precision : int = None):
+        super().__init__()
+        self.precision = precision
+        self.functions = {"sqrt": decimal_sqrt, "log10": decimal_log10, "log2": decimal_log2, "cos": decimal_cos, "sin": decimal_sin, "tan": decimal_tan, "cosec": decimal_cosec, "sec": decimal_sec, "cot": decimal_cot, "acos": decimal_acos, "asin": decimal_asin, "atan": decimal_atan,
+                          "min": min, "max": max, "hypot": decimal_hypot, "atan2": decimal_atan2, "pow": decimal_power}
+        self.constants = {"pi": decimal_pi, "e": decimal_e, "deg2rad": decimal_deg2rad, "rad2deg": decimal_rad2deg}
+    def __repr__(self):
+        return f"DecimalEngine(precision={self.precision})"
+    def from_literal(self, lexeame : str):
+        return decimal.Decimal(lexeame)
+    def from_variable(self, value):
+        return variable_to_decimal(value)
+    def from_constant(self, name : str):
+        value = KNOWN_CONSTS[name]
+        if (name in self.constants and value == DEFAULT_CONSTS.get(name)):
+            return self.constants[name]()
+        return variable_to_decimal(value)
+    def power(self, operand_b, operand_a):
+        return decimal_power(operand_b, operand_a)
+    def log(self, x):
+        return decimal_ln(x)
+    def get_context(self):
+        if (self.precision is None):
+            return contextlib.nullcontext()
+        return decimal.localcontext(prec = self.precision)
+
+class FractionEngine(NumericEngine):
+    '''
+    Exact fractions.Fraction arithmetic for rational expressions, "1/3*3" is exactly 1.
+    The built in constants and functions have no exact value and are rejected by build_program(),
+    except min, max and pow. Exponents must be integers.
+    '''
+    name = "fraction"
+    def __init__(self):
+        super().__init__()
+        self.functions = {"min": min, "max": max, "pow": fraction_power}
+    def from_literal(self, lexeame : str):
+        import fractions
+        return fractions.Fraction(lexeame)
+    def from_variable(self, value):
+        return variable_to_fraction(value)
+    def from_constant(self, name : str):
+        value = KNOWN_CONSTS[name]
+        if (value == DEFAULT_CONSTS.get(name)):
+            raise ValueError(f"Constant \'{name}\' is irrational, not supported by the fraction engine")
+        return variable_to_fraction(value)
+    def get_function(self, name : str):
+        if (name not in self.functions and KNOWN_FUNCTIONS[name] is DEFAULT_FUNCTIONS.get(name)):
+            raise ValueError(f"Function \'{name}\' has no exact result, not supported by the fraction engine")
+        return super().get_function(name)
+    def power(self, operand_b, operand_a):
+        return fraction_power(operand_b, operand_a)
+    def log(self, x):
+        raise ValueError("logarithm has no exact result")
+
+'''
+Interval arithmetic, used by IntervalEngine. An Interval [lo, hi] of floats encloses every value an expression
+takes while its variables range over their intervals. + - * / round their bounds outward by one ulp unless they
+are exact, math module results by INTERVAL_FUNCTION_ULPS, and literals and constants which are not floats get
+the two floats around them. Trigonometric functions find the extrema and poles inside a range, points outside
+the domain of sqrt, log10, log2, asin, acos and pow are left out and mark the result clipped.
+A range entirely outside the domain raises ValueError like the math module does.
+'''
+INTERVAL_FUNCTION_ULPS = 4
+# extrema and poles of periodic functions this close to a range, relative to its largest bound, count as inside
+INTERVAL_ANGLE_SLACK = 1e-12
+# digits of the decimal engine's pi, e, deg2rad and rad2deg that the constants are bounded from
+INTERVAL_CONSTANT_DIGITS = 40
+# math.pi is below pi, the next float is above it
+INTERVAL_PI_HI = math.nextafter(math.pi, math.inf)
+# integers up to 2^53 are exact floats, products and quotients of them within it are exact
+INTERVAL_EXACT_INTEGER_LIMIT = 2.0 ** 53
+
+class Interval:
+    '''
+    Closed range [lo, hi] of floats, the number type of IntervalEngine. lo and hi can be infinite.
+       clipped : points of the range were outside the domain of a function or operator on the way (a pole, sqrt
+                 of a negative number, ...) and were left out, the bounds hold where the expression is defined.
+    Supports + - * / and unary minus with Intervals and numbers, and "value in interval".
+    '''
+    __slots__ = ("lo", "hi", "clipped")
+    def __init__(self, lo : float, hi : float = None, clipped : bool = False):
+        lo = float(lo)
+        hi = lo if hi is None else float(hi)
+        if (not lo <= hi):
+            raise ValueError(f"Interval needs lo <= hi, got [{lo}, {hi}]")
+        self.lo = lo
+        self.hi = hi
+        self.clipped = clipped
+    def __repr__(self):
+        return f"Interval({self.lo!r}, {self.hi!r}" + (", clipped=True)" if self.clipped else ")")
+    def __str__(self):
+        return f"[{self.lo!r}, {self.hi!r}]" + (" clipped" if self.clipped else "")
+    def __eq__(self, other):
+        if (not isinstance(other, Interval)):
+            return NotImplemented
+        return (self.lo, self.hi, self.clipped) == (other.lo, other.hi, other.clipped)
+    def __hash__(self):
+        return hash((self.lo, self.hi, self.clipped))
+    def __contains__(self, value):
+        return self.lo <= value <= self.hi
+    def width(self):
+        return self.hi - self.lo
+    def __neg__(self):
+        return Interval(-self.hi, -self.lo, self.clipped)
+    def __add__(self, other):
+        return interval_add(self, interval_from_value(other))
+    def __radd__(self, other):
+        return interval_add(interval_from_value(other), self)
+    def __sub__(self, other):
+        return interval_subtract(self, interval_from_value(other))
+    def __rsub__(self, other):
+        return interval_subtract(interval_from_value(other), self)
+    def __mul__(self, other):
+        return interval_multiply(self, interval_from_value(other))
+    def __rmul__(self, other):
+        return interval_multiply(interval_from_value(other), self)
+    def __truediv__(self, other):
+        return interval_divide(self, interval_from_value(other))
+    def __rtruediv__(self, other):
+        return interval_divide(interval_from_value(other), self)
+
+def interval_from_number(value):
+    '''
+    Returns the narrowest Interval holding value, a single float when value is one or converts exactly.
+    '''
+    if (isinstance(value, str)):
+        value = decimal.Decimal(value)
+    x = float(value)
+    # comparisons of floats with ints, Decimals and Fractions are exact, float() rounded to the nearest
+    if (x == value):
+        return Interval(x, x)
+    if (x < value):
+        return Interval(x, math.nextafter(x, math.inf))
+    return Interval(math.nextafter(x, -math.inf), x)
+
+def interval_from_value(value):
+    '''
+    value : Interval, (lo, hi) pair or number.
+    '''
+    if (isinstance(value, Interval)):
+        return value
+    if (isinstance(value, (tuple, list))):
+        if (len(value) != 2):
+            raise ValueError(f"an interval needs 2 bounds, got {len(value)}")
+        lo = interval_from_number(value[0])
+        hi = interval_from_number(value[1])
+        return Interval(lo.lo, hi.hi)
+    return interval_from_number(value)
+
+def round_down(value : float, is_exact : bool):
+    if (value != value):
+        return -math.inf
+    return value if is_exact else math.nextafter(value, -math.inf)
+
+def round_up(value : float, is_exact : bool):
+    if (value != value):
+        return math.inf
+    return value if is_exact else math.nextafter(value, math.inf)
+
+def get_sum_error(total : float, a : float, b : float):
+    # exact rounding error of total = a + b (TwoSum), not 0 when total is inexact
+    b_virtual = total - a
+    return (a - (total - b_virtual)) + (b - b_virtual)
+
+def interval_add(a : Interval, b : Interval):
+    lo = a.lo + b.lo
+    hi = a.hi + b.hi
+    return Interval(round_down(lo, get_sum_error(lo, a.lo, b.lo) == 0), round_up(hi, get_sum_error(hi, a.hi, b.hi) == 0), a.clipped or b.clipped)
+
+def interval_subtract(a : Interval, b : Interval):
+    lo = a.lo - b.hi
+    hi = a.hi - b.lo
+    return Interval(round_down(lo, get_sum_error(lo, a.lo, -b.hi) == 0), round_up(hi, get_sum_error(hi, a.hi, -b.lo) == 0), a.clipped or b.clipped)
+
+def is_exact_integer_result(operands : tuple, lo : float, hi : float):
+    # integer results of integer operands below INTERVAL_EXACT_INTEGER_LIMIT are exact
+    return all([operand.is_integer() for operand in operands]) and lo.is_integer() and hi.is_integer() and max(-lo, hi) < INTERVAL_EXACT_INTEGER_LIMIT
+
+def round_corners(corners : list, clipped : bool):
+    '''
+    corners : list of (value: float, is_exact: bool), the results at the corners of the operands.
+    Returns the Interval of the smallest and largest value, rounded outward unless every corner giving it is exact.
+    '''
+    lo = min([value for value, is_exact in corners])
+    hi = max([value for value, is_exact in corners])
+    is_lo_exact = all([is_exact for value, is_exact in corners if value == lo])
+    is_hi_exact = all([is_exact for value, is_exact in corners if value == hi])
+    return Interval(round_down(lo, is_lo_exact), round_up(hi, is_hi_exact), clipped)
+
+def multiply_bounds(x : float, y : float):
+    '''
+    Returns list(product: float, is_exact: bool). 0 times an infinite bound is 0, the bound stands for large finite values.
+    '''
+    product = x * y
+    if (x == 0 or y == 0):
+        return (0.0, True)
+    is_exact = (x.is_integer() and y.is_integer() and abs(product) < INTERVAL_EXACT_INTEGER_LIMIT) or math.isinf(x) or math.isinf(y)
+    return (product, is_exact)
+
+def divide_bounds(x : float, y : float):
+    '''
+    Returns list(quotient: float, is_exact: bool), y is not 0.
+    '''
+    quotient = x / y
+    if (x == 0 or math.isinf(y)):
+        return (quotient, not math.isinf(x))
+    # an integer quotient of integers is exact when it gives the dividend back
+    is_exact = (x.is_integer() and y.is_integer() and quotient.is_integer() and abs(x) < INTERVAL_EXACT_INTEGER_LIMIT and quotient * y == x) or math.isinf(x)
+    return (quotient, is_exact)
+
+def interval_multiply(a : Interval, b : Interval):
+    return round_corners([multiply_bounds(a_bound, b_bound) for a_bound in (a.lo, a.hi) for b_bound in (b.lo, b.hi)], a.clipped or b.clipped)
+
+def interval_divide(a : Interval, b : Interval):
+    clipped = a.clipped or b.clipped
+    if (b.lo > 0 or b.hi < 0):
+        if ((math.isinf(a.lo) or math.isinf(a.hi)) and (math.isinf(b.lo) or math.isinf(b.hi))):
+            # infinite over infinite
+            return Interval(-math.inf, math.inf, clipped)
+        return round_corners([divide_bounds(a_bound, b_bound) for a_bound in (a.lo, a.hi) for b_bound in (b.lo, b.hi)], clipped)
+    if (b.lo == 0 and b.hi == 0):
+        raise ZeroDivisionError("division by zero")
+    # b holds 0, a pole. With 0 at one end of b and a on one side of 0 the quotient is a ray, else anything
+    if (a.lo > 0 and b.lo == 0):
+        return Interval(round_down(a.lo / b.hi, False), math.inf, True)
+    if (a.lo > 0 and b.hi == 0):
+        return Interval(-math.inf, round_up(a.lo / b.lo, False), True)
+    if (a.hi < 0 and b.lo == 0):
+        return Interval(-math.inf, round_up(a.hi / b.hi, False), True)
+    if (a.hi < 0 and b.hi == 0):
+        return Interval(round_down(a.hi / b.lo, False), math.inf, True)
+    return Interval(-math.inf, math.inf, True)
+
+def round_function_bounds(lo : float, hi : float, clipped : bool, floor : float = -math.inf, ceiling : float = math.inf, is_zero_exact : bool = True):
+    '''
+    Returns Interval(lo, hi) widened by INTERVAL_FUNCTION_ULPS, for math module results, and kept within the
+    function's range [floor, ceiling]. Infinite bounds are exact, and so are bounds of 0 unless is_zero_exact is
+    False: the functions only return 0 for exact arguments (sin(0), log10(1), ...), except powers that underflow.
+    '''
+    for ulp_index in range(INTERVAL_FUNCTION_ULPS):
+        lo = round_down(lo, (lo == 0 and is_zero_exact) or lo == -math.inf)
+        hi = round_up(hi, (hi == 0 and is_zero_exact) or hi == math.inf)
+    return Interval(max(lo, floor), min(hi, ceiling), clipped)
+
+def interval_monotonic(x : Interval, function : typing.Callable, is_increasing : bool = True, floor : float = -math.inf, ceiling : float = math.inf):
+    # a monotonic function takes its extremes at the ends of x
+    if (is_increasing):
+        return round_function_bounds(function(x.lo), function(x.hi), x.clipped, floor, ceiling)
+    return round_function_bounds(function(x.hi), function(x.lo), x.clipped, floor, ceiling)
+
+def clip_to_domain(x : Interval, lo : float, hi : float):
+    '''
+    Returns x limited to the domain [lo, hi], clipped when part of it was outside.
+    Raises ValueError when all of x is outside, the function is not defined anywhere on it.
+    '''
+    if (x.hi < lo or x.lo > hi):
+        raise ValueError("math domain error")
+    if (x.lo >= lo and x.hi <= hi):
+        return x
+    return Interval(max(x.lo, lo), min(x.hi, hi), True)
+
+def contains_periodic_point(x : Interval, phase : float, period : float):
+    '''
+    Returns True when x holds a point phase + k*period, or comes within INTERVAL_ANGLE_SLACK of one. The slack
+    covers the rounding of pi and of the multiples, a point is only missed when it is outside x.
+    '''
+    slack = INTERVAL_ANGLE_SLACK * max(1.0, abs(x.lo), abs(x.hi))
+    k = math.ceil((x.lo - slack - phase) / period)
+    return phase + k * period <= x.hi + slack
+
+def interval_sine_wave(x : Interval, function : typing.Callable, maximum_phase : float, minimum_phase : float):
+    # sin and cos, period 2*pi with the maximum 1 at maximum_phase and the minimum -1 at minimum_phase
+    if (x.lo == x.hi and not math.isfinite(x.lo)):
+        raise ValueError("math domain error")
+    if (not math.isfinite(x.lo) or not math.isfinite(x.hi) or x.hi - x.lo >= 2 * math.pi):
+        return Interval(-1.0, 1.0, x.clipped)
+    # monotonic between the extrema, so the extrema inside x and the ends of x bound it
+    lo_value = function(x.lo)
+    hi_value = function(x.hi)
+    result = round_function_bounds(min(lo_value, hi_value), max(lo_value, hi_value), x.clipped, -1.0, 1.0)
+    lo = -1.0 if contains_periodic_point(x, minimum_phase, 2 * math.pi) else result.lo
+    hi = 1.0 if contains_periodic_point(x, maximum_phase, 2 * math.pi) else result.hi
+    return Interval(lo, hi, x.clipped)
+
+def interval_sin(x : Interval):
+    return interval_sine_wave(x, math.sin, math.pi / 2, -math.pi / 2)
+
+def interval_cos(x : Interval):
+    return interval_sine_wave(x, math.cos, 0.0, math.pi)
+
+def interval_tan(x : Interval):
+    # increasing between its poles at pi/2 + k*pi, none of which is a float
+    if (not math.isfinite(x.lo) or not math.isfinite(x.hi) or x.hi - x.lo >= math.pi or contains_periodic_point(x, math.pi / 2, math.pi)):
+        if (x.lo == x.hi and not math.isfinite(x.lo)):
+            raise ValueError("math domain error")
+        return Interval(-math.inf, math.inf, True)
+    return interval_monotonic(x, math.tan)
+
+def interval_cot(x : Interval):
+    # decreasing between its poles at k*pi, 0 is the one pole that is a float and can be an end of x
+    if (x.lo == 0 and x.hi == 0):
+        raise ZeroDivisionError("float division by zero")
+    if (not math.isfinite(x.lo) or not math.isfinite(x.hi) or x.hi - x.lo >= math.pi):
+        if (x.lo == x.hi):
+            raise ValueError("math domain error")
+        return Interval(-math.inf, math.inf, True)
+    slack = INTERVAL_ANGLE_SLACK * max(1.0, abs(x.lo), abs(x.hi))
+    if (x.lo == 0 and x.hi + slack < math.pi):
+        return Interval(round_function_bounds(cot(x.hi), cot(x.hi), False).lo, math.inf, True)
+    if (x.hi == 0 and x.lo - slack > -math.pi):
+        return Interval(-math.inf, round_function_bounds(cot(x.lo), cot(x.lo), False).hi, True)
+    if (contains_periodic_point(x, 0.0, math.pi)):
+        return Interval(-math.inf, math.inf, True)
+    return interval_monotonic(x, cot, False)
+
+def interval_cosec(x : Interval):
+    return interval_divide(Interval(1.0), interval_sin(x))
+
+def interval_sec(x : Interval):
+    return interval_divide(Interval(1.0), interval_cos(x))
+
+def interval_asin(x : Interval):
+    return interval_monotonic(clip_to_domain(x, -1.0, 1.0), math.asin, True, -INTERVAL_PI_HI / 2, INTERVAL_PI_HI / 2)
+
+def interval_acos(x : Interval):
+    return interval_monotonic(clip_to_domain(x, -1.0, 1.0), math.acos, False, 0.0, INTERVAL_PI_HI)
+
+def interval_atan(x : Interval):
+    return interval_monotonic(x, math.atan, True, -INTERVAL_PI_HI / 2, INTERVAL_PI_HI / 2)
+
+def interval_sqrt(x : Interval):
+    return interval_monotonic(clip_to_domain(x, 0.0, math.inf), math.sqrt, True, 0.0)
+
+def interval_logarithm(x : Interval, function : typing.Callable):
+    # 0 is a pole at the edge of the domain, the logarithm goes to -infinity there
+    x = clip_to_domain(x, 0.0, math.inf)
+    if (x.hi == 0):
+        raise ValueError("math domain error")
+    if (x.lo == 0):
+        return Interval(-math.inf, round_function_bounds(function(x.hi), function(x.hi), True).hi, True)
+    return interval_monotonic(x, function)
+
+def interval_log10(x : Interval):
+    return interval_logarithm(x, math.log10)
+
+def interval_log2(x : Interval):
+    return interval_logarithm(x, math.log2)
+
+def interval_ln(x : Interval):
+    return interval_logarithm(x, math.log)
+
+def interval_min(a : Interval, b : Interval):
+    return Interval(min(a.lo, b.lo), min(a.hi, b.hi), a.clipped or b.clipped)
+
+def interval_max(a : Interval, b : Interval):
+    return Interval(max(a.lo, b.lo), max(a.hi, b.hi), a.clipped or b.clipped)
+
+def get_magnitude_bounds(x : Interval):
+    # Returns list(smallest |x|, largest |x|)
+    if (x.lo <= 0 <= x.hi):
+        return (0.0, max(-x.lo, x.hi))
+    return (min(abs(x.lo), abs(x.hi)), max(abs(x.lo), abs(x.hi)))
+
+def interval_hypot(a : Interval, b : Interval):
+    # increasing in |a| and |b|
+    a_lo, a_hi = get_magnitude_bounds(a)
+    b_lo, b_hi = get_magnitude_bounds(b)
+    return round_function_bounds(math.hypot(a_lo, b_lo), math.hypot(a_hi, b_hi), a.clipped or b.clipped, 0.0)
+
+def interval_atan2(y : Interval, x : Interval):
+    clipped = y.clipped or x.clipped
+    # around the origin and across the branch cut on the negative x axis it takes any angle
+    if (y.lo <= 0 <= y.hi and x.lo <= 0):
+        return Interval(-INTERVAL_PI_HI, INTERVAL_PI_HI, clipped)
+    # elsewhere it is monotonic in y and in x, so the corners bound it
+    angles = [math.atan2(y_bound, x_bound) for y_bound in (y.lo, y.hi) for x_bound in (x.lo, x.hi)]
+    return round_function_bounds(min(angles), max(angles), clipped, -INTERVAL_PI_HI, INTERVAL_PI_HI)
+
+def get_power_bound(x : float, y : float):
+    # x^y for x >= 0, 0 to a negative power is the pole's infinity
+    try:
+        return math.pow(x, y)
+    except (OverflowError, ValueError):
+        return math.inf
+
+def interval_integer_power(x : Interval, exponent : int):
+    if (exponent == 0):
+        return Interval(1.0, 1.0, x.clipped)
+    if (exponent < 0):
+        return interval_divide(Interval(1.0), interval_integer_power(x, -exponent))
+    lo_power = math.copysign(get_power_bound(abs(x.lo), exponent), x.lo if exponent % 2 == 1 else 1.0)
+    hi_power = math.copysign(get_power_bound(abs(x.hi), exponent), x.hi if exponent % 2 == 1 else 1.0)
+    if (exponent % 2 == 1 or x.lo >= 0):
+        lo, hi = lo_power, hi_power
+    elif (x.hi <= 0):
+        lo, hi = hi_power, lo_power
+    else:
+        lo, hi = 0.0, max(lo_power, hi_power)
+    if (is_exact_integer_result((x.lo, x.hi), lo, hi)):
+        return Interval(lo, hi, x.clipped)
+    # even powers and powers of x >= 0 are not negative
+    floor = 0.0 if exponent % 2 == 0 or x.lo >= 0 else -math.inf
+    return round_function_bounds(lo, hi, x.clipped, floor, math.inf, False)
+
+def interval_power(base : Interval, exponent : Interval):
+    if (exponent.lo == exponent.hi and exponent.lo.is_integer() and abs(exponent.lo) < INTERVAL_EXACT_INTEGER_LIMIT):
+        result = interval_integer_power(base, int(exponent.lo))
+        return result if not exponent.clipped else Interval(result.lo, result.hi, True)
+    clipped = base.clipped or exponent.clipped
+    if (base.hi < 0 and exponent.lo == exponent.hi):
+        # a negative base needs an integer exponent
+        raise ValueError("math domain error")
+    # x^y is monotonic in x and in y for x >= 0, the corners bound it
+    bounds = []
+    if (base.hi >= 0):
+        powers = [get_power_bound(x_bound, y_bound) for x_bound in (max(base.lo, 0.0), base.hi) for y_bound in (exponent.lo, exponent.hi)]
+        bounds += [min(powers), max(powers)]
+        clipped = clipped or (max(base.lo, 0.0) == 0 and exponent.lo < 0)
+    if (base.lo < 0 and exponent.lo == exponent.hi):
+        # the exponent is not an integer, the negative part of the base is outside the domain
+        clipped = True
+    elif (base.lo < 0):
+        # only integer exponents are defined for negative bases, |x|^y bounds their results on both sides of 0
+        magnitude_lo, magnitude_hi = get_magnitude_bounds(Interval(base.lo, min(base.hi, 0.0)))
+        magnitude = max([get_power_bound(x_bound, y_bound) for x_bound in (magnitude_lo, magnitude_hi) for y_bound in (exponent.lo, exponent.hi)])
+        bounds += [-magnitude, magnitude]
+        clipped = True
+    # without the negative base results x^y is not negative
+    floor = -math.inf if base.lo < 0 and exponent.lo != exponent.hi else 0.0
+    return round_function_bounds(min(bounds), max(bounds), clipped, floor, math.inf, False)
+
+class IntervalEngine(NumericEngine):
+    '''
+    Interval arithmetic, evaluating an expression once gives an Interval that encloses its value for every
+    point of the variables' ranges, see Interval. Variables are Intervals, (lo, hi) pairs or numbers.
+    Functions added at runtime need an interval version, so only ones defined by an expression are supported.
+    '''
+    name = "interval"
+    def __init__(self):
+        super().__init__()
+        self.binary_operations = {Token.TYPE_ADDITION: interval_add, Token.TYPE_SUBTRACTION: interval_subtract, Token.TYPE_MULTIPLICATION: interval_multiply, Token.TYPE_DIVISION: interval_divide, Token.TYPE_EXPONENT: interval_power}
+        self.functions = {"sqrt": interval_sqrt, "log10": interval_log10, "log2": interval_log2, "cos": interval_cos, "sin": interval_sin, "tan": interval_tan, "cosec": interval_cosec, "sec": interval_sec, "cot": interval_cot, "acos": interval_acos, "asin": interval_asin, "atan": interval_atan,
+                          "min": interval_min, "max": interval_max, "hypot": interval_hypot, "atan2": interval_atan2, "pow": interval_power}
+    def from_literal(self, lexeame : str):
+        return interval_from_number(decimal.Decimal(lexeame))
+    def from_variable(self, value):
+        return interval_from_value(value)
+    def from_constant(self, name : str):
+        value = KNOWN_CONSTS[name]
+        if (value == DEFAULT_CONSTS.get(name)):
+            # the floats in KNOWN_CONSTS are rounded, bound the exact value from more digits
+            with decimal.localcontext(prec = INTERVAL_CONSTANT_DIGITS):
+                return interval_from_number(DecimalEngine().from_constant(name))
+        return interval_from_value(value)
+    def get_function(self, name : str):
+        function = KNOWN_FUNCTIONS[name]
+        if (not isinstance(function, ExpressionFunction) and not (name in self.functions and function is DEFAULT_FUNCTIONS.get(name))):
+            raise ValueError(f"Function \'{name}\' has no interval version, only functions defined by an expression are supported by the interval engine")
+        return super().get_function(name)
+    def power(self, operand_b, operand_a):
+        return interval_power(operand_b, operand_a)
+    def log(self, x):
+        return interval_ln(x)
+
+ENGINE_CLASSES = {"float": FloatEngine, "decimal": DecimalEngine, "fraction": FractionEngine, "interval": IntervalEngine}
+DEFAULT_ENGINE = DecimalEngine()
+
+def create_engine(name : str, precision : int = None):
+    '''
+    Returns a new engine by name ("float", "decimal", "fraction" or "interval"), precision applies to the decimal engine only.
+    '''
+    if (name not in ENGINE_CLASSES):
+        raise ValueError(f"Unknown engine \'{name}\', expected one of {', '.join(ENGINE_CLASSES)}")
+    if (ENGINE_CLASSES[name] is DecimalEngine):
+        return DecimalEngine(precision)
+    if (precision is not None):
+        raise ValueError(f"precision only applies to the decimal engine, not \'{name}\'")
+    return ENGINE_CLASSES[name]()
+
+def get_engine(engine : typing.Union[str, NumericEngine] = None):
+    '''
+    engine : NumericEngine, engine name or None for DEFAULT_ENGINE.
+    '''
+    if (engine is None):
+        return DEFAULT_ENGINE
+    if (isinstance(engine, NumericEngine)):
+        return engine
+    return create_engine(engine)
+
+def set_default_engine(engine : typing.Union[str, NumericEngine]):
+    '''
+    Sets the engine used when none is given, for example by the command line and the result cache.
+    '''
+    global DEFAULT_ENGINE
+    DEFAULT_ENGINE = get_engine(engine)
+
+def build_program(post_fix_token_list : typing.List[Token], engine : NumericEngine = None):
+    '''
+    Resolves every postfix token to an instruction, so running the program needs no type or precedence checks.
+    engine : NumericEngine the program is built for, None for DEFAULT_ENGINE. Run it with the same engine.
+    Returns list(program: tuple, errors: list[str])
+    '''
+    engine = get_engine(engine)
+    binary_operations = engine.binary_operations
+    program = []
+    errors = []
+    with engine.get_context():
+        for token in post_fix_token_list:
+            if (token.type == Token.TYPE_NUMBER):
+                try:
+                    program.append((OPCODE_PUSH, engine.from_literal(token.lexeame), token.char_index, token.lexeame))
+                except (ValueError, ArithmeticError):
+                    # decimal.InvalidOperation is an ArithmeticError, float() and Fraction() raise ValueError
+                    errors.append(f"[{token.char_index+1}] Invalid number '{token.lexeame}'")
+            elif (token.type == Token.TYPE_CONST):
                 try:
-                    numbers_stack.append(decimal.Decimal(KNOWN_FUNCTIONS[token.lexeame.lower()](operand_a)))
+                    program.append((OPCODE_PUSH, engine.from_constant(token.lexeame), token.char_index, token.lexeame))
+                except ValueError as error:
+                    errors.append(f"[{token.char_index+1}] {error}")
+            elif (token.type == Token.TYPE_IDENTIFIER):
+                program.append((OPCODE_LOAD, token.lexeame, token.char_index, token.lexeame))
+            elif (token.type == Token.TYPE_NEGATION):
+                program.append((OPCODE_NEGATE, None, token.char_index, token.lexeame))
+            elif (token.type == Token.TYPE_FUNCTION):
+                argument_count = FUNCTION_ARITIES.get(token.lexeame, 1)
+                try:
+                    function = engine.get_function(token.lexeame)
+                except ValueError as error:
+                    errors.append(f"[{token.char_index+1}] {error}")
                     continue
-                except ZeroDivisionError:
-                    errors.append(f"{[token.char_index+1]} Function failure, division by zero")
-                    break
-                except ValueError:
-                    errors.append(f"{[token.char_index+1]} Function failure, math domain error")
-                    break
-                except:
-                    errors.append(f"{[token.char_index+1]} Function failure, {sys.exc_info()[1]}")
-                    break
+                if (argument_count == 1):
+                    program.append((OPCODE_FUNCTION, function, token.char_index, token.lexeame))
+                else:
+                    program.append((OPCODE_CALL, (function, argument_count), token.char_index, token.lexeame))
+            elif (token.type in binary_operations):
+                program.append((OPCODE_BINARY, binary_operations[token.type], token.char_index, token.lexeame))
+            else:
+                errors.append(f"[char_index:{token.char_index}] Token list contains unknown or bad token type")
+    return (tuple(program), errors)
+
+def run_program(program : tuple, variables : typing.Mapping[str, typing.Any] = None, engine : NumericEngine = None):
+    '''
+    variables : mapping of variable name to value (int, float, str or decimal.Decimal), read by OPCODE_LOAD.
+    engine : NumericEngine the program was built with, None for DEFAULT_ENGINE.
+    Returns list(evaluated_value: decimal.Decimal, errors: list[str])
+       evaluated_value : decimal.Decimal() or None on error, float or fractions.Fraction with those engines.
+       errors : list[str], empty list on success.
+    '''
+    engine = DEFAULT_ENGINE if engine is None else engine
+    with engine.get_context():
+        return run_program_in_context(program, variables, engine.from_variable)
 
-            if (len(numbers_stack) < 1):
-                errors.append("1 Too many operators, for the number of operands")
+def get_function_error(char_index : int):
+    exception = sys.exc_info()[1]
+    if (isinstance(exception, ZeroDivisionError)):
+        return f"[{char_index+1}] Function failure, division by zero"
+    if (isinstance(exception, (ValueError, decimal.InvalidOperation))):
+        return f"[{char_index+1}] Function failure, math domain error"
+    return f"[{char_index+1}] Function failure, {exception}"
+
+def run_program_in_context(program : tuple, variables : typing.Mapping[str, typing.Any], from_variable : typing.Callable):
+    errors = []
+    numbers_stack = []
+    registers = {}
+    push = numbers_stack.append
+    pop = numbers_stack.pop
+    for opcode, operand, char_index, symbol in program:
+        if (opcode == OPCODE_PUSH):
+            push(operand)
+            continue
+        if (opcode == OPCODE_LOAD):
+            if (variables is None or operand not in variables):
+                errors.append(f"[{char_index+1}] Unbound variable \'{operand}\'")
                 break
-            operand_b = numbers_stack.pop()
-            if (token.type == Token.TYPE_ADDITION):
-                numbers_stack.append(operand_a + operand_b)
-            if (token.type == Token.TYPE_SUBTRACTION):
-                numbers_stack.append(operand_b - operand_a)
-            if (token.type == Token.TYPE_MULTIPLICATION):
-                numbers_stack.append(operand_a * operand_b)
-            if (token.type == Token.TYPE_DIVISION):
-                if (operand_a == 0):
-                    errors.append(f"[{token.char_index+1}] Division by zero")
-                    break
-                numbers_stack.append(operand_b / operand_a)
-            if (token.type == Token.TYPE_EXPONENT):
-                console_output_debug_msg(f"exponent operation: {operand_b}^{operand_a}")
-                try:
-                    numbers_stack.append(decimal.Decimal(math.pow(operand_b, operand_a)))
-                except:
-                    errors.append(f"[{token.char_index+1}] expression: \'{operand_b}^({operand_a})\' failed, {sys.exc_info()[1]}")
+            try:
+                push(from_variable(variables[operand]))
+            except (TypeError, ValueError, decimal.InvalidOperation):
+                errors.append(f"[{char_index+1}] Variable \'{operand}\' has a non numeric value {variables[operand]!r}")
+                break
+            continue
+        if (opcode == OPCODE_RECALL):
+            push(registers[operand])
+            continue
+        if (opcode == OPCODE_STORE):
+            registers[operand] = numbers_stack[-1]
+            continue
+        if (len(numbers_stack) < 1):
+            errors.append("Too many operators, for the number of operands")
+            break
+        operand_a = pop()
+        if (opcode == OPCODE_NEGATE):
+            push(-operand_a)
+            continue
+        if (opcode == OPCODE_FUNCTION):
+            try:
+                push(operand(operand_a))
+            except Exception:
+                errors.append(get_function_error(char_index))
+                break
+            continue
+        if (opcode == OPCODE_CALL):
+            function, argument_count = operand
+            first_index = len(numbers_stack) - argument_count + 1
+            if (first_index < 0):
+                errors.append("Too many operators, for the number of operands")
+                break
+            arguments = numbers_stack[first_index:]
+            del numbers_stack[first_index:]
+            arguments.append(operand_a)
+            try:
+                push(function(*arguments))
+            except Exception:
+                errors.append(get_function_error(char_index))
+                break
+            continue
+        if (len(numbers_stack) < 1):
+            errors.append("Too many operators, for the number of operands")
+            break
+        operand_b = pop()
+        try:
+            push(operand(operand_b, operand_a))
+        except ZeroDivisionError:
+            errors.append(f"[{char_index+1}] Division by zero")
+            break
+        except Exception:
+            errors.append(f"[{char_index+1}] expression: \'{operand_b}{symbol}({operand_a})\' failed, {sys.exc_info()[1]}")
+            break
 
-    if (len(numbers_stack) > 1):
+    if (len(errors) == 0 and len(numbers_stack) > 1):
         errors.append(f"Too few operators, for the number of operands, {len(numbers_stack)} specifically")
-        console_output_debug_msg(f"Error: numbers_stack:{numbers_stack}")
+        LOGGER.debug("Error: numbers_stack:%s", numbers_stack)
+    if (len(errors) == 0 and len(numbers_stack) == 0):
+        errors.append("Empty expression, no value to evaluate")
 
     if (len(errors) > 0):
         return (None, errors)
     return (numbers_stack[0], errors)
 
-def print_constants() -> None:
-    print("Constants:")
-    for constant in KNOWN_CONSTS.keys():
-        print(f" {constant} - {KNOWN_CONSTS[constant]}")
-def print_functions() -> None:
-    print("Unary Functions")
-    for function in KNOWN_FUNCTIONS.keys():
-        print(f" {function}")
-def print_commands() -> None:
-    print("Interactive mode commands")
-    print(" help, h  - print help page")
-    print(" exit, q  - exit program")
-    print(" debug    - toggle debug output")
+def fold_instruction(instruction : tuple, operand_values : list, engine : NumericEngine):
+    '''
+    Runs one FUNCTION, CALL, BINARY or NEGATE instruction on constant operands the same way run_program() does.
+    Returns list(folded: bool, value), folded is False when the operation would fail, the error is then left
+    for run_program() to report.
+    '''
+    opcode, operand, char_index, symbol = instruction
+    try:
+        with engine.get_context():
+            if (opcode == OPCODE_NEGATE):
+                return (True, -operand_values[0])
+            if (opcode == OPCODE_FUNCTION):
+                return (True, operand(operand_values[0]))
+            if (opcode == OPCODE_CALL):
+                return (True, operand[0](*operand_values))
+            return (True, operand(operand_values[0], operand_values[1]))
+    except Exception:
+        return (False, None)
 
-is_interactive = False
-if (len(sys.argv) == 1):
-    is_interactive = True
-if len(sys.argv) > 1:
-    if (sys.argv[1] == "--help" or sys.argv[1] == "-h"):
-        print(f"python3 {sys.argv[0]} [expression]")
-        print( "python3 {-v|-h|__VERSION__}")
-        print( "  -v, --version    print program version and exit")
-        print( "      __VERSION__  output version in specific format")
-        print( "  -h, --help       print this help page and exit")
-        sys.exit()
-    if (sys.argv[1] == "--version" or sys.argv[1] == "-v"):
-        print(f"VERSION: {APP_VERSION_MAJOR}.{APP_VERSION_MINOR}")
-        sys.exit()
-    if (sys.argv[1] == "__VERSION__"):
-        print(f"{APP_VERSION_MAJOR}.{APP_VERSION_MINOR}")
-        sys.exit()
-
-while True:
-    if is_interactive:
-        try:
-            expression = input(">> ").strip()
-        except EOFError:
-            print("\r")
-            expression = "q"
-        if len(expression) == 0:
+def is_constant_equal(node : list, value : int):
+    return node[0][0] == OPCODE_PUSH and node[0][1] == value
+
+def get_identity_operand(instruction : tuple, operand_b : list, operand_a : list):
+    '''
+    Returns the operand node which a BINARY instruction leaves unchanged (x*1, 1*x, x+0, 0+x, x-0, x/1, x^1), or None.
+    '''
+    symbol = instruction[3]
+    if (symbol == "*" or symbol == "+"):
+        identity_value = 1 if symbol == "*" else 0
+        if (is_constant_equal(operand_a, identity_value)):
+            return operand_b
+        if (is_constant_equal(operand_b, identity_value)):
+            return operand_a
+    elif (symbol == "-" and is_constant_equal(operand_a, 0)):
+        return operand_b
+    elif ((symbol == "/" or symbol == "^") and is_constant_equal(operand_a, 1)):
+        return operand_b
+    return None
+
+def optimize_program(program : tuple, engine : NumericEngine = None):
+    '''
+    Folds constant subtrees, drops identity operations and computes repeated subexpressions once.
+    engine : NumericEngine the program was built with, constants are folded in its context.
+    Removing an identity operation also skips the decimal context rounding it would have done, so a value
+    can keep more digits than the context precision.
+    Works on an explicit stack, no recursion. Programs which would fail with a stack error are returned unchanged.
+    Returns list(optimized_program: tuple, eliminated_node_count: int)
+    '''
+    # node: [instruction, child nodes, key], nodes with equal keys are shared (hash consing)
+    nodes_by_key = {}
+    use_counts = {}
+    def get_node(instruction, children, key):
+        node = nodes_by_key.get(key)
+        if (node is None):
+            node = [instruction, children, key]
+            nodes_by_key[key] = node
+            use_counts[key] = 0
+        use_counts[key] += 1
+        return node
+
+    engine = get_engine(engine)
+    nodes_stack = []
+    for instruction in program:
+        opcode, operand, char_index, symbol = instruction
+        if (opcode == OPCODE_PUSH):
+            # keyed on the digits, Decimal("1") and Decimal("1.0") are equal but print differently
+            nodes_stack.append(get_node(instruction, [], (OPCODE_PUSH, str(operand))))
             continue
-        if expression == "q" or expression == "exit":
-            sys.exit()
-        if expression == "help" or expression == "h":
-            print_constants()
-            print_functions()
-            print_commands()
+        if (opcode == OPCODE_LOAD):
+            nodes_stack.append(get_node(instruction, [], (OPCODE_LOAD, operand)))
+            continue
+        operand_count = 2 if opcode == OPCODE_BINARY else operand[1] if opcode == OPCODE_CALL else 1
+        if (opcode not in (OPCODE_NEGATE, OPCODE_FUNCTION, OPCODE_BINARY, OPCODE_CALL) or len(nodes_stack) < operand_count):
+            return (program, 0)
+        children = nodes_stack[-operand_count:]
+        del nodes_stack[-operand_count:]
+        if (all([child[0][0] == OPCODE_PUSH for child in children])):
+            folded, value = fold_instruction(instruction, [child[0][1] for child in children], engine)
+            if (folded):
+                nodes_stack.append(get_node((OPCODE_PUSH, value, char_index, str(value)), [], (OPCODE_PUSH, str(value))))
+                continue
+        if (opcode == OPCODE_BINARY):
+            identity_operand = get_identity_operand(instruction, children[0], children[1])
+            if (identity_operand is not None):
+                nodes_stack.append(identity_operand)
+                continue
+        key = (opcode, operand) + tuple([id(child) for child in children])
+        nodes_stack.append(get_node(instruction, children, key))
+    if (len(nodes_stack) != 1):
+        return (program, 0)
+
+    # emit in postfix order, a shared non leaf node is stored on first use and recalled afterwards
+    optimized_program = []
+    registers = {}
+    pending_nodes = [(nodes_stack[0], False)]
+    while (len(pending_nodes) > 0):
+        node, children_emitted = pending_nodes.pop()
+        instruction, children, key = node
+        if (key in registers):
+            optimized_program.append((OPCODE_RECALL, registers[key], instruction[2], instruction[3]))
+            continue
+        if (not children_emitted):
+            pending_nodes.append((node, True))
+            for child in reversed(children):
+                pending_nodes.append((child, False))
+            continue
+        optimized_program.append(instruction)
+        if (len(children) > 0 and use_counts[key] > 1):
+            registers[key] = len(registers)
+            optimized_program.append((OPCODE_STORE, registers[key], instruction[2], instruction[3]))
+    return (tuple(optimized_program), len(program) - len(optimized_program))
+
+def get_program_stack_error(program : tuple):
+    '''
+    Returns the stack error run_program() reports for program whatever the variables are, None when it has none.
+    '''
+    depth = 0
+    for opcode, operand, char_index, symbol in program:
+        if (opcode == OPCODE_PUSH or opcode == OPCODE_LOAD or opcode == OPCODE_RECALL):
+            depth += 1
+            continue
+        operand_count = 2 if opcode == OPCODE_BINARY else operand[1] if opcode == OPCODE_CALL else 1
+        if (depth < operand_count):
+            return "Too many operators, for the number of operands"
+        if (opcode != OPCODE_STORE):
+            depth -= operand_count - 1
+    if (depth > 1):
+        return f"Too few operators, for the number of operands, {depth} specifically"
+    if (depth == 0):
+        return "Empty expression, no value to evaluate"
+    return None
+
+def format_program(program : tuple):
+    '''
+    Returns a readable listing of program, one instruction per line.
+    '''
+    lines = []
+    for instruction_index, (opcode, operand, char_index, symbol) in enumerate(program):
+        if (opcode == OPCODE_PUSH or opcode == OPCODE_LOAD):
+            argument = str(operand)
+        elif (opcode == OPCODE_STORE or opcode == OPCODE_RECALL):
+            argument = f"r{operand}"
+        elif (opcode == OPCODE_CALL):
+            argument = f"{symbol}, {operand[1]} arguments"
+        else:
+            argument = symbol
+        lines.append(f"{instruction_index:>4}  {OPCODE_NAMES[opcode]:<8} {argument}")
+    return "\n".join(lines)
+
+'''
+Code generation backend, see compile(codegen = True). A program is turned into the source of one straight
+line python function, one assignment per operation:
+
+    def generated_program(variables):
+        v0 = from_variable(variables[n0])
+        v1 = v0 * v0
+        v2 = f0(v1)
+        return v2 + c0
+
+The source only holds generated names and the operators of GENERATED_OPERATORS, every literal, constant,
+function and variable name is bound through the namespace, so no input text is ever compiled.
+'''
+# operators written inline, others call the engine's callable so errors match the interpreter
+GENERATED_OPERATORS = {"+": "+", "-": "-", "*": "*"}
+# longer programs stay on the interpreter, compiling the source would cost more than it saves
+CODEGEN_MAX_INSTRUCTIONS = 20000
+
+def generate_program_source(program : tuple):
+    '''
+    Returns list(source: str, namespace: dict), or list(None, None) when the program has a stack error
+    or more than CODEGEN_MAX_INSTRUCTIONS instructions.
+    namespace lacks "from_variable", the caller binds it.
+    '''
+    if (len(program) > CODEGEN_MAX_INSTRUCTIONS):
+        return (None, None)
+    namespace = {}
+    lines = ["def generated_program(variables):"]
+    names_stack = []
+    registers = {}
+    loaded_names = {}
+    def bind(prefix, value):
+        name = f"{prefix}{len(namespace)}"
+        namespace[name] = value
+        return name
+    def assign(expression):
+        name = f"v{len(lines) - 1}"
+        lines.append(f"    {name} = {expression}")
+        names_stack.append(name)
+    for opcode, operand, char_index, symbol in program:
+        if (opcode == OPCODE_PUSH):
+            names_stack.append(bind("c", operand))
             continue
-        if expression == "debug":
-            ENABLED_DEBUG_OUTPUT = not ENABLED_DEBUG_OUTPUT
-            print("ENABLED DEBUG OUTPUT" if ENABLED_DEBUG_OUTPUT else "DISABLED DEBUG OUTPUT")
+        if (opcode == OPCODE_LOAD):
+            # a variable is converted once, however often it is used
+            if (operand not in loaded_names):
+                assign(f"from_variable(variables[{bind('n', operand)}])")
+                loaded_names[operand] = names_stack[-1]
+            else:
+                names_stack.append(loaded_names[operand])
             continue
+        if (opcode == OPCODE_RECALL):
+            names_stack.append(registers[operand])
+            continue
+        if (opcode == OPCODE_STORE):
+            if (len(names_stack) < 1):
+                return (None, None)
+            registers[operand] = names_stack[-1]
+            continue
+        operand_count = 2 if opcode == OPCODE_BINARY else operand[1] if opcode == OPCODE_CALL else 1
+        if (len(names_stack) < operand_count):
+            return (None, None)
+        if (opcode == OPCODE_CALL):
+            argument_names = names_stack[-operand_count:]
+            del names_stack[-operand_count:]
+            assign(f"{bind('f', operand[0])}({', '.join(argument_names)})")
+            continue
+        operand_a = names_stack.pop()
+        if (opcode == OPCODE_NEGATE):
+            assign(f"-{operand_a}")
+        elif (opcode == OPCODE_FUNCTION):
+            assign(f"{bind('f', operand)}({operand_a})")
+        else:
+            operand_b = names_stack.pop()
+            if (symbol in GENERATED_OPERATORS):
+                assign(f"{operand_b} {GENERATED_OPERATORS[symbol]} {operand_a}")
+            else:
+                assign(f"{bind('b', operand)}({operand_b}, {operand_a})")
+    if (len(names_stack) != 1):
+        return (None, None)
+    lines.append(f"    return {names_stack[0]}")
+    return ("\n".join(lines) + "\n", namespace)
+
+def generate_program_function(program : tuple, engine : NumericEngine = None):
+    '''
+    Returns a function(variables) computing program with engine, or None when the program cannot be generated.
+    The function raises on any failure (unbound variable, division by zero, ...), run_program() then
+    gives the error messages. Call it inside engine.get_context().
+    '''
+    source, namespace = generate_program_source(program)
+    if (source is None):
+        return None
+    namespace["from_variable"] = get_engine(engine).from_variable
+    exec(builtins.compile(source, "<generated program>", "exec"), namespace)
+    if (LOGGER.isEnabledFor(logging.DEBUG)):
+        LOGGER.debug("generated program:\n%s", source)
+    return namespace["generated_program"]
+
+def run_generated_function(function : typing.Callable, program : tuple, variables : typing.Mapping[str, typing.Any], engine : NumericEngine):
+    '''
+    Calls the generated function of program, falls back to the interpreter when it raises.
+    Returns list(evaluated_value, errors: list[str]), same as run_program()
+    '''
+    try:
+        return (function(variables), [])
+    except Exception:
+        return run_program_in_context(program, variables, engine.from_variable)
+
+'''
+Derivative rules of the KNOWN_FUNCTIONS defaults for run_program_gradient(), rule(engine, x, y) returns
+dy/dx where y is the function value at x. They use the engine's own functions, so derivatives have the
+same precision as values. Division by zero or a domain error means the derivative is undefined at x.
+'''
+def derivative_sqrt(engine : NumericEngine, x, y):
+    return 1 / (2 * y)
+def derivative_log10(engine : NumericEngine, x, y):
+    return 1 / (x * engine.log(engine.from_literal("10")))
+def derivative_log2(engine : NumericEngine, x, y):
+    return 1 / (x * engine.log(engine.from_literal("2")))
+def derivative_sin(engine : NumericEngine, x, y):
+    return engine.functions["cos"](x)
+def derivative_cos(engine : NumericEngine, x, y):
+    return -engine.functions["sin"](x)
+def derivative_tan(engine : NumericEngine, x, y):
+    return 1 + y * y
+def derivative_cosec(engine : NumericEngine, x, y):
+    return -y * engine.functions["cot"](x)
+def derivative_sec(engine : NumericEngine, x, y):
+    return y * engine.functions["tan"](x)
+def derivative_cot(engine : NumericEngine, x, y):
+    return -(1 + y * y)
+def derivative_asin(engine : NumericEngine, x, y):
+    return 1 / engine.functions["sqrt"]((1 - x) * (1 + x))
+def derivative_acos(engine : NumericEngine, x, y):
+    return -1 / engine.functions["sqrt"]((1 - x) * (1 + x))
+def derivative_atan(engine : NumericEngine, x, y):
+    return 1 / (1 + x * x)
+
+DERIVATIVE_RULES = {"sqrt": derivative_sqrt, "log10": derivative_log10, "log2": derivative_log2, "sin": derivative_sin, "cos": derivative_cos, "tan": derivative_tan, "cosec": derivative_cosec, "sec": derivative_sec, "cot": derivative_cot, "asin": derivative_asin, "acos": derivative_acos, "atan": derivative_atan}
+
+def get_binary_partials(engine : NumericEngine, symbol : str, operand_b, operand_a, result, is_b_needed : bool, is_a_needed : bool):
+    '''
+    Returns list(d_result/d_operand_b, d_result/d_operand_a) of "operand_b symbol operand_a", a partial which
+    is not needed is 0 and not computed (x^2 needs no log(x), so it works for negative x).
+    '''
+    if (symbol == "+"):
+        return (1, 1)
+    if (symbol == "-"):
+        return (1, -1)
+    if (symbol == "*"):
+        return (operand_a, operand_b)
+    if (symbol == "/"):
+        return (1 / operand_a, -result / operand_a)
+    partial_b = operand_a * engine.power(operand_b, operand_a - 1) if is_b_needed else 0
+    partial_a = result * engine.log(operand_b) if is_a_needed else 0
+    return (partial_b, partial_a)
+
+'''
+Partial derivative rules of the KNOWN_FUNCTIONS defaults which take more than one argument,
+rule(engine, arguments, y, is_needed) returns dy/d(argument) for each of arguments, where y is the function
+value. A partial whose is_needed entry is False may be 0. At a tie min and max pass the derivative to their
+first argument, the one they return.
+'''
+def partials_min(engine : NumericEngine, arguments : list, y, is_needed : list):
+    return (1, 0) if arguments[0] <= arguments[1] else (0, 1)
+def partials_max(engine : NumericEngine, arguments : list, y, is_needed : list):
+    return (1, 0) if arguments[0] >= arguments[1] else (0, 1)
+def partials_hypot(engine : NumericEngine, arguments : list, y, is_needed : list):
+    return (arguments[0] / y, arguments[1] / y)
+def partials_atan2(engine : NumericEngine, arguments : list, y, is_needed : list):
+    squared_radius = arguments[0] * arguments[0] + arguments[1] * arguments[1]
+    return (arguments[1] / squared_radius, -arguments[0] / squared_radius)
+def partials_pow(engine : NumericEngine, arguments : list, y, is_needed : list):
+    return get_binary_partials(engine, "^", arguments[0], arguments[1], y, is_needed[0], is_needed[1])
+
+PARTIAL_DERIVATIVE_RULES = {"min": partials_min, "max": partials_max, "hypot": partials_hypot, "atan2": partials_atan2, "pow": partials_pow}
+
+def get_function_partials(engine : NumericEngine, function : typing.Callable, name : str, arguments : list, y, is_needed : list):
+    '''
+    Returns the partial derivatives of the function of a FUNCTION or CALL instruction with respect to each of
+    arguments, None when it has no derivative rule. Functions defined by an expression are differentiated
+    through their body. Raises like the rules do.
+    '''
+    if (isinstance(function, EngineExpressionFunction)):
+        return function.get_partials(arguments)
+    if (function is not engine.functions.get(name)):
+        return None
+    if (len(arguments) == 1):
+        rule = DERIVATIVE_RULES.get(name)
+        return None if rule is None else (rule(engine, arguments[0], y),)
+    rule = PARTIAL_DERIVATIVE_RULES.get(name)
+    return None if rule is None else rule(engine, arguments, y, is_needed)
+
+def run_program_gradient(program : tuple, variables : typing.Mapping[str, typing.Any] = None, engine : NumericEngine = None):
+    '''
+    Evaluates program and its partial derivative with respect to every variable in one forward and one
+    reverse pass (reverse mode automatic differentiation), with the program as the tape.
+    Native functions added to KNOWN_FUNCTIONS at runtime have no derivative rule and are an error, functions
+    defined by an expression are differentiated through their body.
+    Returns list(evaluated_value, gradient: dict[str, value], errors: list[str])
+       evaluated_value : same as run_program(), None on error.
+       gradient : variable name to partial derivative, for every variable of program. None on error.
+       errors : list[str], empty list on success.
+    '''
+    engine = DEFAULT_ENGINE if engine is None else engine
+    with engine.get_context():
+        return run_program_gradient_in_context(program, variables, engine)
+
+def get_derivative_error(char_index : int):
+    exception = sys.exc_info()[1]
+    if (isinstance(exception, ZeroDivisionError)):
+        return f"[{char_index+1}] Derivative undefined, division by zero"
+    if (isinstance(exception, (ValueError, decimal.InvalidOperation))):
+        return f"[{char_index+1}] Derivative undefined, math domain error"
+    return f"[{char_index+1}] Derivative failure, {exception}"
+
+def run_program_gradient_in_context(program : tuple, variables : typing.Mapping[str, typing.Any], engine : NumericEngine):
+    # forward pass, one tape entry per value: the instruction, its argument entries and whether it depends on a variable
+    values = []
+    tape = []
+    is_dependent = []
+    stack = []
+    registers = {}
+    try:
+        for instruction in program:
+            opcode, operand, char_index, symbol = instruction
+            if (opcode == OPCODE_RECALL):
+                stack.append(registers[operand])
+                continue
+            if (opcode == OPCODE_STORE):
+                registers[operand] = stack[-1]
+                continue
+            if (opcode == OPCODE_PUSH):
+                arguments = ()
+                value = operand
+            elif (opcode == OPCODE_LOAD):
+                arguments = ()
+                value = engine.from_variable(variables[operand])
+            elif (opcode == OPCODE_BINARY):
+                arguments = (stack[-2], stack[-1])
+                del stack[-2:]
+                value = operand(values[arguments[0]], values[arguments[1]])
+            elif (opcode == OPCODE_CALL):
+                function, argument_count = operand
+                if (len(stack) < argument_count):
+                    raise IndexError("stack error")
+                arguments = tuple(stack[-argument_count:])
+                del stack[-argument_count:]
+                value = function(*[values[argument] for argument in arguments])
+            else:
+                arguments = (stack.pop(),)
+                value = -values[arguments[0]] if opcode == OPCODE_NEGATE else operand(values[arguments[0]])
+            stack.append(len(values))
+            values.append(value)
+            tape.append((instruction, arguments))
+            is_dependent.append(opcode == OPCODE_LOAD or any([is_dependent[argument] for argument in arguments]))
+        if (len(stack) != 1):
+            raise IndexError("stack error")
+    except Exception:
+        # the interpreter reports the same failure with its usual message
+        evaluated_value, errors = run_program_in_context(program, variables, engine.from_variable)
+        return (None, None, errors if len(errors) > 0 else ["Gradient evaluation failed"])
+
+    # reverse pass, adjoints[i] is d(result)/d(values[i])
+    gradient = {}
+    for opcode, operand, char_index, symbol in program:
+        if (opcode == OPCODE_LOAD):
+            gradient[operand] = engine.from_literal("0")
+    adjoints = [0] * len(values)
+    adjoints[stack[0]] = engine.from_literal("1")
+    for tape_index in range(len(tape) - 1, -1, -1):
+        adjoint = adjoints[tape_index]
+        if (not is_dependent[tape_index] or adjoint == 0):
+            continue
+        (opcode, operand, char_index, symbol), arguments = tape[tape_index]
+        try:
+            if (opcode == OPCODE_LOAD):
+                gradient[operand] += adjoint
+            elif (opcode == OPCODE_NEGATE):
+                adjoints[arguments[0]] -= adjoint
+            elif (opcode == OPCODE_FUNCTION or opcode == OPCODE_CALL):
+                function = operand if opcode == OPCODE_FUNCTION else operand[0]
+                partials = get_function_partials(engine, function, symbol, [values[argument] for argument in arguments], values[tape_index], [is_dependent[argument] for argument in arguments])
+                if (partials is None):
+                    return (None, None, [f"[{char_index+1}] No derivative rule for function \'{symbol}\'"])
+                for argument, partial in zip(arguments, partials):
+                    adjoints[argument] += adjoint * partial
+            else:
+                argument_b, argument_a = arguments
+                partial_b, partial_a = get_binary_partials(engine, symbol, values[argument_b], values[argument_a], values[tape_index], is_dependent[argument_b], is_dependent[argument_a])
+                adjoints[argument_b] += adjoint * partial_b
+                adjoints[argument_a] += adjoint * partial_a
+        except Exception:
+            return (None, None, [get_derivative_error(char_index)])
+    return (values[stack[0]], gradient, [])
+
+def eval_lex_tokens(tokens : typing.List[Token], variables : typing.Mapping[str, typing.Any] = None, engine : typing.Union[str, NumericEngine] = None):
+    '''
+    variables : values for Token.TYPE_IDENTIFIER tokens, see lex(allow_variables = True).
+    engine : NumericEngine or engine name, None for DEFAULT_ENGINE.
+    Returns list(evaluated_value: decimal.Decimal, errors: list[str])
+       evaluated_value : decimal.Decimal() or None on error.
+       errors : list[str], empty list on success.
+    '''
+    post_fix_token_list, errors = tokens_to_postfix(tokens)
+    if (len(errors) > 0):
+        return (None, errors)
+    engine = get_engine(engine)
+    program, errors = build_program(post_fix_token_list, engine)
+    if (len(errors) > 0):
+        return (None, errors)
+    return run_program(program, variables, engine)
+
+class CompiledExpression:
+    '''
+    Immutable result of compile(). Holds the postfix program with every operator and function already
+    resolved, so evaluate() only runs the stack machine.
+       variables : tuple of free variable names, in order of first use.
+       eliminated_node_count : instructions removed by optimize_program(), 0 when not optimized.
+       engine : NumericEngine the program was built with and runs with.
+       function : generated python function of the program (see generate_program_function()), None when
+                  evaluate() runs the interpreter.
+    '''
+    __slots__ = ("expression", "program", "variables", "eliminated_node_count", "engine", "function")
+    def __init__(self, expression : str, program : tuple, eliminated_node_count : int = 0, engine : NumericEngine = None, function : typing.Callable = None):
+        object.__setattr__(self, "expression", expression)
+        object.__setattr__(self, "program", program)
+        object.__setattr__(self, "eliminated_node_count", eliminated_node_count)
+        object.__setattr__(self, "engine", get_engine(engine))
+        object.__setattr__(self, "function", function)
+        variables = []
+        for opcode, operand, char_index, symbol in program:
+            if (opcode == OPCODE_LOAD and operand not in variables):
+                variables.append(operand)
+        object.__setattr__(self, "variables", tuple(variables))
+    def __setattr__(self, name, value):
+        raise AttributeError(f"CompiledExpression is immutable, cannot set \'{name}\'")
+    def __delattr__(self, name):
+        raise AttributeError(f"CompiledExpression is immutable, cannot delete \'{name}\'")
+    def __repr__(self):
+        return f"CompiledExpression({self.expression!r})"
+    def evaluate(self, variables : typing.Mapping[str, typing.Any] = None):
+        '''
+        variables : mapping of variable name to value, for example {"x": 2.5}
+        Returns list(evaluated_value: decimal.Decimal, errors: list[str]), same as eval_lex_tokens()
+        '''
+        if (self.function is None):
+            return run_program(self.program, variables, self.engine)
+        with self.engine.get_context():
+            return run_generated_function(self.function, self.program, variables, self.engine)
+    def gradient(self, variables : typing.Mapping[str, typing.Any] = None):
+        '''
+        Value and partial derivatives with respect to every variable, in one pass, see run_program_gradient()
+        Returns list(evaluated_value, gradient: dict[str, value], errors: list[str])
+        '''
+        return run_program_gradient(self.program, variables, self.engine)
+    def dump(self):
+        '''
+        Returns the program listing, see format_program()
+        '''
+        return format_program(self.program)
+
+def compile(expression : str, optimize : bool = False, engine : typing.Union[str, NumericEngine] = None, codegen : bool = False):
+    '''
+    Lexes and converts expression to postfix once, for repeated evaluation.
+    optimize : run optimize_program() on the result, see CompiledExpression.eliminated_node_count
+    engine : NumericEngine or engine name ("float", "decimal", "fraction", "interval"), None for DEFAULT_ENGINE.
+             For another precision pass an engine, for example compile("sqrt(2)", engine = DecimalEngine(50))
+    codegen : also generate a python function of the program, evaluate() then makes one call instead of
+              running the interpreter, see generate_program_function()
+    Returns list(compiled_expression: CompiledExpression, errors: list[str])
+       compiled_expression : CompiledExpression() or None on error.
+       errors : list[str], empty list on success.
+    '''
+    tokens = lex(expression, allow_variables = True)
+    errors = get_lex_errors(tokens)
+    if (len(errors) > 0):
+        return (None, errors)
+    post_fix_token_list, errors = tokens_to_postfix(tokens)
+    if (len(errors) > 0):
+        return (None, errors)
+    engine = get_engine(engine)
+    program, errors = build_program(post_fix_token_list, engine)
+    if (len(errors) > 0):
+        return (None, errors)
+    eliminated_node_count = 0
+    if (optimize):
+        program, eliminated_node_count = optimize_program(program, engine)
+    function = generate_program_function(program, engine) if codegen else None
+    return (CompiledExpression(expression, program, eliminated_node_count, engine, function), errors)
+
+def evaluate(expression : typing.Union[str, CompiledExpression], variables : typing.Mapping[str, typing.Any] = None, engine : typing.Union[str, NumericEngine] = None):
+    '''
+    expression : expression string or CompiledExpression, names not known as constants or functions are variables.
+    variables : mapping of variable name to value, for example evaluate("x^2 + 3*x", {"x": 2.5})
+    engine : engine to compile an expression string with, a CompiledExpression keeps its own.
+    Returns list(evaluated_value: decimal.Decimal, errors: list[str])
+    '''
+    if (not isinstance(expression, CompiledExpression)):
+        expression, errors = compile(expression, engine = engine)
+        if (expression is None):
+            return (None, errors)
+    return expression.evaluate(variables)
+
+def gradient(expression : typing.Union[str, CompiledExpression], variables : typing.Mapping[str, typing.Any] = None, engine : typing.Union[str, NumericEngine] = None):
+    '''
+    Value and partial derivatives of expression, for example gradient("x^2*y", {"x": 3, "y": 2})
+    gives 18 and {"x": 12, "y": 9}.
+    engine : engine to compile an expression string with, a CompiledExpression keeps its own.
+    Returns list(evaluated_value, gradient: dict[str, value], errors: list[str]), see run_program_gradient()
+    '''
+    if (not isinstance(expression, CompiledExpression)):
+        expression, errors = compile(expression, engine = engine)
+        if (expression is None):
+            return (None, None, errors)
+    return expression.gradient(variables)
+
+def evaluate_many(expression : typing.Union[str, CompiledExpression], rows : typing.Iterable[typing.Mapping[str, typing.Any]], engine : typing.Union[str, NumericEngine] = None):
+    '''
+    Parses expression once and evaluates it for every set of variables in rows.
+    engine : engine to compile an expression string with, a CompiledExpression keeps its own.
+    Returns list[list(evaluated_value: decimal.Decimal, errors: list[str])], one entry per row, in order.
+    '''
+    if (not isinstance(expression, CompiledExpression)):
+        compiled_expression, errors = compile(expression, engine = engine)
+        if (compiled_expression is None):
+            return [(None, errors) for row in rows]
+        expression = compiled_expression
+    program = expression.program
+    engine = expression.engine
+    function = expression.function
+    with engine.get_context():
+        if (function is not None):
+            return [run_generated_function(function, program, row, engine) for row in rows]
+        return [run_program_in_context(program, row, engine.from_variable) for row in rows]
+
+def get_split_variable(box : dict):
+    '''
+    Returns the name of the widest variable of box with a finite width, None when no variable can be split.
+    '''
+    split_name = None
+    split_width = 0
+    for name, x in box.items():
+        width = x.width()
+        if (width > split_width and not math.isinf(width)):
+            split_name = name
+            split_width = width
+    return split_name
+
+def bound(expression : typing.Union[str, CompiledExpression], ranges : typing.Mapping[str, typing.Any], subdivisions : int = 0):
+    '''
+    Bounds of expression over ranges of its variables without sampling, for example bound("x^2 - 2*x", {"x": (0, 3)}).
+    Every point of the ranges evaluates to a value inside the returned Interval, see IntervalEngine. One evaluation
+    over-estimates when a variable appears more than once (x - x gives [-1, 1] for x in [-1, 1]), subdivisions
+    tightens that: the box with the widest result is bisected on its widest variable subdivisions times and the
+    union of the parts is returned. Parts where the expression fails (sqrt of a negative range, ...) are left
+    out and the result is marked clipped.
+    expression : expression string or CompiledExpression of the interval engine.
+    ranges : mapping of variable name to Interval, (lo, hi) pair or number.
+    Returns list(enclosure: Interval, errors: list[str]), enclosure is None on error.
+    '''
+    if (not isinstance(expression, CompiledExpression)):
+        expression, errors = compile(expression, engine = IntervalEngine())
+        if (expression is None):
+            return (None, errors)
+    if (expression.engine.name != IntervalEngine.name):
+        return (None, [f"bound() needs an expression compiled with the interval engine, not \'{expression.engine.name}\'"])
+    try:
+        box = {name: interval_from_value(value) for name, value in ranges.items()}
+    except (ValueError, TypeError) as error:
+        return (None, [f"Invalid range: {error}"])
+    enclosure, errors = expression.evaluate(box)
+    if (len(errors) > 0):
+        return (None, errors)
+
+    import heapq
+    # heap of (-result width, part index, box, result), the widest result first
+    parts = [(-enclosure.width(), 0, box, enclosure)]
+    part_count = 1
+    is_clipped = False
+    for subdivision_index in range(subdivisions):
+        width, part_index, box, result = parts[0]
+        split_name = get_split_variable(box)
+        if (split_name is None):
+            break
+        heapq.heappop(parts)
+        x = box[split_name]
+        middle = x.lo / 2 + x.hi / 2
+        for half in (Interval(x.lo, middle), Interval(middle, x.hi)):
+            half_box = dict(box)
+            half_box[split_name] = half
+            half_result, errors = expression.evaluate(half_box)
+            if (len(errors) > 0):
+                is_clipped = True
+                continue
+            heapq.heappush(parts, (-half_result.width(), part_count, half_box, half_result))
+            part_count += 1
+        if (len(parts) == 0):
+            break
+    if (len(parts) == 0):
+        return (Interval(enclosure.lo, enclosure.hi, True), [])
+    # the union of the parts and the first result both enclose the value, keep their intersection
+    lo = max(enclosure.lo, min([result.lo for width, part_index, box, result in parts]))
+    hi = min(enclosure.hi, max([result.hi for width, part_index, box, result in parts]))
+    is_clipped = is_clipped or any([result.clipped for width, part_index, box, result in parts])
+    return (Interval(lo, hi, is_clipped), [])
+
+'''
+User defined functions. register_function() adds a native python function, define_function() one defined by
+an expression such as "f(x, y) = x^2 + y". The body of an expression function is lexed once when it is defined
+and built and optimized once per engine type and precision, a call only runs that program, nothing is re-parsed.
+'''
+class ExpressionFunctionError(Exception):
+    '''
+    Raised by a call of a function defined by an expression when its body fails, holds the body's error.
+    '''
+
+class ExpressionFunction:
+    '''
+    KNOWN_FUNCTIONS entry created by define_function(). Engines call it through get_engine_function().
+       name : function name.
+       parameters : tuple of parameter names, in argument order.
+       definition : definition text, for example "f(x, y) = x^2 + y"
+       tokens : the lexed body, parameters are Token.TYPE_IDENTIFIER tokens.
+    '''
+    def __init__(self, name : str, parameters : tuple, definition : str, tokens : typing.List[Token]):
+        self.name = name
+        self.parameters = parameters
+        self.definition = definition
+        self.tokens = tokens
+        self.engine_functions = {}
+        self.namespace_version = None
+        self.is_building = False
+    def __repr__(self):
+        return f"ExpressionFunction({self.definition!r})"
+    def __call__(self, *arguments):
+        with DEFAULT_ENGINE.get_context():
+            return self.get_engine_function(DEFAULT_ENGINE)(*arguments)
+    def get_engine_function(self, engine : NumericEngine):
+        '''
+        Returns the EngineExpressionFunction for engine, built on first use and again after KNOWN_CONSTS or
+        KNOWN_FUNCTIONS changed. Raises ValueError when the body does not build, for example when a function
+        it calls was removed or calls this one.
+        '''
+        namespace_version = (get_namespace_version(KNOWN_CONSTS), get_namespace_version(KNOWN_FUNCTIONS))
+        if (namespace_version != self.namespace_version):
+            self.engine_functions.clear()
+            self.namespace_version = namespace_version
+        # engines of one type and precision build the same program, compile() creates a new one per engine name
+        key = (type(engine), engine.precision)
+        engine_function = self.engine_functions.get(key)
+        if (engine_function is not None):
+            return engine_function
+        if (self.is_building):
+            raise ValueError(f"Function \'{self.name}\' is defined in terms of itself")
+        self.is_building = True
+        try:
+            post_fix_token_list, errors = tokens_to_postfix(self.tokens)
+            if (len(errors) == 0):
+                program, errors = build_program(post_fix_token_list, engine)
+        except KeyError as error:
+            raise ValueError(f"Function \'{self.name}\' uses {error}, which is no longer defined")
+        finally:
+            self.is_building = False
+        error = errors[0] if len(errors) > 0 else get_program_stack_error(program)
+        if (error is not None):
+            raise ValueError(f"Function \'{self.name}\' does not build, {error}")
+        program, eliminated_node_count = optimize_program(program, engine)
+        engine_function = EngineExpressionFunction(self.name, self.parameters, program, engine)
+        self.engine_functions[key] = engine_function
+        return engine_function
+
+class EngineExpressionFunction:
+    '''
+    Body of an ExpressionFunction built for one engine, called with one number per parameter inside the
+    engine's context. Raises ExpressionFunctionError when the body fails.
+    '''
+    __slots__ = ("name", "parameters", "program", "engine", "from_variable")
+    def __init__(self, name : str, parameters : tuple, program : tuple, engine : NumericEngine):
+        self.name = name
+        self.parameters = parameters
+        self.program = program
+        self.engine = engine
+        self.from_variable = engine.from_variable
+    def __call__(self, *arguments):
+        evaluated_value, errors = run_program_in_context(self.program, dict(zip(self.parameters, arguments)), self.from_variable)
+        if (len(errors) > 0):
+            raise ExpressionFunctionError(f"{self.name}(): {errors[0]}")
+        return evaluated_value
+    def get_partials(self, arguments : list):
+        '''
+        Returns the partial derivatives with respect to each argument, see run_program_gradient().
+        '''
+        evaluated_value, gradient, errors = run_program_gradient_in_context(self.program, dict(zip(self.parameters, arguments)), self.engine)
+        if (len(errors) > 0):
+            raise ExpressionFunctionError(f"{self.name}(): {errors[0]}")
+        return tuple([gradient.get(parameter, 0) for parameter in self.parameters])
+
+def register_function(name : str, function : typing.Callable, arity : int = 1, variadic : bool = False):
+    '''
+    Adds or replaces the KNOWN_FUNCTIONS entry name with a native python function of arity numbers, its result
+    is passed to the engine's from_variable(), for example register_function("clamp", lambda x, low, high: min(max(x, low), high), 3).
+    variadic : function of two arguments which also takes more, f(a, b, c) is evaluated as f(f(a, b), c).
+    Raises ValueError when name is not a name or is a constant, or for an arity below 1.
+    '''
+    if (not name.isidentifier() or name in KNOWN_CONSTS):
+        raise ValueError(f"\'{name}\' cannot be a function name")
+    if (arity < 1 or (variadic and arity != 2)):
+        raise ValueError(f"Function \'{name}\' cannot take {arity} arguments{', variadic functions take 2' if variadic else ''}")
+    if (arity == 1):
+        FUNCTION_ARITIES.pop(name, None)
     else:
-        expression = sys.argv[1]
-    lex_tokens = lex(expression)
-    lex_error_count = print_lex_errors(lex_tokens)
-    if (lex_error_count > 0):
-        if is_interactive:
-            print(f"{lex_error_count} error(s)")
+        FUNCTION_ARITIES[name] = arity
+    if (variadic):
+        VARIADIC_FUNCTIONS.add(name)
+    else:
+        VARIADIC_FUNCTIONS.discard(name)
+    KNOWN_FUNCTIONS[name] = function
+
+FUNCTION_DEFINITION_PATTERN = re.compile(r"\s*([^\W\d]\w*)\s*\(([^()]*)\)\s*=(.*)", re.DOTALL)
+
+def define_function(definition : str):
+    '''
+    Adds or replaces a function defined by an expression, for example define_function("f(x, y) = x^2 + y"),
+    after which "f(2, 1)" evaluates to 5. The body can use its parameters, constants and functions defined
+    before, but not the function itself.
+    Returns list(expression_function: ExpressionFunction, errors: list[str])
+       expression_function : the new KNOWN_FUNCTIONS entry, None on error.
+       errors : list[str], empty list on success. Positions count from the start of definition.
+    '''
+    match = FUNCTION_DEFINITION_PATTERN.fullmatch(definition)
+    if (match is None):
+        return (None, ["Function definition must look like name(x, y) = expression"])
+    name, parameter_list, body = match.groups()
+    parameters = tuple([parameter.strip() for parameter in parameter_list.split(",")])
+    if (name in KNOWN_CONSTS):
+        return (None, [f"\'{name}\' is a constant, not a function name"])
+    if (parameter_list.strip() == ""):
+        return (None, [f"Function \'{name}\' needs at least one parameter"])
+    for parameter in parameters:
+        if (not parameter.isidentifier()):
+            return (None, [f"Parameter \'{parameter}\' of {name}() is not a name"])
+        if (parameter in KNOWN_CONSTS or parameter in KNOWN_FUNCTIONS):
+            return (None, [f"Parameter \'{parameter}\' of {name}() is a known constant or function"])
+    if (len(set(parameters)) != len(parameters)):
+        return (None, [f"Parameters of {name}() must have different names"])
+
+    tokens = lex(body, allow_variables = True)
+    body_index = match.start(3)
+    for token in tokens:
+        token.char_index += body_index
+    errors = get_lex_errors(tokens)
+    for token in tokens:
+        if (token.type == Token.TYPE_IDENTIFIER and token.lexeame not in parameters):
+            errors.append(f"[{token.char_index+1}] Unknown constant, function or parameter \'{token.lexeame}\'")
+        elif (token.type == Token.TYPE_FUNCTION and token.lexeame == name):
+            errors.append(f"[{token.char_index+1}] Function \'{name}\' cannot call itself")
+    if (len(errors) == 0 and len(tokens) == 0):
+        errors.append(f"Function \'{name}\' has an empty body")
+    if (len(errors) > 0):
+        return (None, errors)
+
+    # registered first, so the test build finds functions which would call this one back
+    expression_function = ExpressionFunction(name, parameters, definition.strip(), tokens)
+    previous_entry = (KNOWN_FUNCTIONS.get(name), FUNCTION_ARITIES.get(name, 1), name in VARIADIC_FUNCTIONS)
+    register_function(name, expression_function, len(parameters))
+    try:
+        expression_function.get_engine_function(DEFAULT_ENGINE)
+    except ValueError as error:
+        if (previous_entry[0] is None):
+            del KNOWN_FUNCTIONS[name]
+            FUNCTION_ARITIES.pop(name, None)
+        else:
+            register_function(name, *previous_entry)
+        return (None, [str(error)])
+    return (expression_function, [])
+
+def get_function_definitions():
+    '''
+    Returns the definitions of the KNOWN_FUNCTIONS entries created by define_function(), in KNOWN_FUNCTIONS order.
+    '''
+    return [function.definition for function in KNOWN_FUNCTIONS.values() if isinstance(function, ExpressionFunction)]
+
+def get_registered_functions():
+    '''
+    Returns list of (name, function, arity, variadic) for the KNOWN_FUNCTIONS entries added or replaced by
+    register_function(), in KNOWN_FUNCTIONS order.
+    '''
+    return [(name, function, FUNCTION_ARITIES.get(name, 1), name in VARIADIC_FUNCTIONS) for name, function in KNOWN_FUNCTIONS.items()
+            if not isinstance(function, ExpressionFunction) and function is not DEFAULT_FUNCTIONS.get(name)]
+
+NUMPY_MODULE = None
+NUMPY_IMPORT_ATTEMPTED = False
+def import_numpy():
+    '''
+    Returns the numpy module, or None when it is not installed. The import only happens on first use.
+    '''
+    global NUMPY_MODULE, NUMPY_IMPORT_ATTEMPTED
+    if (not NUMPY_IMPORT_ATTEMPTED):
+        NUMPY_IMPORT_ATTEMPTED = True
+        try:
+            import numpy
+            NUMPY_MODULE = numpy
+        except ImportError:
+            NUMPY_MODULE = None
+    return NUMPY_MODULE
+
+def get_numpy_functions(numpy):
+    '''
+    Returns dict of KNOWN_FUNCTIONS name to a callable applying it to a whole float64 array.
+    '''
+    return {
+        "sqrt": numpy.sqrt, "log10": numpy.log10, "log2": numpy.log2,
+        "cos": numpy.cos, "sin": numpy.sin, "tan": numpy.tan,
+        "cosec": lambda x: numpy.reciprocal(numpy.sin(x)),
+        "sec": lambda x: numpy.reciprocal(numpy.cos(x)),
+        "cot": lambda x: numpy.reciprocal(numpy.tan(x)),
+        "acos": numpy.arccos, "asin": numpy.arcsin, "atan": numpy.arctan,
+        "min": numpy.minimum, "max": numpy.maximum, "hypot": numpy.hypot, "atan2": numpy.arctan2, "pow": numpy.power,
+    }
+
+def vectorize_scalar_function(numpy, function):
+    # Fallback for functions without a ufunc (for example ones added to KNOWN_FUNCTIONS at runtime)
+    def scalar_function(*arguments):
+        try:
+            return float(function(*arguments))
+        except Exception:
+            return math.nan
+    return numpy.vectorize(scalar_function, otypes = [numpy.float64])
+
+def get_numpy_function(numpy, numpy_functions : dict, function : typing.Callable, name : str):
+    '''
+    Returns a callable applying function, the operand of a FUNCTION or CALL instruction, to whole float64 arrays.
+    The ufunc of numpy_functions while KNOWN_FUNCTIONS[name] is the default, the body of a function defined by
+    an expression run on the arrays, otherwise function called per element.
+    '''
+    if (isinstance(function, EngineExpressionFunction)):
+        def run_body(*arguments):
+            values, errors = run_program_numpy(numpy, function.program, dict(zip(function.parameters, arguments)))
+            return values if len(errors) == 0 else numpy.full(numpy.broadcast(*arguments).shape, numpy.nan)
+        return run_body
+    numpy_function = numpy_functions.get(name)
+    if (numpy_function is not None and KNOWN_FUNCTIONS.get(name) is DEFAULT_FUNCTIONS.get(name)):
+        return numpy_function
+    return vectorize_scalar_function(numpy, function)
+
+def run_program_numpy(numpy, program : tuple, variables : typing.Mapping[str, typing.Any] = None):
+    '''
+    Runs program once over whole float64 arrays, every operator and function is a single ufunc call.
+    Returns list(values: numpy.ndarray, errors: list[str])
+       values : float64 array broadcast from the variables, NaN where an element failed
+                (division by zero, domain error, overflow). None on error.
+       errors : list[str], problems affecting the whole batch, empty list on success.
+    '''
+    binary_ufuncs = {"+": numpy.add, "-": numpy.subtract, "*": numpy.multiply, "/": numpy.divide, "^": numpy.power}
+    numpy_functions = get_numpy_functions(numpy)
+    errors = []
+    numbers_stack = []
+    registers = {}
+    push = numbers_stack.append
+    pop = numbers_stack.pop
+    invalid_mask = False
+    shape = ()
+    with numpy.errstate(all = "ignore"):
+        for opcode, operand, char_index, symbol in program:
+            if (opcode == OPCODE_PUSH):
+                push(numpy.float64(operand))
+                continue
+            if (opcode == OPCODE_LOAD):
+                if (variables is None or operand not in variables):
+                    errors.append(f"[{char_index+1}] Unbound variable \'{operand}\'")
+                    break
+                try:
+                    value = numpy.asarray(variables[operand], dtype = numpy.float64)
+                except (TypeError, ValueError):
+                    errors.append(f"[{char_index+1}] Variable \'{operand}\' has a non numeric value")
+                    break
+                # checked here, a mismatch would otherwise raise from the first ufunc that combines them
+                try:
+                    shape = numpy.broadcast_shapes(shape, value.shape)
+                except ValueError:
+                    if (value.ndim == 1 and len(shape) == 1):
+                        errors.append(f"Variable \'{operand}\' has length {len(value)}, expected {shape[0]}")
+                    else:
+                        errors.append(f"Variable \'{operand}\' has shape {value.shape}, expected one that broadcasts to {shape}")
+                    break
+                push(value)
+                continue
+            if (opcode == OPCODE_RECALL):
+                push(registers[operand])
+                continue
+            if (opcode == OPCODE_STORE):
+                registers[operand] = numbers_stack[-1]
+                continue
+            if (opcode == OPCODE_CALL):
+                function, argument_count = operand
+                if (len(numbers_stack) < argument_count):
+                    errors.append("Too many operators, for the number of operands")
+                    break
+                arguments = numbers_stack[-argument_count:]
+                del numbers_stack[-argument_count:]
+                result = get_numpy_function(numpy, numpy_functions, function, symbol)(*arguments)
+            else:
+                if (len(numbers_stack) < 1):
+                    errors.append("Too many operators, for the number of operands")
+                    break
+                operand_a = pop()
+                if (opcode == OPCODE_NEGATE):
+                    push(numpy.negative(operand_a))
+                    continue
+                if (opcode == OPCODE_FUNCTION):
+                    result = get_numpy_function(numpy, numpy_functions, operand, symbol)(operand_a)
+                else:
+                    if (len(numbers_stack) < 1):
+                        errors.append("Too many operators, for the number of operands")
+                        break
+                    operand_b = pop()
+                    result = binary_ufuncs[symbol](operand_b, operand_a)
+            # an infinity or NaN is an error in the scalar path, remember it so later
+            # operations (for example 1/(1/0) or (1/0)^0) cannot hide it
+            invalid_mask = invalid_mask | ~numpy.isfinite(result)
+            push(result)
+
+    if (len(errors) == 0 and len(numbers_stack) > 1):
+        errors.append(f"Too few operators, for the number of operands, {len(numbers_stack)} specifically")
+    if (len(errors) == 0 and len(numbers_stack) == 0):
+        errors.append("Empty expression, no value to evaluate")
+    if (len(errors) > 0):
+        return (None, errors)
+    values = numpy.array(numpy.broadcast_to(numbers_stack[0], numpy.broadcast(numbers_stack[0], invalid_mask).shape), dtype = numpy.float64)
+    values[numpy.broadcast_to(invalid_mask, values.shape)] = numpy.nan
+    return (values, errors)
+
+def run_program_elementwise(program : tuple, variables : typing.Mapping[str, typing.Any] = None, engine : NumericEngine = None):
+    '''
+    Pure python fallback for run_program_numpy() when numpy is not installed, runs the scalar
+    program once per element. Sequence variables must share one length, other values are broadcast.
+    Returns list(values: list[float], errors: list[str])
+    '''
+    variables = {} if variables is None else variables
+    for opcode, operand, char_index, symbol in program:
+        if (opcode == OPCODE_LOAD and operand not in variables):
+            return (None, [f"[{char_index+1}] Unbound variable \'{operand}\'"])
+    length = 1
+    sequence_names = []
+    for name, value in variables.items():
+        if (isinstance(value, (str, bytes)) or not hasattr(value, "__len__")):
+            continue
+        if (len(sequence_names) > 0 and len(value) != length):
+            return (None, [f"Variable \'{name}\' has length {len(value)}, expected {length}"])
+        length = len(value)
+        sequence_names.append(name)
+
+    values = []
+    row = dict(variables)
+    for element_index in range(length):
+        for name in sequence_names:
+            row[name] = variables[name][element_index]
+        value, errors = run_program(program, row, engine)
+        value = math.nan if value is None else float(value)
+        values.append(value if math.isfinite(value) else math.nan)
+    return (values, [])
+
+def evaluate_array(expression : typing.Union[str, CompiledExpression], variables : typing.Mapping[str, typing.Any] = None):
+    '''
+    Evaluates expression over whole arrays of inputs at once, for example
+    evaluate_array("x^2 + 3*x", {"x": numpy.linspace(0, 1, 1000)}).
+    Uses numpy ufuncs on float64 when numpy is installed, otherwise falls back to running the
+    scalar program per element and returns a list of floats.
+    Returns list(values, errors: list[str])
+       values : float64 values, NaN where that element failed. None on error.
+       errors : list[str], problems affecting the whole batch, empty list on success.
+    '''
+    if (not isinstance(expression, CompiledExpression)):
+        expression, errors = compile(expression)
+        if (expression is None):
+            return (None, errors)
+    if (expression.engine.name == IntervalEngine.name):
+        # Intervals are not float64 values, bound() takes ranges
+        return (None, [f"evaluate_array() needs an expression of a real number engine, not '{expression.engine.name}'"])
+    numpy = import_numpy()
+    if (numpy is None):
+        return run_program_elementwise(expression.program, variables, expression.engine)
+    return run_program_numpy(numpy, expression.program, variables)
+
+def evaluate_checked_tokens(tokens : typing.List[Token]):
+    '''
+    Returns list(evaluated_value: decimal.Decimal, errors: list[str]), lex errors included in errors.
+    '''
+    errors = get_lex_errors(tokens)
+    if (len(errors) > 0):
+        return (None, errors)
+    return eval_lex_tokens(tokens)
+
+class ResultCache:
+    '''
+    Bounded LRU cache of evaluation results, keyed on the token stream so "1+2" and " 1 + 2 " share an entry.
+    Both values and error lists are cached. Entries are dropped when KNOWN_CONSTS, KNOWN_FUNCTIONS, DEFAULT_ENGINE
+    or the expression limits change.
+    Error messages hold char positions, so an error entry is only reused when the positions match too.
+    '''
+    def __init__(self, max_size : int = 1024):
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.namespace_version = None
+    def clear(self):
+        self.entries.clear()
+    def check_namespace(self):
+        namespace_version = (get_namespace_version(KNOWN_CONSTS), get_namespace_version(KNOWN_FUNCTIONS), DEFAULT_ENGINE, get_expression_limits())
+        if (namespace_version != self.namespace_version):
+            self.entries.clear()
+            self.namespace_version = namespace_version
+    def evaluate_tokens(self, tokens : typing.List[Token]):
+        '''
+        Returns list(evaluated_value: decimal.Decimal, errors: list[str]), same as evaluate_checked_tokens()
+        '''
+        self.check_namespace()
+        key = tuple([(token.type, token.lexeame if token.type != Token.TYPE_BAD else token.error_object.string) for token in tokens])
+        entry = self.entries.get(key)
+        if (entry is not None):
+            evaluated_value, errors, char_indices = entry
+            if (len(errors) == 0 or char_indices == tuple([token.char_index for token in tokens])):
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return (evaluated_value, list(errors))
+        self.misses += 1
+        evaluated_value, errors = evaluate_checked_tokens(tokens)
+        char_indices = tuple([token.char_index for token in tokens]) if len(errors) > 0 else None
+        self.entries[key] = (evaluated_value, tuple(errors), char_indices)
+        self.entries.move_to_end(key)
+        if (len(self.entries) > self.max_size):
+            self.entries.popitem(last = False)
+            self.evictions += 1
+        return (evaluated_value, errors)
+    def evaluate(self, expression : str):
+        return self.evaluate_tokens(lex(expression))
+    def get_stats(self):
+        return {"size": len(self.entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+    def print_stats(self):
+        lookups = self.hits + self.misses
+        hit_rate = (100 * self.hits / lookups) if lookups > 0 else 0
+        print(f"Cache: {len(self.entries)}/{self.max_size} entries, {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate), {self.evictions} evictions")
+
+# ResultCache used by evaluate_expression_string(), None when caching is disabled
+RESULT_CACHE = None
+def set_result_cache_size(max_size : int):
+    '''
+    Enables the result cache with room for max_size entries, 0 disables it.
+    '''
+    global RESULT_CACHE
+    RESULT_CACHE = ResultCache(max_size) if max_size > 0 else None
+
+def evaluate_expression_string(expression : str):
+    '''
+    Lexes and evaluates expression the same way the command line does, lex errors included.
+    Goes through RESULT_CACHE when it is enabled.
+    Returns list(evaluated_value: decimal.Decimal, errors: list[str])
+    '''
+    tokens = lex(expression)
+    if (RESULT_CACHE is not None):
+        return RESULT_CACHE.evaluate_tokens(tokens)
+    return evaluate_checked_tokens(tokens)
+
+def format_batch_result(evaluated_value, errors : typing.List[str]):
+    if (len(errors) > 0):
+        return "Error: " + "; ".join(errors)
+    return str(evaluated_value)
+
+def evaluate_batch_expression(expression : str):
+    '''
+    Evaluates and formats expression for input where one expression must not end the run, an exception
+    raised on the way (formatting an exact result too long to print included) becomes its error.
+    Returns list(result: str, is_exception: bool), result as format_batch_result() gives it.
+    '''
+    try:
+        evaluated_value, errors = evaluate_expression_string(expression)
+        return (format_batch_result(evaluated_value, errors), False)
+    except Exception as error:
+        return (format_batch_result(None, [f"Internal error, {type(error).__name__}: {error}"]), True)
+
+def evaluate_batch_lines(lines : typing.Iterable[str], failures : list = None):
+    '''
+    Generator, yields one output line (newline terminated) per input line, in input order.
+    Blank input lines give blank output lines so line numbers stay aligned. A line that raises gives an
+    error line like any other error.
+    failures : list that gets the error of every line that raised, None to not collect them.
+    '''
+    for line in lines:
+        expression = line.strip()
+        if (len(expression) == 0):
+            yield "\n"
             continue
+        result, is_exception = evaluate_batch_expression(expression)
+        if (is_exception and failures is not None):
+            failures.append(result)
+        yield result + "\n"
+
+def evaluate_batch_chunk(lines : typing.List[str]):
+    # runs inside a worker process, returns list(output text for the whole chunk, errors of the lines that raised)
+    failures = []
+    return ("".join(evaluate_batch_lines(lines, failures)), failures)
+
+def init_batch_worker(cache_size : int = 0, engine_name : str = "decimal", precision : int = None, limits : tuple = (None, None, None), definitions : tuple = (),
+                      constants : dict = None, registered_functions : tuple = (), function_names : tuple = None):
+    set_debug_output(False)
+    set_result_cache_size(cache_size)
+    set_default_engine(create_engine(engine_name, precision))
+    set_expression_limits(*limits)
+    if (constants is not None):
+        KNOWN_CONSTS.clear()
+        KNOWN_CONSTS.update(constants)
+    for name, function, arity, variadic in registered_functions:
+        register_function(name, function, arity, variadic)
+    if (function_names is not None):
+        # default functions removed in the parent process
+        for name in [name for name in KNOWN_FUNCTIONS if name not in function_names]:
+            del KNOWN_FUNCTIONS[name]
+    # a redefined function keeps its place, so one it calls can come later in definitions
+    pending_definitions = list(definitions)
+    while (len(pending_definitions) > 0):
+        failed_definitions = [definition for definition in pending_definitions if define_function(definition)[0] is None]
+        if (len(failed_definitions) == len(pending_definitions)):
+            break
+        pending_definitions = failed_definitions
+
+def get_batch_worker_initargs():
+    '''
+    Returns the init_batch_worker() arguments that set a worker up like this process: engine, limits, KNOWN_CONSTS
+    and every function from define_function() and register_function().
+    Raises ValueError when a registered function cannot be pickled and workers are not forked, a worker could
+    not get it.
+    '''
+    import multiprocessing
+    import pickle
+    cache_size = 0 if RESULT_CACHE is None else RESULT_CACHE.max_size
+    registered_functions = tuple(get_registered_functions())
+    if (multiprocessing.get_start_method() != "fork"):
+        for name, function, arity, variadic in registered_functions:
+            try:
+                pickle.dumps(function)
+            except Exception:
+                raise ValueError(f"Function \'{name}\' cannot be sent to worker processes, register a module level function or use one job")
+    return (cache_size, DEFAULT_ENGINE.name, DEFAULT_ENGINE.precision, get_expression_limits(), tuple(get_function_definitions()),
+            dict(KNOWN_CONSTS), registered_functions, tuple(KNOWN_FUNCTIONS))
+
+def chunk_lines(lines : typing.Iterable[str], chunk_size : int):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if (len(chunk) >= chunk_size):
+            yield chunk
+            chunk = []
+    if (len(chunk) > 0):
+        yield chunk
+
+def get_batch_chunk_text(chunk_future, failures : list = None):
+    # waits for an evaluate_batch_chunk() future, returns its output text and adds its failures to failures
+    text, chunk_failures = chunk_future.result()
+    if (failures is not None):
+        failures += chunk_failures
+    return text
+
+DEFAULT_BATCH_CHUNK_SIZE = 2048
+def evaluate_batch_lines_parallel(lines : typing.Iterable[str], jobs : int, chunk_size : int = DEFAULT_BATCH_CHUNK_SIZE, failures : list = None):
+    '''
+    Generator, same output as evaluate_batch_lines() but chunks of chunk_size lines are evaluated on a pool of
+    jobs worker processes. The pool is created once and reused for every chunk. Results are yielded
+    per chunk in input order, with at most 2*jobs chunks in flight so memory stays bounded.
+    failures : list that gets the error of every line that raised, None to not collect them.
+    '''
+    import concurrent.futures
+    max_pending_chunks = jobs * 2
+    with concurrent.futures.ProcessPoolExecutor(max_workers = jobs, initializer = init_batch_worker, initargs = get_batch_worker_initargs()) as executor:
+        pending_chunks = collections.deque()
+        for chunk in chunk_lines(lines, chunk_size):
+            pending_chunks.append(executor.submit(evaluate_batch_chunk, chunk))
+            if (len(pending_chunks) >= max_pending_chunks):
+                yield get_batch_chunk_text(pending_chunks.popleft(), failures)
+        while (len(pending_chunks) > 0):
+            yield get_batch_chunk_text(pending_chunks.popleft(), failures)
+
+BATCH_IO_BUFFER_SIZE = 1 << 16
+def open_batch_streams(input_path : str = None, output_path : str = None):
+    '''
+    Returns list(input_file, output_file), buffered text streams. stdin/stdout are used when a path is None,
+    reopened without line buffering so a pipe is not flushed per result. Undecodable input bytes become U+FFFD,
+    so they fail in lex() as an error of their own line, like in bulk mode.
+    '''
+    if (input_path is None):
+        input_file = open(sys.stdin.fileno(), "r", buffering = BATCH_IO_BUFFER_SIZE, encoding = "utf-8", errors = "replace", closefd = False)
+    else:
+        input_file = open(input_path, "r", buffering = BATCH_IO_BUFFER_SIZE, encoding = "utf-8", errors = "replace")
+    if (output_path is None):
+        output_file = open(sys.stdout.fileno(), "w", buffering = BATCH_IO_BUFFER_SIZE, closefd = False)
+    else:
+        output_file = open(output_path, "w", buffering = BATCH_IO_BUFFER_SIZE)
+    return (input_file, output_file)
+
+def run_batch(input_path : str = None, output_path : str = None, jobs : int = 1, chunk_size : int = DEFAULT_BATCH_CHUNK_SIZE):
+    '''
+    Streams expressions one per line from input_path (stdin when None) to output_path (stdout when None).
+    jobs > 1 spreads chunks of chunk_size lines over a process pool, output order is unchanged.
+    Memory use does not depend on the input size. Workers get the constants and functions of this process,
+    see get_batch_worker_initargs().
+    Returns the number of lines that raised instead of returning errors, they are in the output as error lines.
+    '''
+    failures = []
+    input_file, output_file = open_batch_streams(input_path, output_path)
+    with input_file, output_file:
+        if (jobs > 1):
+            output_file.writelines(evaluate_batch_lines_parallel(input_file, jobs, chunk_size, failures))
         else:
-            print(f"{lex_error_count} error(s) occured in <expression>")
-            sys.exit()
+            output_file.writelines(evaluate_batch_lines(input_file, failures))
+    return len(failures)
 
-    console_output_debug_msg("All lex tokens:")
-    for token_index, token in enumerate(lex_tokens):
-        console_output_debug_msg(f" [{token_index}] {token.lexeame}")
-    console_output_debug_msg("End of tokens")
-    evaluated_value, errors = eval_lex_tokens(lex_tokens)
+'''
+Bulk mode (--batch --format npy). The input file is memory mapped, and each range of records is decoded straight
+from the mapping and split on newlines. Results go to two .npy columns, PREFIX.values.npy (float64,
+NaN where a record failed) and PREFIX.errors.npy (uint8 BULK_* error codes), that numpy.load() reads,
+mmap_mode = "r" included. numpy is not needed to write them. Decimal and Fraction results are rounded to float64.
+'''
+BULK_OK = 0
+BULK_LEX_ERROR = 1 # bad chars or numbers, input over the expression limits
+BULK_SYNTAX_ERROR = 2 # brackets, operators and operands that don't fit together, wrong argument counts
+BULK_EVALUATION_ERROR = 3 # math domain errors, division by zero, ...
+BULK_EMPTY_RECORD = 4 # blank line
+BULK_INTERNAL_ERROR = 5 # the record raised instead of returning errors, see evaluate_batch_expression()
+BULK_ERROR_NAMES = {BULK_OK: "ok", BULK_LEX_ERROR: "lex error", BULK_SYNTAX_ERROR: "syntax error", BULK_EVALUATION_ERROR: "evaluation error", BULK_EMPTY_RECORD: "empty record", BULK_INTERNAL_ERROR: "internal error"}
+# bytes of input per task, a task ends at the first newline after it
+DEFAULT_BULK_CHUNK_SIZE = 1 << 20
+NPY_HEADER_SIZE = 128
+
+def get_bulk_error_code(expression : str):
+    '''
+    Returns the BULK_* error code of expression, which evaluate_expression_string() returned errors for.
+    '''
+    # errors are rare, so the stage that failed is found by running the stages again
+    tokens = lex(expression)
+    if (len(get_lex_errors(tokens)) > 0):
+        return BULK_LEX_ERROR
+    post_fix_token_list, errors = tokens_to_postfix(tokens)
     if (len(errors) > 0):
-        print("Input had errors, no value returned", file = sys.stderr)
-        for error in errors:
-            print(f"Error: {error}", file = sys.stderr)
-        if is_interactive:
+        return BULK_SYNTAX_ERROR
+    program, errors = build_program(post_fix_token_list)
+    if (len(errors) > 0 or get_program_stack_error(program) is not None):
+        return BULK_SYNTAX_ERROR
+    return BULK_EVALUATION_ERROR
+
+def evaluate_bulk_records(buffer, start : int, end : int):
+    '''
+    Evaluates the newline separated records of buffer[start:end], a range from get_bulk_ranges(). The range is
+    decoded in one go straight from buffer, undecodable bytes become U+FFFD and fail in lex(). Whitespace
+    around a record, a "\\r" before its newline included, is ignored.
+    Returns list(values: array.array, error_codes: bytearray), one float64 and one BULK_* code per record.
+    '''
+    import array
+    values = array.array("d")
+    error_codes = bytearray()
+    nan = math.nan
+    with memoryview(buffer) as view:
+        text = str(view[start:end], "utf-8", "replace")
+    records = text.split("\n")
+    if (text.endswith("\n")):
+        records.pop()
+    for record in records:
+        expression = record.strip()
+        if (len(expression) == 0):
+            values.append(nan)
+            error_codes.append(BULK_EMPTY_RECORD)
             continue
+        # an exception fails its record alone, the columns computed so far are kept
+        try:
+            evaluated_value, errors = evaluate_expression_string(expression)
+            if (len(errors) > 0):
+                values.append(nan)
+                error_codes.append(get_bulk_error_code(expression))
+                continue
+            try:
+                value = float(evaluated_value)
+            except OverflowError:
+                value = math.inf if evaluated_value > 0 else -math.inf
+        except Exception:
+            values.append(nan)
+            error_codes.append(BULK_INTERNAL_ERROR)
+            continue
+        values.append(value)
+        error_codes.append(BULK_OK)
+    return (values, error_codes)
+
+def open_bulk_input(input_file):
+    # mmap refuses empty files, None stands for no records
+    import mmap
+    import os
+    if (os.fstat(input_file.fileno()).st_size == 0):
+        return None
+    buffer = mmap.mmap(input_file.fileno(), 0, access = mmap.ACCESS_READ)
+    if (hasattr(mmap, "MADV_SEQUENTIAL")):
+        buffer.madvise(mmap.MADV_SEQUENTIAL)
+    return buffer
+
+def release_bulk_pages(buffer, end : int):
+    # evaluated records are not read again, dropping their pages keeps the resident set flat on large inputs.
+    # Page faults map some pages around the one they need, so pages before the last range come back and all of buffer[:end] is dropped
+    import mmap
+    if (hasattr(mmap, "MADV_DONTNEED") and end > 0):
+        buffer.madvise(mmap.MADV_DONTNEED, 0, end)
+
+def get_bulk_ranges(buffer, chunk_size : int):
+    '''
+    Generator, yields (start, end) byte ranges of about chunk_size bytes that cover buffer, each ends after a newline or at the end.
+    '''
+    start = 0
+    while (start < len(buffer)):
+        end = buffer.find(b"\n", start + chunk_size - 1) + 1
+        end = len(buffer) if end == 0 else end
+        yield (start, end)
+        start = end
+
+def pack_bulk_results(values, error_codes : bytearray):
+    # the values column is little endian float64
+    if (sys.byteorder == "big"):
+        values.byteswap()
+    return (values.tobytes(), bytes(error_codes))
+
+def evaluate_bulk_chunk(input_path : str, start : int, end : int):
+    # runs inside a worker process, maps the input itself so only the range and the packed results are sent
+    with open(input_path, "rb") as input_file:
+        with open_bulk_input(input_file) as buffer:
+            return pack_bulk_results(*evaluate_bulk_records(buffer, start, end))
+
+def evaluate_bulk_chunks(buffer, chunk_size : int):
+    '''
+    Generator, yields list(values: bytes, error_codes: bytes) for each range of get_bulk_ranges(), in input order.
+    '''
+    for start, end in get_bulk_ranges(buffer, chunk_size):
+        values, error_codes = evaluate_bulk_records(buffer, start, end)
+        release_bulk_pages(buffer, end)
+        yield pack_bulk_results(values, error_codes)
+
+def evaluate_bulk_chunks_parallel(input_path : str, buffer, jobs : int, chunk_size : int):
+    '''
+    Generator, same output as evaluate_bulk_chunks() but the ranges are evaluated on a pool of jobs worker
+    processes, with at most 2*jobs ranges in flight. buffer is input_path mapped, only used to find the ranges.
+    '''
+    import concurrent.futures
+    max_pending_chunks = jobs * 2
+    with concurrent.futures.ProcessPoolExecutor(max_workers = jobs, initializer = init_batch_worker, initargs = get_batch_worker_initargs()) as executor:
+        pending_chunks = collections.deque()
+        for start, end in get_bulk_ranges(buffer, chunk_size):
+            pending_chunks.append(executor.submit(evaluate_bulk_chunk, input_path, start, end))
+            release_bulk_pages(buffer, end)
+            if (len(pending_chunks) >= max_pending_chunks):
+                yield pending_chunks.popleft().result()
+        while (len(pending_chunks) > 0):
+            yield pending_chunks.popleft().result()
+
+class NpyColumnWriter:
+    '''
+    Writes a one dimensional .npy file (format version 1.0) of dtype descr, a numpy array protocol type string.
+    The length is only known at the end, so the header is padded to NPY_HEADER_SIZE bytes and close() rewrites it.
+    '''
+    def __init__(self, path : str, descr : str):
+        self.descr = descr
+        self.length = 0
+        self.file = open(path, "wb", buffering = BATCH_IO_BUFFER_SIZE)
+        self.file.write(self.get_header())
+    def get_header(self):
+        import struct
+        header = "{" + f"'descr': '{self.descr}', 'fortran_order': False, 'shape': ({self.length},), " + "}"
+        header = header.ljust(NPY_HEADER_SIZE - 11) + "\n"
+        return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+    def write(self, data : bytes, count : int):
+        self.file.write(data)
+        self.length += count
+    def close(self):
+        self.file.seek(0)
+        self.file.write(self.get_header())
+        self.file.close()
+
+def run_bulk(input_path : str, output_prefix : str, jobs : int = 1, chunk_size : int = DEFAULT_BULK_CHUNK_SIZE):
+    '''
+    Evaluates the expressions of input_path, one per line, into output_prefix.values.npy and
+    output_prefix.errors.npy, see BULK_OK and the other error codes. jobs > 1 spreads ranges of about
+    chunk_size bytes over a process pool, output order is unchanged. Memory use does not depend on the input size.
+    Returns the number of records.
+    '''
+    with open(input_path, "rb") as input_file, contextlib.closing(NpyColumnWriter(output_prefix + ".values.npy", "<f8")) as values_writer, contextlib.closing(NpyColumnWriter(output_prefix + ".errors.npy", "|u1")) as error_codes_writer:
+        buffer = open_bulk_input(input_file)
+        if (buffer is None):
+            return 0
+        with buffer:
+            if (jobs > 1):
+                chunks = evaluate_bulk_chunks_parallel(input_path, buffer, jobs, chunk_size)
+            else:
+                chunks = evaluate_bulk_chunks(buffer, chunk_size)
+            for values, error_codes in chunks:
+                values_writer.write(values, len(error_codes))
+                error_codes_writer.write(error_codes, len(error_codes))
+    return error_codes_writer.length
+
+'''
+Server mode (--serve). Requests and responses are frames of UTF-8 text, one expression per request and one
+result per response, formatted like a batch output line (value, or "Error: ..."). Two framings:
+  line   - newline terminated, the expression must not contain a newline
+  length - 4 byte big endian payload length, then the payload
+Any number of requests can be pipelined on one connection, responses come back in request order.
+asyncio and socket are imported on first use, so they add nothing to the startup of the other modes.
+'''
+SERVER_FRAMING_LINE = "line"
+SERVER_FRAMING_LENGTH = "length"
+SERVER_FRAMINGS = (SERVER_FRAMING_LINE, SERVER_FRAMING_LENGTH)
+SERVER_MAX_FRAME_SIZE = 1 << 20
+SERVER_READ_SIZE = 1 << 16
+# requests read together are split into tasks of at most SERVER_CHUNK_SIZE expressions, and each connection
+# stops reading while SERVER_MAX_PENDING_CHUNKS tasks wait for their results
+SERVER_CHUNK_SIZE = 256
+SERVER_MAX_PENDING_CHUNKS = 64
+
+class FrameError(Exception):
+    '''
+    Raised by FrameDecoder for a stream that cannot be framed, the connection cannot go on.
+       payloads : the payloads completed before the bad frame, still to be answered.
+    '''
+    def __init__(self, message : str, payloads : typing.List[str] = ()):
+        super().__init__(message)
+        self.payloads = list(payloads)
+
+def encode_frame(text : str, framing : str = SERVER_FRAMING_LINE):
+    payload = text.encode("utf-8")
+    if (framing == SERVER_FRAMING_LENGTH):
+        return len(payload).to_bytes(4, "big") + payload
+    if (b"\n" in payload):
+        raise FrameError("line framing cannot carry a newline")
+    return payload + b"\n"
+
+class FrameDecoder:
+    '''
+    Splits a byte stream into frame payloads, feed() the received bytes in any pieces. Payloads are decoded as
+    UTF-8, undecodable bytes become U+FFFD and fail in lex() like any unknown char, so only that request gets an error.
+    Raises FrameError when a frame is larger than SERVER_MAX_FRAME_SIZE.
+    '''
+    def __init__(self, framing : str = SERVER_FRAMING_LINE):
+        self.framing = framing
+        self.buffer = bytearray()
+    def feed(self, data : bytes):
+        '''
+        Returns list[str], the payloads completed by data, in order.
+        '''
+        self.buffer += data
+        payloads = []
+        buffer = self.buffer
+        start_index = 0
+        if (self.framing == SERVER_FRAMING_LENGTH):
+            while (len(buffer) - start_index >= 4):
+                payload_size = int.from_bytes(buffer[start_index:start_index+4], "big")
+                if (payload_size > SERVER_MAX_FRAME_SIZE):
+                    raise FrameError(f"frame of {payload_size} bytes is larger than {SERVER_MAX_FRAME_SIZE}", payloads)
+                if (len(buffer) - start_index - 4 < payload_size):
+                    break
+                payloads.append(self.decode(buffer[start_index+4:start_index+4+payload_size]))
+                start_index += 4 + payload_size
+        else:
+            end_index = buffer.find(b"\n", start_index)
+            while (end_index >= 0):
+                payloads.append(self.decode(buffer[start_index:end_index]))
+                start_index = end_index + 1
+                end_index = buffer.find(b"\n", start_index)
+            if (len(buffer) - start_index > SERVER_MAX_FRAME_SIZE):
+                raise FrameError(f"line is longer than {SERVER_MAX_FRAME_SIZE} bytes", payloads)
+        del buffer[:start_index]
+        return payloads
+    def flush(self):
+        '''
+        Call at end of stream. Returns list[str], an unterminated last line (line framing) or an empty list.
+        Raises FrameError for a truncated length prefixed frame.
+        '''
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        if (len(data) == 0):
+            return []
+        if (self.framing == SERVER_FRAMING_LENGTH):
+            raise FrameError("stream ended inside a frame")
+        return [self.decode(data)]
+    def decode(self, payload : bytes):
+        return payload.decode("utf-8", "replace")
+
+def evaluate_server_requests(expressions : typing.List[str]):
+    # runs inside a worker process, returns the formatted result of every expression, errors included
+    return [evaluate_batch_expression(expression)[0] for expression in expressions]
+
+def parse_server_address(address : str):
+    '''
+    Returns list(host: str, port: int) for "PORT" or "HOST:PORT" (localhost TCP), list(path: str, None) for a
+    Unix domain socket path.
+    '''
+    if (address.isdigit()):
+        return ("127.0.0.1", int(address))
+    host, separator, port = address.rpartition(":")
+    if (separator != "" and "/" not in address and port.isdigit()):
+        return (host.strip("[]") if len(host) > 0 else "127.0.0.1", int(port))
+    return (address, None)
+
+async def serve_connection(reader, writer, executor, framing : str):
+    '''
+    Reads requests as fast as they arrive and hands them to executor in chunks, a second task writes the
+    results back in request order. Reading pauses while SERVER_MAX_PENDING_CHUNKS chunks are unanswered.
+    '''
+    import asyncio
+    loop = asyncio.get_running_loop()
+    pending_chunks = asyncio.Queue(maxsize = SERVER_MAX_PENDING_CHUNKS)
+    async def write_results():
+        # keeps consuming after the client went away, so the reading side never blocks on a full queue
+        is_connected = True
+        while True:
+            pending_chunk = await pending_chunks.get()
+            if (pending_chunk is None):
+                return
+            chunk_future, request_count = pending_chunk
+            try:
+                results = await chunk_future
+            except Exception as error:
+                # the worker itself failed (killed, out of memory, ...), every request of the chunk still gets its answer
+                results = [format_batch_result(None, [f"Internal error, {type(error).__name__}: {error}"])] * request_count
+            if (not is_connected):
+                continue
+            try:
+                writer.write(b"".join([encode_frame(result, framing) for result in results]))
+                await writer.drain()
+            except ConnectionError:
+                is_connected = False
+    async def submit_requests(expressions : typing.List[str]):
+        for chunk_start in range(0, len(expressions), SERVER_CHUNK_SIZE):
+            chunk = expressions[chunk_start:chunk_start+SERVER_CHUNK_SIZE]
+            try:
+                chunk_future = loop.run_in_executor(executor, evaluate_server_requests, chunk)
+            except Exception as error:
+                # a broken pool refuses new work, the writer answers the chunk with the error
+                chunk_future = loop.create_future()
+                chunk_future.set_exception(error)
+            await pending_chunks.put((chunk_future, len(chunk)))
+    writer_task = asyncio.create_task(write_results())
+    decoder = FrameDecoder(framing)
+    try:
+        while True:
+            data = await reader.read(SERVER_READ_SIZE)
+            await submit_requests(decoder.feed(data) if len(data) > 0 else decoder.flush())
+            if (len(data) == 0):
+                break
+    except FrameError as error:
+        # the requests in front of the bad frame are still answered
+        await submit_requests(error.payloads)
+        print(f"Closing connection, {error}", file = sys.stderr)
+    except ConnectionError:
+        pass
+    finally:
+        # answer everything read so far, then close
+        await pending_chunks.put(None)
+        await writer_task
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+async def serve(address : str, executor, framing : str = SERVER_FRAMING_LINE):
+    # returns on SIGTERM, so run_server() can clean up like it does after Ctrl+C
+    import asyncio
+    import signal
+    handle_connection = lambda reader, writer: serve_connection(reader, writer, executor, framing)
+    host_or_path, port = parse_server_address(address)
+    if (port is None):
+        server = await asyncio.start_unix_server(handle_connection, path = host_or_path)
+    else:
+        server = await asyncio.start_server(handle_connection, host_or_path, port)
+    print(f"Serving on {address} ({framing} framing)", file = sys.stderr)
+    stop_requested = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop_requested.set)
+    async with server:
+        await stop_requested.wait()
+
+def run_server(address : str, jobs : int = None, framing : str = SERVER_FRAMING_LINE):
+    '''
+    Serves expression requests on address until interrupted, see parse_server_address() and SERVER_FRAMINGS.
+    Evaluation runs on a pool of jobs worker processes (default: one per cpu), the event loop only moves bytes.
+    A stale Unix socket file left by an earlier server is replaced.
+    '''
+    import asyncio
+    import concurrent.futures
+    import os
+    import stat
+    host_or_path, port = parse_server_address(address)
+    if (port is None and os.path.exists(host_or_path) and stat.S_ISSOCK(os.stat(host_or_path).st_mode)):
+        os.unlink(host_or_path)
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers = jobs, initializer = init_batch_worker, initargs = get_batch_worker_initargs()) as executor:
+            # forked workers start on the first task and inherit the sockets open at that time, a connection
+            # they hold is never seen closed by its client, so they start before the first connection
+            executor.submit(int).result()
+            asyncio.run(serve(address, executor, framing))
+    finally:
+        if (port is None and os.path.exists(host_or_path)):
+            os.unlink(host_or_path)
+
+def parse_server_result(result : str):
+    '''
+    Returns list(evaluated_value: str, errors: list[str]) from a response, evaluated_value is None on error.
+    '''
+    if (result.startswith("Error: ")):
+        return (None, result[len("Error: "):].split("; "))
+    return (result, [])
+
+class ServerClient:
+    '''
+    Blocking client for a --serve server. Requests can be pipelined: send() any number of expressions, then
+    receive() their results in the same order. Usable as a context manager.
+       address : same forms as the server, "PORT", "HOST:PORT" or a Unix socket path.
+       framing : must match the server, SERVER_FRAMING_LINE or SERVER_FRAMING_LENGTH.
+    '''
+    def __init__(self, address : str, framing : str = SERVER_FRAMING_LINE, timeout : float = None):
+        import socket
+        host_or_path, port = parse_server_address(address)
+        if (port is None):
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.settimeout(timeout)
+            self.socket.connect(host_or_path)
+        else:
+            self.socket = socket.create_connection((host_or_path, port), timeout = timeout)
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.framing = framing
+        self.decoder = FrameDecoder(framing)
+        self.results = collections.deque()
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc_info):
+        self.close()
+    def close(self):
+        self.socket.close()
+    def send(self, expressions : typing.Union[str, typing.Iterable[str]]):
+        if (isinstance(expressions, str)):
+            expressions = [expressions]
+        self.socket.sendall(b"".join([encode_frame(expression, self.framing) for expression in expressions]))
+    def receive(self):
+        '''
+        Returns the next result string, blocks until it arrives.
+        '''
+        while (len(self.results) == 0):
+            data = self.socket.recv(SERVER_READ_SIZE)
+            if (len(data) == 0):
+                raise ConnectionError("server closed the connection")
+            self.results.extend(self.decoder.feed(data))
+        return self.results.popleft()
+    def evaluate(self, expression : str):
+        '''
+        Returns list(evaluated_value: str, errors: list[str]), see parse_server_result()
+        '''
+        self.send(expression)
+        return parse_server_result(self.receive())
+    def evaluate_many(self, expressions : typing.List[str]):
+        '''
+        Sends every expression before reading any result, one round trip for the whole list.
+        Returns list[list(evaluated_value: str, errors: list[str])], in order.
+        '''
+        self.send(expressions)
+        return [parse_server_result(self.receive()) for expression in expressions]
+
+PROFILE_MIN_SECONDS = 0.2
+PROFILE_TOP_FUNCTIONS = 15
+
+def time_repeated(function : typing.Callable, min_seconds : float):
+    '''
+    Calls function until min_seconds have passed, at least once. Returns list(call_count: int, seconds_per_call: float)
+    '''
+    import time
+    call_count = 0
+    start_time = time.perf_counter()
+    elapsed_time = 0
+    while (call_count == 0 or elapsed_time < min_seconds):
+        function()
+        call_count += 1
+        elapsed_time = time.perf_counter() - start_time
+    return (call_count, elapsed_time / call_count)
+
+def profile_expression(expression : str, min_seconds : float = PROFILE_MIN_SECONDS):
+    '''
+    Prints the time per call of each stage (lex, postfix, build, run) for expression, then the
+    PROFILE_TOP_FUNCTIONS functions with the most cumulative time in a cProfile run of the whole pipeline.
+    Each stage is repeated for at least min_seconds. Used by --profile.
+    Returns list(evaluated_value: decimal.Decimal, errors: list[str]), same as evaluate_checked_tokens()
+    '''
+    import cProfile
+    import pstats
+    tokens = lex(expression)
+    errors = get_lex_errors(tokens)
+    if (len(errors) > 0):
+        return (None, errors)
+    post_fix_token_list, errors = tokens_to_postfix(tokens)
+    if (len(errors) > 0):
+        return (None, errors)
+    program, errors = build_program(post_fix_token_list)
+    if (len(errors) > 0):
+        return (None, errors)
+    stages = [
+        ("lex", lambda: lex(expression)),
+        ("postfix", lambda: tokens_to_postfix(tokens)),
+        ("build", lambda: build_program(post_fix_token_list)),
+        ("run", lambda: run_program(program)),
+    ]
+    stage_timings = [(name, *time_repeated(function, min_seconds)) for name, function in stages]
+    total_time = sum([seconds_per_call for name, call_count, seconds_per_call in stage_timings])
+    print(f"{len(tokens)} tokens, {len(program)} instructions")
+    print(f"{'stage':<8} {'calls':>8} {'us/call':>12} {'share':>7}")
+    for name, call_count, seconds_per_call in stage_timings:
+        print(f"{name:<8} {call_count:>8} {seconds_per_call*1e6:>12.2f} {seconds_per_call/total_time*100:>6.1f}%")
+    print(f"{'total':<8} {'':>8} {total_time*1e6:>12.2f}")
+
+    call_count = max(1, int(min_seconds / total_time))
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for call_index in range(call_count):
+        evaluate_checked_tokens(lex(expression))
+    profiler.disable()
+    print(f"\ncProfile of {call_count} lex + evaluate call(s):")
+    pstats.Stats(profiler, stream = sys.stdout).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    return run_program(program)
+
+def print_constants() -> None:
+    print("Constants:")
+    for constant in KNOWN_CONSTS.keys():
+        print(f" {constant} - {KNOWN_CONSTS[constant]}")
+def print_functions() -> None:
+    print("Functions")
+    for name, function in KNOWN_FUNCTIONS.items():
+        if (isinstance(function, ExpressionFunction)):
+            print(f" {function.definition}")
+        else:
+            arity = FUNCTION_ARITIES.get(name, 1)
+            print(f" {name}" + ("" if arity == 1 else f", {arity}{' or more' if name in VARIADIC_FUNCTIONS else ''} arguments"))
+def print_commands() -> None:
+    print("Interactive mode commands")
+    print(" help, h  - print help page")
+    print(" exit, q  - exit program")
+    print(" debug    - toggle debug output")
+    print(" cache    - print result cache statistics")
+    print(" f(x, y) = expression - define a function")
+
+def pop_cli_option(args : typing.List[str], option : str):
+    '''
+    Removes "option VALUE" from args. Returns VALUE, or None when option is not given.
+    '''
+    if (option not in args):
+        return None
+    arg_index = args.index(option)
+    if (arg_index+1 >= len(args)):
+        return ""
+    value = args[arg_index+1]
+    del args[arg_index:arg_index+2]
+    return value
+
+def main(args : typing.List[str] = None):
+    '''
+    Command line entry point, args defaults to sys.argv. Runs an expression, batch mode, the server or the
+    interactive mode, see --help.
+    '''
+    args = list(sys.argv if args is None else args)
+    cache_size = pop_cli_option(args, "--cache-size")
+    if (cache_size is not None and not cache_size.isdigit()):
+        print("--cache-size needs a number of entries", file = sys.stderr)
+        sys.exit(2)
+    set_result_cache_size(0 if cache_size is None else int(cache_size))
+    engine_name = pop_cli_option(args, "--engine")
+    precision = pop_cli_option(args, "--precision")
+    if (precision is not None and (not precision.isdigit() or int(precision) == 0)):
+        print("--precision needs a number of significant digits", file = sys.stderr)
+        sys.exit(2)
+    try:
+        set_default_engine(create_engine("decimal" if engine_name is None else engine_name, None if precision is None else int(precision)))
+    except ValueError as error:
+        print(error, file = sys.stderr)
+        sys.exit(2)
+    limits = []
+    for option in ("--max-length", "--max-tokens", "--max-depth"):
+        limit = pop_cli_option(args, option)
+        if (limit is not None and (not limit.isdigit() or int(limit) == 0)):
+            print(f"{option} needs a positive number", file = sys.stderr)
+            sys.exit(2)
+        limits.append(None if limit is None else int(limit))
+    set_expression_limits(*limits)
+    definition = pop_cli_option(args, "--define")
+    while (definition is not None):
+        expression_function, errors = define_function(definition)
+        if (len(errors) > 0):
+            print(f"--define \'{definition}\': {errors[0]}", file = sys.stderr)
+            sys.exit(2)
+        definition = pop_cli_option(args, "--define")
+    debug_output_requested = "--debug" in args
+    if (debug_output_requested):
+        args.remove("--debug")
+    profile_requested = "--profile" in args
+    if (profile_requested):
+        args.remove("--profile")
+
+    is_interactive = False
+    if (len(args) == 1):
+        is_interactive = True
+    # debug output stays on by default in the interactive mode only
+    set_debug_output(is_interactive or debug_output_requested)
+    if len(args) > 1:
+        if (args[1] == "--help" or args[1] == "-h"):
+            print(f"python3 {args[0]} [--debug] [--profile] [--cache-size N] [--engine NAME] [--precision N] [--max-length N] [--max-tokens N] [--max-depth N] [--define DEFINITION]... [expression]")
+            print(f"python3 {args[0]} --batch [--input FILE] [--output FILE] [--jobs N] [--chunk-size N] [--format text|npy]")
+            print(f"python3 {args[0]} --serve ADDRESS [--jobs N] [--framing line|length]")
+            print( "python3 {-v|-h|__VERSION__}")
+            print( "  -v, --version    print program version and exit")
+            print( "      __VERSION__  output version in specific format")
+            print( "  -h, --help       print this help page and exit")
+            print( "      --debug      print debug output, on by default in interactive mode")
+            print( "      --profile    print per stage timings and a cProfile listing for each expression")
+            print( "      --cache-size keep up to N results in an LRU cache, default 0 (disabled)")
+            print( "      --engine     number type: decimal (default), float, fraction (exact, rationals only) or interval (bounds)")
+            print( "      --precision  significant digits of the decimal engine, default 28")
+            print(f"      --max-length longest expression accepted in chars, default {MAX_EXPRESSION_LENGTH}")
+            print(f"      --max-tokens most tokens accepted in an expression, default {MAX_TOKEN_COUNT}")
+            print(f"      --max-depth  deepest nesting of brackets, functions and unary minus accepted, default {MAX_NESTING_DEPTH}")
+            print( "      --define     define a function, for example --define \"f(x, y) = x^2 + y\", can repeat")
+            print( "      --batch      evaluate one expression per line, one result or error per output line")
+            print( "      --input      batch input file, default stdin")
+            print( "      --output     batch output file, default stdout, the PREFIX of PREFIX.values.npy and PREFIX.errors.npy with --format npy")
+            print( "      --jobs       batch worker processes, default 1, server default one per cpu")
+            print(f"      --chunk-size lines per batch worker task, default {DEFAULT_BATCH_CHUNK_SIZE}, bytes with --format npy, default {DEFAULT_BULK_CHUNK_SIZE}")
+            print( "      --format     batch output as text lines (text, default) or float64 values and uint8 error codes in .npy files (npy), npy memory maps --input")
+            print( "      --serve      serve requests on a Unix socket path, PORT or HOST:PORT, until interrupted")
+            print( "      --framing    server requests are newline terminated (line, default) or 4 byte length prefixed (length)")
+            sys.exit()
+        if (args[1] == "--version" or args[1] == "-v"):
+            print(f"VERSION: {APP_VERSION_MAJOR}.{APP_VERSION_MINOR}")
+            sys.exit()
+        if (args[1] == "__VERSION__"):
+            print(f"{APP_VERSION_MAJOR}.{APP_VERSION_MINOR}")
+            sys.exit()
+        if (args[1] == "--batch"):
+            batch_input_path = None
+            batch_output_path = None
+            batch_jobs = 1
+            batch_chunk_size = None
+            batch_format = "text"
+            arg_index = 2
+            while (arg_index < len(args)):
+                arg = args[arg_index]
+                if (arg in ("--input", "--output") and arg_index+1 < len(args)):
+                    if (arg == "--input"):
+                        batch_input_path = args[arg_index+1]
+                    else:
+                        batch_output_path = args[arg_index+1]
+                    arg_index += 2
+                    continue
+                if (arg == "--format" and arg_index+1 < len(args) and args[arg_index+1] in ("text", "npy")):
+                    batch_format = args[arg_index+1]
+                    arg_index += 2
+                    continue
+                if (arg in ("--jobs", "--chunk-size") and arg_index+1 < len(args) and args[arg_index+1].isdigit() and int(args[arg_index+1]) > 0):
+                    if (arg == "--jobs"):
+                        batch_jobs = int(args[arg_index+1])
+                    else:
+                        batch_chunk_size = int(args[arg_index+1])
+                    arg_index += 2
+                    continue
+                print(f"Unknown or incomplete batch argument \'{arg}\'", file = sys.stderr)
+                sys.exit(2)
+            if (batch_format == "npy" and (batch_input_path is None or batch_output_path is None)):
+                print("--format npy needs --input FILE and --output PREFIX", file = sys.stderr)
+                sys.exit(2)
+            if (batch_format == "npy" and DEFAULT_ENGINE.name == IntervalEngine.name):
+                print("--format npy writes one float per value, it does not support the interval engine", file = sys.stderr)
+                sys.exit(2)
+            try:
+                if (batch_format == "npy"):
+                    run_bulk(batch_input_path, batch_output_path, batch_jobs, DEFAULT_BULK_CHUNK_SIZE if batch_chunk_size is None else batch_chunk_size)
+                else:
+                    failure_count = run_batch(batch_input_path, batch_output_path, batch_jobs, DEFAULT_BATCH_CHUNK_SIZE if batch_chunk_size is None else batch_chunk_size)
+                    if (failure_count > 0):
+                        print(f"Batch finished, {failure_count} line(s) failed with an internal error", file = sys.stderr)
+                        sys.exit(1)
+            except OSError as error:
+                print(f"Batch failed, {error}", file = sys.stderr)
+                sys.exit(1)
+            sys.exit()
+        if (args[1] == "--serve"):
+            server_jobs = pop_cli_option(args, "--jobs")
+            if (server_jobs is not None and (not server_jobs.isdigit() or int(server_jobs) == 0)):
+                print("--jobs needs a number of worker processes", file = sys.stderr)
+                sys.exit(2)
+            server_framing = pop_cli_option(args, "--framing")
+            server_framing = SERVER_FRAMING_LINE if server_framing is None else server_framing
+            if (server_framing not in SERVER_FRAMINGS):
+                print(f"--framing needs one of {', '.join(SERVER_FRAMINGS)}", file = sys.stderr)
+                sys.exit(2)
+            if (len(args) != 3):
+                print("--serve needs one address, a Unix socket path, PORT or HOST:PORT", file = sys.stderr)
+                sys.exit(2)
+            set_debug_output(debug_output_requested)
+            try:
+                run_server(args[2], None if server_jobs is None else int(server_jobs), server_framing)
+            except KeyboardInterrupt:
+                pass
+            except OSError as error:
+                print(f"Server failed, {error}", file = sys.stderr)
+                sys.exit(1)
+            sys.exit()
+
+    while True:
+        if is_interactive:
+            try:
+                expression = input(">> ").strip()
+            except EOFError:
+                print("\r")
+                expression = "q"
+            if len(expression) == 0:
+                continue
+            if expression == "q" or expression == "exit":
+                sys.exit()
+            if expression == "help" or expression == "h":
+                print_constants()
+                print_functions()
+                print_commands()
+                continue
+            if expression == "debug":
+                set_debug_output(not is_debug_output_enabled())
+                print("ENABLED DEBUG OUTPUT" if is_debug_output_enabled() else "DISABLED DEBUG OUTPUT")
+                continue
+            if expression == "cache":
+                if (RESULT_CACHE is None):
+                    print("Result cache disabled, start with --cache-size N to enable it")
+                else:
+                    RESULT_CACHE.print_stats()
+                continue
+            if "=" in expression:
+                expression_function, errors = define_function(expression)
+                for error in errors:
+                    print(f"Error: {error}", file = sys.stderr)
+                if (expression_function is not None):
+                    print(f"Defined {expression_function.definition}")
+                continue
+        else:
+            expression = args[1]
+        lex_tokens = lex(expression)
+        lex_error_count = print_lex_errors(lex_tokens)
+        if (lex_error_count > 0):
+            if is_interactive:
+                print(f"{lex_error_count} error(s)")
+                continue
+            else:
+                print(f"{lex_error_count} error(s) occured in <expression>")
+                sys.exit()
+
+        if (is_debug_output_enabled()):
+            LOGGER.debug("All lex tokens:")
+            for token_index, token in enumerate(lex_tokens):
+                LOGGER.debug(" [%d] %s", token_index, token.lexeame)
+            LOGGER.debug("End of tokens")
+        if (profile_requested):
+            evaluated_value, errors = profile_expression(expression)
+        elif (RESULT_CACHE is not None):
+            evaluated_value, errors = RESULT_CACHE.evaluate_tokens(lex_tokens)
         else:
-            sys.exit(1)
-    print(evaluated_value)
-    if (not is_interactive):
-        sys.exit()
+            evaluated_value, errors = eval_lex_tokens(lex_tokens)
+        if (len(errors) > 0):
+            print("Input had errors, no value returned", file = sys.stderr)
+            for error in errors:
+                print(f"Error: {error}", file = sys.stderr)
+            if is_interactive:
+                continue
+            else:
+                sys.exit(1)
+        try:
+            print(evaluated_value)
+        except ValueError as error:
+            # exact fractions with more digits than sys.get_int_max_str_digits() allows
+            print(f"Result cannot be printed, {error}", file = sys.stderr)
+            if (not is_interactive):
+                sys.exit(1)
+        if (not is_interactive):
+            sys.exit()
+
+if __name__ == "__main__":
+    main()